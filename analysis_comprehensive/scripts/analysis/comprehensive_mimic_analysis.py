@@ -2,10 +2,18 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
+import sys
+from pathlib import Path
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+# 공용 유틸리티 (프로젝트 루트의 mimic_utils)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from mimic_utils.table_cache import load_table
+
+BASE_PATH = '/Users/hyungjun/Desktop/fast campus_lecture'
+
 plt.rcParams['font.family'] = 'DejaVu Sans'
 plt.rcParams['axes.unicode_minus'] = False
 plt.rcParams['figure.figsize'] = (12, 8)
@@ -14,15 +22,15 @@ print("MIMIC-IV 데이터 종합 분석 시작...")
 print("전체 데이터를 읽는 중입니다. 시간이 소요될 수 있습니다...")
 
 print("admissions.csv 읽는 중...")
-admissions_df = pd.read_csv('/Users/hyungjun/Desktop/fast campus_lecture/dataset2/core/admissions.csv')
+admissions_df = load_table('core/admissions', base_path=BASE_PATH)
 print(f"  - {len(admissions_df):,}개 레코드 로드 완료")
 
 print("patients.csv 읽는 중...")
-patients_df = pd.read_csv('/Users/hyungjun/Desktop/fast campus_lecture/dataset2/core/patients.csv')
+patients_df = load_table('core/patients', base_path=BASE_PATH)
 print(f"  - {len(patients_df):,}개 레코드 로드 완료")
 
 print("transfers.csv 읽는 중...")
-transfers_df = pd.read_csv('/Users/hyungjun/Desktop/fast campus_lecture/dataset2/core/transfers.csv')
+transfers_df = load_table('core/transfers', base_path=BASE_PATH)
 print(f"  - {len(transfers_df):,}개 레코드 로드 완료")
 
 admissions_df['admittime'] = pd.to_datetime(admissions_df['admittime'])
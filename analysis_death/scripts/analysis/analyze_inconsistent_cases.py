@@ -11,6 +11,7 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import platform
 from pathlib import Path
+import sys
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
@@ -31,6 +32,11 @@ OUTPUT_DIR = BASE_DIR / 'analysis_death'
 FIGURES_DIR = OUTPUT_DIR / 'figures'
 DATA_OUTPUT_DIR = OUTPUT_DIR / 'data'
 
+# 공용 유틸리티 (프로젝트 루트의 mimic_utils)
+sys.path.insert(0, str(BASE_DIR))
+from mimic_utils.table_cache import load_table
+from mimic_utils.schema import drop_unused_categories
+
 def analyze_inconsistent_cases():
     """불일치 사례 상세 분석"""
     
@@ -40,12 +46,12 @@ def analyze_inconsistent_cases():
     
     # 데이터 로딩
     print("\n1. 데이터 로딩 중...")
-    admissions = pd.read_csv(DATA_DIR / 'core' / 'admissions.csv')
-    patients = pd.read_csv(DATA_DIR / 'core' / 'patients.csv')
-    transfers = pd.read_csv(DATA_DIR / 'core' / 'transfers.csv')
+    admissions = load_table('core/admissions', base_path=BASE_DIR)
+    patients = load_table('core/patients', base_path=BASE_DIR)
+    transfers = load_table('core/transfers', base_path=BASE_DIR)
     
     # ICU 데이터 로딩
-    icustays = pd.read_csv(DATA_DIR / 'icu' / 'icustays.csv')
+    icustays = load_table('icu/icustays', base_path=BASE_DIR)
     
     # 불일치 사례 찾기
     print("\n2. 불일치 사례 식별")
@@ -53,7 +59,7 @@ def analyze_inconsistent_cases():
     
     # hospital_expire_flag=1이지만 deathtime이 없는 경우
     inconsistent_mask = (admissions['hospital_expire_flag'] == 1) & (admissions['deathtime'].isna())
-    inconsistent_cases = admissions[inconsistent_mask].copy()
+    inconsistent_cases = drop_unused_categories(admissions[inconsistent_mask].copy())
     
     print(f"발견된 불일치 사례: {len(inconsistent_cases)}건")
     
@@ -184,7 +190,7 @@ def analyze_inconsistent_cases():
     
     # 정상 사례 (hospital_expire_flag=1이고 deathtime도 있는 경우)
     normal_mask = (admissions['hospital_expire_flag'] == 1) & (admissions['deathtime'].notna())
-    normal_cases = admissions[normal_mask].copy()
+    normal_cases = drop_unused_categories(admissions[normal_mask].copy())
     normal_cases = normal_cases.merge(
         patients[['subject_id', 'gender', 'anchor_age']], 
         on='subject_id', 
@@ -10,6 +10,7 @@ import json
 import matplotlib.pyplot as plt
 import seaborn as sns
 import platform
+import sys
 from pathlib import Path
 import warnings
 warnings.filterwarnings('ignore')
@@ -30,6 +31,10 @@ OUTPUT_DIR = BASE_DIR / 'analysis_death'
 FIGURES_DIR = OUTPUT_DIR / 'figures'
 DATA_OUTPUT_DIR = OUTPUT_DIR / 'data'
 
+# 공용 유틸리티 (프로젝트 루트의 mimic_utils)
+sys.path.insert(0, str(BASE_DIR))
+from mimic_utils.table_cache import load_table
+
 # 디렉토리 생성
 FIGURES_DIR.mkdir(exist_ok=True)
 DATA_OUTPUT_DIR.mkdir(exist_ok=True)
@@ -48,7 +53,7 @@ def analyze_death_fields():
     print("-" * 40)
     
     # patients 테이블
-    patients = pd.read_csv(DATA_DIR / 'core' / 'patients.csv')
+    patients = load_table('core/patients', base_path=BASE_DIR)
     print(f"\n[patients.csv] - 총 {len(patients):,}명")
     print(f"  - dod (Date of Death) 필드 존재")
     print(f"  - 사망자: {patients['dod'].notna().sum():,}명 ({patients['dod'].notna().sum()/len(patients)*100:.2f}%)")
@@ -61,7 +66,7 @@ def analyze_death_fields():
     }
     
     # admissions 테이블
-    admissions = pd.read_csv(DATA_DIR / 'core' / 'admissions.csv')
+    admissions = load_table('core/admissions', base_path=BASE_DIR)
     print(f"\n[admissions.csv] - 총 {len(admissions):,}건")
     print(f"  - deathtime 필드 존재")
     print(f"  - hospital_expire_flag 필드 존재")
@@ -89,7 +94,7 @@ def analyze_death_fields():
         
         if death_related_cols:
             print(f"  - 사망 관련 필드 발견: {death_related_cols}")
-            icustays = pd.read_csv(icustays_path)
+            icustays = load_table('icu/icustays', base_path=BASE_DIR)
             results['icustays'] = {
                 'total_records': len(icustays),
                 'death_fields': death_related_cols
@@ -97,7 +102,7 @@ def analyze_death_fields():
         else:
             print("  - 사망 관련 필드 없음")
             results['icustays'] = {
-                'total_records': pd.read_csv(icustays_path).shape[0],
+                'total_records': len(load_table('icu/icustays', columns=['stay_id'], base_path=BASE_DIR)),
                 'death_fields': []
             }
     
@@ -116,7 +121,7 @@ def analyze_death_fields():
             
             # ICD 코드 관련 테이블인 경우 사망 관련 진단/시술 코드 확인
             if 'diagnoses_icd' in table_name:
-                df = pd.read_csv(table_path)
+                df = load_table(f'hosp/{table_path.stem}', columns=['icd_code'], base_path=BASE_DIR)
                 # 사망 관련 ICD 코드 검색 (예: R57 - Shock, R99 - Other ill-defined causes of mortality)
                 death_related = df[df['icd_code'].str.contains('R57|R99|I46|R98', na=False)]
                 if len(death_related) > 0:
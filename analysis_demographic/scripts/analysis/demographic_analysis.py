@@ -12,9 +12,15 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
 import json
+import sys
+from pathlib import Path
 import warnings
 warnings.filterwarnings('ignore')
 
+# 공용 유틸리티 (프로젝트 루트의 mimic_utils)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from mimic_utils.table_cache import load_table
+
 # 한글 폰트 설정
 plt.rcParams['font.family'] = 'DejaVu Sans'
 plt.rcParams['axes.unicode_minus'] = False
@@ -26,11 +32,10 @@ def load_data():
     print("=" * 80)
     print("\n1. 데이터 로딩 중...")
     
-    # 데이터 로드
-    import os
+    # 데이터 로드 (Parquet 캐시)
     base_path = '/Users/hyungjun/Desktop/fast campus_lecture'
-    patients = pd.read_csv(os.path.join(base_path, 'dataset2/core/patients.csv'))
-    admissions = pd.read_csv(os.path.join(base_path, 'dataset2/core/admissions.csv'))
+    patients = load_table('core/patients', base_path=base_path)
+    admissions = load_table('core/admissions', base_path=base_path)
     
     print(f"✅ Patients 데이터: {len(patients):,} 명")
     print(f"✅ Admissions 데이터: {len(admissions):,} 건")
@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
 """
 ICU별 재원기간 종합 분석
+
+사용법:
+    python analysis_icu_los/scripts/analysis/analyze_icu_los.py             # 샘플 기준 통계
+    python analysis_icu_los/scripts/analysis/analyze_icu_los.py --weighted  # + 샘플링 가중치로 전체 코호트 기준 추정
 """
 
 import pandas as pd
@@ -9,11 +13,19 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
 import json
+import sys
+import argparse
 import platform
 from scipy import stats
 import warnings
 warnings.filterwarnings('ignore')
 
+# 공용 유틸리티 (프로젝트 루트의 mimic_utils)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from mimic_utils.sampling_weights import (load_sampling_weights, attach_weights, weighted_groupby,
+                                          weighted_mean, weighted_rate, weighted_quantile,
+                                          effective_sample_size, WEIGHT_COL)
+
 # 한글 폰트 설정
 if platform.system() == 'Darwin':  # macOS
     plt.rcParams['font.family'] = 'AppleGothic'
@@ -273,8 +285,56 @@ def create_visualizations(df, icu_stats):
     plt.close()
     print("  ✓ 재원기간 구간별 분포 차트 저장")
 
-def save_results(df, icu_stats, test_results):
-    """분석 결과 저장"""
+def analyze_weighted_estimates(df):
+    """샘플링 가중치(전체 그룹 크기 / 샘플 크기)로 전체 코호트 기준 재원기간 / 사망률 추정"""
+    print("\n" + "=" * 60)
+    print("전체 코호트 기준 가중 추정 (사망 그룹 과대 추출 보정)")
+    print("=" * 60)
+    
+    weights = load_sampling_weights(Path.cwd())
+    df = attach_weights(df, weights)
+    unweighted = df[WEIGHT_COL].isna().sum()
+    if unweighted:
+        print(f"⚠️ 가중치 없는 ICU 입실 {unweighted}건 제외 (sampled_ids.csv에 없는 입원)")
+    w = df[WEIGHT_COL]
+    print(f"  유효 표본 크기: {effective_sample_size(w):.0f} / {w.notna().sum()}건")
+    
+    icu_stats = weighted_groupby(df, 'first_careunit', ['los'])
+    icu_stats = icu_stats.sort_values('mean', ascending=False)
+    print("\n[ICU별 재원기간 통계 (가중, population = 추정 전체 입실 수)]")
+    print(icu_stats.round(2))
+    
+    overall = {
+        'mean': weighted_mean(df['los'], w),
+        'median': weighted_quantile(df['los'], w, 0.5),
+        'q1': weighted_quantile(df['los'], w, 0.25),
+        'q3': weighted_quantile(df['los'], w, 0.75),
+    }
+    dead = (df['hospital_expire_flag'] == 1).values
+    mortality = {
+        'hospital_death_los_mean': weighted_mean(df['los'][dead], w[dead]),
+        'survival_los_mean': weighted_mean(df['los'][~dead], w[~dead]),
+        'mortality_rate': weighted_rate(dead, w) * 100,
+    }
+    
+    print("\n[전체 재원기간 (가중)]")
+    print(f"  평균: {overall['mean']:.2f}일 (샘플 {df['los'].mean():.2f}일)")
+    print(f"  중앙값: {overall['median']:.2f}일 (샘플 {df['los'].median():.2f}일)")
+    print("\n[사망률 (가중)]")
+    print(f"  병원 내 사망률: {mortality['mortality_rate']:.1f}% "
+          f"(샘플 {df['hospital_expire_flag'].mean() * 100:.1f}%)")
+    print(f"  사망 평균 재원기간: {mortality['hospital_death_los_mean']:.2f}일, "
+          f"생존: {mortality['survival_los_mean']:.2f}일")
+    
+    return {
+        'effective_sample_size': effective_sample_size(w),
+        'overall_los': overall,
+        'icu_statistics': icu_stats.to_dict('index'),
+        'mortality_analysis': mortality,
+    }
+
+def save_results(df, icu_stats, test_results, weighted=None):
+    """분석 결과 저장 (weighted: --weighted 가중 추정 결과)"""
     base_path = Path.cwd()
     data_path = base_path / 'analysis_icu_los/data'
     
@@ -303,6 +363,8 @@ def save_results(df, icu_stats, test_results):
             'mortality_rate': float(df['hospital_expire_flag'].mean() * 100)
         }
     }
+    if weighted is not None:
+        results['population_weighted'] = weighted
     
     # JSON으로 저장
     with open(data_path / 'results.json', 'w', encoding='utf-8') as f:
@@ -310,8 +372,16 @@ def save_results(df, icu_stats, test_results):
     
     print("\n✓ 분석 결과가 results.json에 저장되었습니다.")
 
+def parse_args():
+    """명령행 인자 파싱"""
+    parser = argparse.ArgumentParser(description='ICU별 재원기간 종합 분석')
+    parser.add_argument('--weighted', action='store_true',
+                        help='샘플링 가중치로 전체 코호트 기준 추정도 함께 계산 (sampled_ids.csv 필요)')
+    return parser.parse_args()
+
 def main():
     """메인 분석 실행"""
+    args = parse_args()
     print("\n" + "=" * 60)
     print("ICU별 재원기간 종합 분석 시작")
     print("=" * 60)
@@ -324,12 +394,13 @@ def main():
     icu_stats = analyze_icu_statistics(df)
     mortality_los, icu_mortality = analyze_mortality_relationship(df)
     test_results = perform_statistical_tests(df)
+    weighted = analyze_weighted_estimates(df) if args.weighted else None
     
     # 시각화 생성
     create_visualizations(df, icu_stats)
     
     # 결과 저장
-    save_results(df, icu_stats, test_results)
+    save_results(df, icu_stats, test_results, weighted)
     
     print("\n" + "=" * 60)
     print("분석 완료!")
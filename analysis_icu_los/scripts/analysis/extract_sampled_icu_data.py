@@ -5,9 +5,15 @@
 
 import pandas as pd
 import numpy as np
+import sys
 from pathlib import Path
 import json
 
+# 공용 유틸리티 (프로젝트 루트의 mimic_utils)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from mimic_utils.table_cache import load_table
+from mimic_utils.schema import drop_unused_categories, read_csv_typed
+
 def extract_sampled_icu_data():
     """샘플링된 환자들의 ICU 데이터를 추출하고 저장"""
     
@@ -20,19 +26,19 @@ def extract_sampled_icu_data():
     
     # 1. 샘플링된 입원 데이터 로드
     print("\n1. 샘플링된 데이터 로딩...")
-    admissions = pd.read_csv(base_path / 'processed_data/core/admissions_sampled.csv')
-    patients = pd.read_csv(base_path / 'processed_data/core/patients_sampled.csv')
+    admissions = read_csv_typed(base_path / 'processed_data/core/admissions_sampled.csv', 'core/admissions')
+    patients = read_csv_typed(base_path / 'processed_data/core/patients_sampled.csv', 'core/patients')
     
     print(f"   - 입원 건수: {len(admissions):,}")
     print(f"   - 환자 수: {len(patients):,}")
     
     # 2. 원본 ICU 데이터에서 샘플링된 환자 추출
     print("\n2. ICU 데이터에서 샘플링된 환자 추출...")
-    icustays = pd.read_csv(base_path / 'dataset2/icu/icustays.csv')
+    icustays = load_table('icu/icustays', base_path=base_path)
     
     # 샘플링된 입원 ID로 필터링
     hadm_ids = admissions['hadm_id'].unique()
-    sampled_icu = icustays[icustays['hadm_id'].isin(hadm_ids)].copy()
+    sampled_icu = drop_unused_categories(icustays[icustays['hadm_id'].isin(hadm_ids)].copy())
     
     print(f"   - 전체 ICU 입실: {len(icustays):,}")
     print(f"   - 샘플링된 ICU 입실: {len(sampled_icu):,}")
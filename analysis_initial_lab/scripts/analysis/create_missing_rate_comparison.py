@@ -2,12 +2,17 @@
 """
 시간 윈도우 적용 전후 결측률 비교 시각화
 검사별로 결측률이 얼마나 감소했는지 보여주는 그래프 생성
+
+사용법:
+    python create_missing_rate_comparison.py                  # 추출 통계 JSON 2개 비교
+    python create_missing_rate_comparison.py --sweep first_24h  # sweep_lab_windows.py 결과에서 Day 0 vs 지정 윈도우
 """
 
 import pandas as pd
 import numpy as np
 import os
 import json
+import argparse
 import matplotlib.pyplot as plt
 import seaborn as sns
 import platform
@@ -41,6 +46,20 @@ def load_data():
     
     return stats_day0, stats_window
 
+def load_sweep_data(window, base_window='day0'):
+    """sweep_lab_windows.py 결측률 표에서 두 윈도우를 통계 JSON과 같은 형태로 변환"""
+    print(f"윈도우 민감도 결과 로딩 중... ({base_window} vs {window})")
+
+    missing_df = pd.read_csv(os.path.join(DATA_PATH, 'window_sweep_missing_rate.csv'), index_col='lab_name')
+    for col in (base_window, window):
+        if col not in missing_df.columns:
+            raise ValueError(f"window_sweep_missing_rate.csv에 '{col}' 윈도우가 없습니다: {list(missing_df.columns)}")
+
+    def to_stats(col):
+        return {'lab_statistics': {lab: {'missing_pct': pct} for lab, pct in missing_df[col].items()}}
+
+    return to_stats(base_window), to_stats(window)
+
 def prepare_comparison_data(stats_day0, stats_window):
     """비교 데이터 준비"""
     comparison_data = []
@@ -251,8 +270,16 @@ def main():
     print("📊 시간 윈도우 결측률 개선 시각화")
     print("="*60)
     
+    parser = argparse.ArgumentParser(description='시간 윈도우 결측률 개선 시각화')
+    parser.add_argument('--sweep', metavar='WINDOW',
+                        help='sweep_lab_windows.py 결과에서 Day 0과 비교할 윈도우 (예: day_pm1, first_24h)')
+    args = parser.parse_args()
+
     # 1. 데이터 로드
-    stats_day0, stats_window = load_data()
+    if args.sweep:
+        stats_day0, stats_window = load_sweep_data(args.sweep)
+    else:
+        stats_day0, stats_window = load_data()
     
     # 2. 비교 데이터 준비
     df = prepare_comparison_data(stats_day0, stats_window)
@@ -5,16 +5,33 @@
 - 87개 모든 inclusion=1 항목 포함
 - 데이터 없어도 컬럼 생성 (NaN)
 - 컬럼명: label(itemid) 형식
+
+사용법:
+    python extract_labs_all_itemids.py              # CSV 저장
+    python extract_labs_all_itemids.py --sparse     # wide 테이블을 희소 형식(.npz)으로도 저장
+    python extract_labs_all_itemids.py --workers 8  # subject_id 샤드 8개 프로세스 (0이면 CPU 코어 수)
+    python extract_labs_all_itemids.py --stream     # labevents_sampled.csv 없이 원본 labevents.csv 스트리밍
 """
 
 import pandas as pd
-import numpy as np
 import os
 import json
-from datetime import datetime, timedelta
+import sys
+from pathlib import Path
+from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+# 공용 유틸리티 (프로젝트 루트의 mimic_utils)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from mimic_utils.lab_window import select_initial_labs, build_offset_info
+from mimic_utils.schema import read_csv_typed
+from mimic_utils.event_time import add_time_keys
+from mimic_utils.wide_format import build_wide_format
+from mimic_utils.sharded_extract import run_sharded, workers_from_argv
+from mimic_utils.streaming_labs import stream_initial_labs
+from mimic_utils.sparse_labs import save_sparse_wide, sparse_path
+
 # 설정
 BASE_PATH = '/Users/hyungjun/Desktop/fast campus_lecture'
 FIGURE_PATH = os.path.join(BASE_PATH, 'analysis_initial_lab/figures')
@@ -80,27 +97,28 @@ def create_all_lab_items():
     
     return LAB_ITEMS, LAB_METADATA
 
-def load_data():
-    """데이터 로드"""
+def load_data(stream=False):
+    """데이터 로드 (stream=True면 검사 데이터는 추출 단계에서 원본을 직접 읽음)"""
     print("\n2. 데이터 로딩 중...")
     
     # 입원 데이터 (1,200건)
-    admissions = pd.read_csv(os.path.join(BASE_PATH, 'processed_data/core/admissions_sampled.csv'))
-    admissions['admittime'] = pd.to_datetime(admissions['admittime'])
-    admissions['admit_date'] = pd.to_datetime(admissions['admittime']).dt.date
+    admissions = read_csv_typed(os.path.join(BASE_PATH, 'processed_data/core/admissions_sampled.csv'), 'core/admissions')
+    add_time_keys(admissions, 'admittime', 'admit')
     
     # 환자 데이터
-    patients = pd.read_csv(os.path.join(BASE_PATH, 'processed_data/core/patients_sampled.csv'))
+    patients = read_csv_typed(os.path.join(BASE_PATH, 'processed_data/core/patients_sampled.csv'), 'core/patients')
     
     # 검사 데이터
-    labevents = pd.read_csv(os.path.join(BASE_PATH, 'processed_data/hosp/labevents_sampled.csv'))
-    labevents['charttime'] = pd.to_datetime(labevents['charttime'])
-    labevents['chart_date'] = pd.to_datetime(labevents['charttime']).dt.date
+    labevents = None
+    if not stream:
+        labevents = read_csv_typed(os.path.join(BASE_PATH, 'processed_data/hosp/labevents_sampled.csv'), 'hosp/labevents')
+        add_time_keys(labevents, 'charttime', 'chart')
     
     print(f"✅ 데이터 로드 완료")
     print(f"   - 입원: {len(admissions):,}건")
     print(f"   - 환자: {len(patients):,}명")
-    print(f"   - 전체 검사: {len(labevents):,}건")
+    if labevents is not None:
+        print(f"   - 전체 검사: {len(labevents):,}건")
     
     return admissions, patients, labevents
 
@@ -110,104 +128,38 @@ def extract_labs_all_itemids(admissions, labevents, LAB_ITEMS):
     print("   - 모든 87개 itemid 처리")
     print("   - 우선순위: 입원 당일 > 입원 전일 > 입원 익일")
     
-    # inclusion=1 itemid만 필터링
     lab_itemids = list(LAB_ITEMS.keys())
-    labevents_filtered = labevents[labevents['itemid'].isin(lab_itemids)].copy()
+    
+    if labevents is None:
+        # --stream: 원본 labevents.csv를 청크로 읽으며 코호트/itemid 필터와 선택을 한 번에
+        long_df, stream_stats = stream_initial_labs(admissions, LAB_ITEMS, base_path=BASE_PATH)
+        n_filtered = stream_stats['rows_kept']
+        available_itemids = stream_stats['itemids']
+        print(f"   - 원본 스트리밍: {stream_stats['rows_read']:,}건, {stream_stats['chunks']}개 청크")
+    else:
+        # inclusion=1 itemid만 필터링
+        labevents_filtered = labevents[labevents['itemid'].isin(lab_itemids)].copy()
+        n_filtered = len(labevents_filtered)
+        available_itemids = set(labevents_filtered['itemid'].unique())
     
     # 실제 데이터가 있는 itemid 확인
-    available_itemids = set(labevents_filtered['itemid'].unique())
     missing_itemids = set(lab_itemids) - available_itemids
     
-    print(f"   - 필터링된 검사: {len(labevents_filtered):,}건")
+    print(f"   - 필터링된 검사: {n_filtered:,}건")
     print(f"   - 데이터가 있는 itemid: {len(available_itemids)}개")
     print(f"   - 데이터가 없는 itemid: {len(missing_itemids)}개 (컬럼은 생성됨)")
     
-    results = []
-    source_tracking = []
-    
-    total_admissions = len(admissions)
+    if labevents is not None:
+        # (subject_id, 입원일) 조인 기반 일괄 선택 (Day 0 > Day -1 > Day +1)
+        # --workers N: subject_id 샤드별 병렬 실행 (결과는 직렬 실행과 동일)
+        workers = workers_from_argv()
+        if workers > 1:
+            print(f"   - 병렬 실행: {workers}개 프로세스 (subject_id 샤딩)")
+        long_df = run_sharded(select_initial_labs, admissions, labevents_filtered, LAB_ITEMS,
+                              workers=workers)
     
-    for idx, admission in admissions.iterrows():
-        if idx % 100 == 0:
-            print(f"   - 처리 중: {idx}/{total_admissions}")
-            
-        hadm_id = admission['hadm_id']
-        subject_id = admission['subject_id']
-        admit_date = pd.to_datetime(admission['admit_date']).date()
-        
-        # 3일 윈도우 날짜 계산
-        date_minus1 = admit_date - timedelta(days=1)
-        date_plus1 = admit_date + timedelta(days=1)
-        
-        # 각 날짜별 검사 추출
-        labs_day0 = labevents_filtered[
-            ((labevents_filtered['hadm_id'] == hadm_id) | 
-             (labevents_filtered['subject_id'] == subject_id)) & 
-            (labevents_filtered['chart_date'] == admit_date)
-        ].copy()
-        labs_day0['day_offset'] = 0
-        
-        labs_day_minus1 = labevents_filtered[
-            (labevents_filtered['subject_id'] == subject_id) & 
-            (labevents_filtered['chart_date'] == date_minus1)
-        ].copy()
-        labs_day_minus1['day_offset'] = -1
-        
-        labs_day_plus1 = labevents_filtered[
-            ((labevents_filtered['hadm_id'] == hadm_id) | 
-             (labevents_filtered['subject_id'] == subject_id)) & 
-            (labevents_filtered['chart_date'] == date_plus1)
-        ].copy()
-        labs_day_plus1['day_offset'] = 1
-        
-        # 모든 87개 itemid에 대해 처리
-        for itemid, lab_name in LAB_ITEMS.items():
-            # 우선순위 1: 입원 당일
-            lab_data = labs_day0[labs_day0['itemid'] == itemid]
-            selected_day = 0
-            
-            # 우선순위 2: 입원 전일
-            if len(lab_data) == 0:
-                lab_data = labs_day_minus1[labs_day_minus1['itemid'] == itemid]
-                selected_day = -1
-            
-            # 우선순위 3: 입원 익일
-            if len(lab_data) == 0:
-                lab_data = labs_day_plus1[labs_day_plus1['itemid'] == itemid]
-                selected_day = 1
-            
-            # 데이터가 있으면 첫 번째 값 사용
-            if len(lab_data) > 0:
-                first_lab = lab_data.iloc[0]
-                results.append({
-                    'hadm_id': hadm_id,
-                    'subject_id': subject_id,
-                    'admit_date': admit_date,
-                    'itemid': itemid,
-                    'lab_name': lab_name,
-                    'charttime': first_lab['charttime'],
-                    'chart_date': first_lab['chart_date'],
-                    'valuenum': first_lab['valuenum'],
-                    'value': first_lab.get('value', ''),
-                    'valueuom': first_lab.get('valueuom', ''),
-                    'flag': first_lab.get('flag', ''),
-                    'ref_range_lower': first_lab.get('ref_range_lower', np.nan),
-                    'ref_range_upper': first_lab.get('ref_range_upper', np.nan),
-                    'day_offset': selected_day
-                })
-                
-                # 데이터 출처 추적
-                source_tracking.append({
-                    'hadm_id': hadm_id,
-                    'itemid': itemid,
-                    'lab_name': lab_name,
-                    'day_offset': selected_day,
-                    'source': 'Day-1' if selected_day == -1 else ('Day0' if selected_day == 0 else 'Day+1')
-                })
-    
-    # Long format DataFrame 생성
-    long_df = pd.DataFrame(results) if results else pd.DataFrame()
-    source_df = pd.DataFrame(source_tracking) if source_tracking else pd.DataFrame()
+    # 데이터 출처 추적
+    source_df = build_offset_info(long_df)
     
     print(f"\n✅ 시간 윈도우 검사 추출 완료")
     print(f"   - 추출된 검사 레코드: {len(long_df):,}건")
@@ -230,40 +182,13 @@ def create_wide_format_all_itemids(admissions, long_df, LAB_ITEMS):
     print("\n4. Wide format 변환 중 (모든 87개 itemid 컬럼 생성)...")
     
     # 모든 입원으로 시작
-    wide_df = admissions[['hadm_id', 'subject_id', 'admittime', 'hospital_expire_flag']].copy()
-    wide_df['admit_date'] = pd.to_datetime(wide_df['admittime']).dt.date
+    base_df = admissions[['hadm_id', 'subject_id', 'admittime', 'hospital_expire_flag']].copy()
+    base_df['admit_date'] = base_df['admittime'].dt.normalize()
     
-    # 1. 먼저 모든 87개 컬럼을 NaN으로 초기화
-    for itemid, lab_name in LAB_ITEMS.items():
-        wide_df[lab_name] = np.nan
-        wide_df[f"{lab_name}_day_offset"] = np.nan
-    
-    # 2. 실제 데이터가 있는 경우 값 채우기
-    if not long_df.empty:
-        # 검사 값 pivot
-        pivot_df = long_df.pivot_table(
-            index='hadm_id',
-            columns='lab_name',
-            values='valuenum',
-            aggfunc='first'
-        )
-        
-        # day_offset pivot
-        offset_pivot = long_df.pivot_table(
-            index='hadm_id',
-            columns='lab_name',
-            values='day_offset',
-            aggfunc='first'
-        )
-        
-        # 실제 데이터로 업데이트
-        for hadm_id in pivot_df.index:
-            if hadm_id in wide_df['hadm_id'].values:
-                idx = wide_df[wide_df['hadm_id'] == hadm_id].index[0]
-                for col in pivot_df.columns:
-                    wide_df.loc[idx, col] = pivot_df.loc[hadm_id, col]
-                    if col in offset_pivot.columns:
-                        wide_df.loc[idx, f"{col}_day_offset"] = offset_pivot.loc[hadm_id, col]
+    # 87개 검사 값 + day_offset 컬럼을 float32 블록 하나로 생성 후 hadm_id 기준으로 한 번에 채우기
+    # (검사마다 값, {검사}_day_offset 순서)
+    wide_df, _ = build_wide_format(base_df, long_df, list(LAB_ITEMS.values()),
+                                   value_cols={'valuenum': '', 'day_offset': '_day_offset'})
     
     print(f"✅ Wide format 변환 완료")
     
@@ -308,6 +233,16 @@ def save_results(long_df, wide_df, source_df, LAB_ITEMS, LAB_METADATA):
     wide_df.to_csv(os.path.join(DATA_PATH, 'labs_all_itemids_wide.csv'), index=False)
     source_df.to_csv(os.path.join(DATA_PATH, 'labs_all_itemids_sources.csv'), index=False)
     
+    # 희소 형식 (검사 값 + day_offset 컬럼 중 값이 있는 칸만 저장)
+    if '--sparse' in sys.argv[1:]:
+        wide_path = os.path.join(DATA_PATH, 'labs_all_itemids_wide.csv')
+        base_cols = ['hadm_id', 'subject_id', 'admittime', 'hospital_expire_flag', 'admit_date']
+        sparse_info = save_sparse_wide(sparse_path(wide_path), wide_df,
+                                       [col for col in wide_df.columns if col not in base_cols])
+        print(f"   - labs_all_itemids_wide.npz: 값 {sparse_info['stored_values']:,}칸 "
+              f"(밀도 {sparse_info['density']*100:.1f}%, {sparse_info['file_mb']:.2f} MB, "
+              f"CSV {os.path.getsize(wide_path) / 1024**2:.2f} MB)")
+    
     # 메타데이터 생성
     lab_columns = [col for col in wide_df.columns if col not in ['hadm_id', 'subject_id', 'admittime', 'hospital_expire_flag', 'admit_date'] and '_day_offset' not in col]
     
@@ -407,7 +342,7 @@ def main():
     LAB_ITEMS, LAB_METADATA = create_all_lab_items()
     
     # 2. 데이터 로드
-    admissions, patients, labevents = load_data()
+    admissions, patients, labevents = load_data(stream='--stream' in sys.argv[1:])
     
     # 3. 모든 itemid에 대해 시간 윈도우 적용하여 추출
     long_df, source_df = extract_labs_all_itemids(admissions, labevents, LAB_ITEMS)
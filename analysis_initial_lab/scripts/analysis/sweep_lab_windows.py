@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+시간 윈도우 민감도 분석 - 여러 윈도우를 한 번에 평가
+- Day 0, Day ±1, Day ±2, 입원 후 6/12/24/48시간 윈도우의 커버리지와 결측률을 함께 계산
+- 윈도우마다 추출을 다시 실행하지 않고, 검사 인덱스를 한 번 만들어 한 번만 조회
+- 결과 표는 create_missing_rate_comparison.py --sweep 에서 그대로 사용
+"""
+
+import pandas as pd
+import numpy as np
+import os
+import json
+import sys
+from pathlib import Path
+import matplotlib.pyplot as plt
+from datetime import datetime
+import warnings
+warnings.filterwarnings('ignore')
+
+# 공용 유틸리티 (프로젝트 루트의 mimic_utils)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from mimic_utils.lab_window import sweep_lab_windows, SWEEP_WINDOWS
+from mimic_utils.time_index import SubjectTimeIndex
+from mimic_utils.schema import read_csv_typed
+from mimic_utils.event_time import add_time_keys
+
+# 설정
+BASE_PATH = '/Users/hyungjun/Desktop/fast campus_lecture'
+FIGURE_PATH = os.path.join(BASE_PATH, 'analysis_initial_lab/figures')
+DATA_PATH = os.path.join(BASE_PATH, 'analysis_initial_lab/data')
+
+# 폴더 생성
+os.makedirs(FIGURE_PATH, exist_ok=True)
+os.makedirs(DATA_PATH, exist_ok=True)
+
+def create_lab_items():
+    """inclusion=1 itemid별 컬럼명 (extract_labs_all_itemids.py와 동일한 label_itemid 형식)"""
+    print("1. inclusion=1 검사 항목 로딩 중...")
+
+    inclusion_df = pd.read_csv(os.path.join(BASE_PATH, 'processed_data/hosp/d_labitems_inclusion.csv'))
+    included_labs = inclusion_df[inclusion_df['inclusion'] == 1]
+
+    LAB_ITEMS = {}
+    for itemid, label in zip(included_labs['itemid'], included_labs['label']):
+        clean_label = (label
+                      .replace(' ', '_')
+                      .replace(',', '_')
+                      .replace('(', '')
+                      .replace(')', ''))
+        LAB_ITEMS[itemid] = f"{clean_label}_{itemid}"
+
+    print(f"✅ {len(LAB_ITEMS)}개 검사 항목")
+    return LAB_ITEMS
+
+def load_data():
+    """데이터 로드"""
+    print("\n2. 데이터 로딩 중...")
+
+    admissions = read_csv_typed(os.path.join(BASE_PATH, 'processed_data/core/admissions_sampled.csv'), 'core/admissions')
+    add_time_keys(admissions, 'admittime', 'admit')
+
+    labevents = read_csv_typed(os.path.join(BASE_PATH, 'processed_data/hosp/labevents_sampled.csv'), 'hosp/labevents')
+    add_time_keys(labevents, 'charttime', 'chart')
+
+    print(f"✅ 데이터 로드 완료")
+    print(f"   - 입원: {len(admissions):,}건")
+    print(f"   - 전체 검사: {len(labevents):,}건")
+
+    return admissions, labevents
+
+def run_sweep(admissions, labevents, LAB_ITEMS):
+    """모든 윈도우를 한 번에 평가"""
+    print("\n3. 윈도우 민감도 분석 중...")
+    print(f"   - 윈도우: {', '.join(name for name, _, _, _ in SWEEP_WINDOWS)}")
+
+    # 추출 결과와 같은 기준: 수치(valuenum)가 있는 검사만 관측으로 셈
+    labevents_filtered = labevents[labevents['itemid'].isin(LAB_ITEMS.keys())
+                                   & labevents['valuenum'].notna()].reset_index(drop=True)
+    time_index = SubjectTimeIndex.from_frame(labevents_filtered, sec_col='chart_sec')
+
+    coverage_df, missing_df = sweep_lab_windows(admissions, labevents_filtered, LAB_ITEMS,
+                                                windows=SWEEP_WINDOWS, time_index=time_index)
+
+    total = len(admissions)
+    print(f"\n### 윈도우별 커버리지 ({total:,}개 입원 기준)")
+    print("-" * 70)
+    print(f"{'윈도우':<12} | {'검사 있음':<18} | {'검사 없음':<18} | {'평균 결측률'}")
+    print("-" * 70)
+    for _, row in coverage_df.iterrows():
+        print(f"{row['window']:<12} | "
+              f"{row['anchors_with_labs']:>5}건 ({row['coverage_pct']:>5.1f}%) | "
+              f"{row['anchors_without_labs']:>5}건 ({100 - row['coverage_pct']:>5.1f}%) | "
+              f"{row['mean_missing_pct']:>5.1f}%")
+
+    return coverage_df, missing_df
+
+def create_sweep_visualization(coverage_df, missing_df):
+    """윈도우별 커버리지와 검사별 결측률 분포"""
+    print("\n4. 시각화 생성 중...")
+
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
+
+    # 1. 윈도우별 커버리지 / 평균 결측률
+    x = np.arange(len(coverage_df))
+    width = 0.35
+    ax1.bar(x - width/2, coverage_df['coverage_pct'], width, label='Admissions with any lab (%)', color='#2E86AB')
+    ax1.bar(x + width/2, coverage_df['mean_missing_pct'], width, label='Mean missing rate (%)', color='#A23B72')
+    ax1.set_xticks(x)
+    ax1.set_xticklabels(coverage_df['window'], rotation=30)
+    ax1.set_ylabel('%')
+    ax1.set_ylim(0, 105)
+    ax1.set_title('Coverage by window')
+    ax1.legend()
+    ax1.grid(axis='y', alpha=0.3)
+
+    # 2. 검사별 결측률 분포
+    ax2.boxplot([missing_df[col].values for col in missing_df.columns], labels=missing_df.columns)
+    ax2.set_ylabel('Missing rate per lab (%)')
+    ax2.set_title('Per-lab missing rate by window')
+    ax2.tick_params(axis='x', rotation=30)
+    ax2.grid(axis='y', alpha=0.3)
+
+    plt.tight_layout()
+
+    output_path = os.path.join(FIGURE_PATH, 'window_sweep_coverage.png')
+    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    print(f"✅ 시각화 저장: {output_path}")
+    plt.show()
+
+def save_results(coverage_df, missing_df):
+    """결과 저장"""
+    print("\n5. 결과 저장 중...")
+
+    coverage_df.to_csv(os.path.join(DATA_PATH, 'window_sweep_coverage.csv'), index=False)
+    missing_df.to_csv(os.path.join(DATA_PATH, 'window_sweep_missing_rate.csv'))
+
+    summary = {
+        'analysis_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'windows': [
+            {'name': name, 'unit': unit, 'start': start, 'end': end}
+            for name, unit, start, end in SWEEP_WINDOWS
+        ],
+        'coverage': coverage_df.to_dict('records'),
+    }
+    with open(os.path.join(DATA_PATH, 'window_sweep_summary.json'), 'w') as f:
+        json.dump(summary, f, indent=2, default=float)
+
+    print(f"✅ 저장 완료")
+    print(f"   - window_sweep_coverage.csv: {len(coverage_df)}개 윈도우")
+    print(f"   - window_sweep_missing_rate.csv: {missing_df.shape[0]}개 검사 × {missing_df.shape[1]}개 윈도우")
+    print(f"   - window_sweep_summary.json")
+
+def main():
+    """메인 실행 함수"""
+    print("\n" + "="*80)
+    print("🔍 시간 윈도우 민감도 분석 (한 번의 조회로 모든 윈도우 평가)")
+    print("="*80)
+
+    LAB_ITEMS = create_lab_items()
+    admissions, labevents = load_data()
+    coverage_df, missing_df = run_sweep(admissions, labevents, LAB_ITEMS)
+    create_sweep_visualization(coverage_df, missing_df)
+    save_results(coverage_df, missing_df)
+
+    print("\n" + "="*80)
+    print("✅ 분석 완료!")
+    print("="*80)
+
+if __name__ == "__main__":
+    main()
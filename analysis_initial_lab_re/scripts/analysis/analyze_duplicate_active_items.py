@@ -9,10 +9,17 @@ import pandas as pd
 import numpy as np
 import json
 import os
+import sys
+from pathlib import Path
 import matplotlib.pyplot as plt
 import seaborn as sns
 import platform
 
+# 공용 유틸리티 (프로젝트 루트의 mimic_utils)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from mimic_utils.schema import read_csv_typed
+from mimic_utils.lab_timeline import open_lab_timeline
+
 # 한글 폰트 설정
 if platform.system() == 'Darwin':
     plt.rcParams['font.family'] = 'AppleGothic'
@@ -41,14 +48,17 @@ def load_data():
     labs_long = pd.read_csv(os.path.join(DATA_PATH, 'labs_initial_long.csv'))
     
     # 원본 labevents (더 많은 데이터)
-    labevents = pd.read_csv(os.path.join(BASE_PATH, 'processed_data/hosp/labevents_sampled.csv'))
+    labevents = read_csv_typed(os.path.join(BASE_PATH, 'processed_data/hosp/labevents_sampled.csv'), 'hosp/labevents')
+    
+    # 환자별 검사 타임라인 (입원 단위 조회용, memory-map)
+    lab_timeline = open_lab_timeline('processed_data/hosp/labevents_sampled.csv', base_path=BASE_PATH)
     
     print(f"✅ 데이터 로드 완료")
     print(f"   - 검사 항목: {len(items_df)}개")
     print(f"   - 추출된 검사: {len(labs_long):,}건")
     print(f"   - 전체 검사: {len(labevents):,}건")
     
-    return items_df, labs_long, labevents
+    return items_df, labs_long, labevents, lab_timeline
 
 def find_duplicate_active_labels(items_df):
     """같은 라벨에 여러 활성 itemid가 있는 경우 찾기"""
@@ -84,7 +94,7 @@ def find_duplicate_active_labels(items_df):
     
     return duplicate_active
 
-def analyze_value_differences(duplicate_active, labs_long, labevents):
+def analyze_value_differences(duplicate_active, labs_long, labevents, lab_timeline):
     """같은 라벨의 다른 itemid들 간 값 차이 분석"""
     print("\n" + "="*70)
     print("2. 값 차이 분석")
@@ -130,7 +140,7 @@ def analyze_value_differences(duplicate_active, labs_long, labevents):
         
         # 동일 환자에서 두 itemid 모두 측정된 경우 찾기
         if len(itemids) == 2:
-            check_same_patient_measurements(itemids[0], itemids[1], label, labevents)
+            check_same_patient_measurements(itemids[0], itemids[1], label, labevents, lab_timeline)
         
         # 결과 저장
         for itemid, data in itemid_data.items():
@@ -147,7 +157,7 @@ def analyze_value_differences(duplicate_active, labs_long, labevents):
     
     return pd.DataFrame(analysis_results)
 
-def check_same_patient_measurements(itemid1, itemid2, label, labevents):
+def check_same_patient_measurements(itemid1, itemid2, label, labevents, lab_timeline):
     """동일 환자/입원에서 두 itemid가 모두 측정된 경우 확인"""
     
     # 각 itemid의 환자/입원 목록
@@ -170,9 +180,12 @@ def check_same_patient_measurements(itemid1, itemid2, label, labevents):
             sample_hadm = list(common_hadm)[:3]  # 최대 3개 샘플
             print(f"\n   📝 동일 입원 샘플 비교:")
             
+            # 입원 → 환자, 환자 타임라인에서 해당 입원 검사만 조회 (원본 행 순서)
+            hadm_subject = data1.dropna(subset=['hadm_id']).drop_duplicates('hadm_id').set_index('hadm_id')['subject_id']
             for hadm_id in sample_hadm:
-                vals1 = data1[data1['hadm_id'] == hadm_id]['valuenum'].dropna()
-                vals2 = data2[data2['hadm_id'] == hadm_id]['valuenum'].dropna()
+                subject_id = hadm_subject[hadm_id]
+                vals1 = lab_timeline.labs(subject_id, itemids=[itemid1], hadm_id=hadm_id).sort_values('row')['valuenum'].dropna()
+                vals2 = lab_timeline.labs(subject_id, itemids=[itemid2], hadm_id=hadm_id).sort_values('row')['valuenum'].dropna()
                 
                 if len(vals1) > 0 and len(vals2) > 0:
                     print(f"      입원 {hadm_id}:")
@@ -366,13 +379,13 @@ def main():
     print("🔬 " * 20)
     
     # 데이터 로드
-    items_df, labs_long, labevents = load_data()
+    items_df, labs_long, labevents, lab_timeline = load_data()
     
     # 중복 활성 라벨 찾기
     duplicate_active = find_duplicate_active_labels(items_df)
     
     # 값 차이 분석
-    analysis_df = analyze_value_differences(duplicate_active, labs_long, labevents)
+    analysis_df = analyze_value_differences(duplicate_active, labs_long, labevents, lab_timeline)
     
     # 시간적 패턴 분석
     analyze_temporal_patterns(duplicate_active, labevents)
@@ -10,10 +10,16 @@ import pandas as pd
 import numpy as np
 import json
 import os
+import sys
+from pathlib import Path
 import matplotlib.pyplot as plt
 import seaborn as sns
 import platform
 
+# 공용 유틸리티 (프로젝트 루트의 mimic_utils)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from mimic_utils.schema import read_csv_typed
+
 # 한글 폰트 설정
 if platform.system() == 'Darwin':
     plt.rcParams['font.family'] = 'AppleGothic'
@@ -44,7 +50,7 @@ def load_data():
     
     # 전체 labevents 데이터 (빈도 확인용)
     labevents_path = '/Users/hyungjun/Desktop/fast campus_lecture/processed_data/hosp/labevents_sampled.csv'
-    labevents = pd.read_csv(labevents_path)
+    labevents = read_csv_typed(labevents_path, 'hosp/labevents')
     
     print(f"✅ 데이터 로드 완료")
     
@@ -9,10 +9,18 @@ import pandas as pd
 import numpy as np
 import json
 import os
+import sys
+from pathlib import Path
 import matplotlib.pyplot as plt
 import seaborn as sns
 import platform
 
+# 공용 유틸리티 (프로젝트 루트의 mimic_utils)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from mimic_utils.schema import read_csv_typed
+from mimic_utils.event_time import add_time_keys, SECONDS_PER_DAY
+from mimic_utils.lab_timeline import open_lab_timeline
+
 # 한글 폰트 설정
 if platform.system() == 'Darwin':
     plt.rcParams['font.family'] = 'AppleGothic'
@@ -24,6 +32,7 @@ plt.rcParams['axes.unicode_minus'] = False
 
 # 경로 설정
 BASE_PATH = '/Users/hyungjun/Desktop/fast campus_lecture/analysis_initial_lab_re'
+PROJECT_PATH = os.path.dirname(BASE_PATH)
 DATA_PATH = os.path.join(BASE_PATH, 'data')
 FIGURE_PATH = os.path.join(BASE_PATH, 'figures')
 
@@ -42,23 +51,20 @@ def load_data():
     # 검사 항목 요약
     items_df = pd.read_csv(os.path.join(DATA_PATH, 'lab_items_summary.csv'))
     
-    # 원본 검사 데이터 (Day 0만 추출용)
-    raw_path = '/Users/hyungjun/Desktop/fast campus_lecture/processed_data/hosp/labevents_sampled.csv'
-    labevents = pd.read_csv(raw_path)
-    labevents['charttime'] = pd.to_datetime(labevents['charttime'])
-    labevents['chart_date'] = labevents['charttime'].dt.date
+    # 원본 검사 데이터 (Day 0만 추출용): 환자별 타임라인을 memory-map으로 열기
+    # (처음 실행 또는 labevents_sampled.csv가 바뀐 경우에만 생성)
+    lab_timeline = open_lab_timeline('processed_data/hosp/labevents_sampled.csv', base_path=PROJECT_PATH)
     
     # 입원 데이터
     admissions_path = '/Users/hyungjun/Desktop/fast campus_lecture/processed_data/core/admissions_sampled.csv'
-    admissions = pd.read_csv(admissions_path)
-    admissions['admittime'] = pd.to_datetime(admissions['admittime'])
-    admissions['admit_date'] = admissions['admittime'].dt.date
+    admissions = read_csv_typed(admissions_path, 'core/admissions')
+    add_time_keys(admissions, 'admittime', 'admit')
     
     print(f"✅ 데이터 로드 완료")
     
-    return wide_df, offset_df, items_df, labevents, admissions
+    return wide_df, offset_df, items_df, lab_timeline, admissions
 
-def analyze_day0_only(labevents, admissions, items_df):
+def analyze_day0_only(lab_timeline, admissions, items_df):
     """Day 0만 사용했을 때의 커버리지 분석"""
     print("\n" + "="*70)
     print("1. Day 0만 사용한 경우 분석")
@@ -66,31 +72,26 @@ def analyze_day0_only(labevents, admissions, items_df):
     
     # inclusion=1 itemid만
     included_itemids = items_df['itemid'].tolist()
-    labevents_filtered = labevents[labevents['itemid'].isin(included_itemids)].copy()
-    
-    # Day 0 검사만 추출
-    day0_labs = []
-    
-    for _, admission in admissions.iterrows():
-        hadm_id = admission['hadm_id']
-        subject_id = admission['subject_id']
-        admit_date = pd.to_datetime(admission['admit_date']).date()
-        
-        # Day 0 검사
-        day0_data = labevents_filtered[
-            ((labevents_filtered['hadm_id'] == hadm_id) | 
-             (labevents_filtered['subject_id'] == subject_id)) & 
-            (labevents_filtered['chart_date'] == admit_date)
-        ]
-        
-        if len(day0_data) > 0:
-            day0_labs.append({
-                'hadm_id': hadm_id,
-                'itemids': day0_data['itemid'].unique().tolist(),
-                'lab_count': len(day0_data['itemid'].unique())
-            })
     
-    day0_df = pd.DataFrame(day0_labs)
+    # Day 0 검사만 추출: 입원마다 환자 타임라인에서 [입원일 00:00, 23:59:59] 구간 이진 탐색
+    # (hadm_id는 subject_id에 종속되므로 subject_id 조건만으로 기존 OR 조건과 동일)
+    adm_keys = admissions[['hadm_id', 'subject_id', 'admit_day']].reset_index(drop=True)
+    day_start = adm_keys['admit_day'].values.astype(np.int64) * SECONDS_PER_DAY
+    adm_pos, positions = lab_timeline.query(adm_keys['subject_id'].values,
+                                            day_start, day_start + SECONDS_PER_DAY - 1)
+    
+    keep = np.isin(lab_timeline.columns['itemid'][positions], included_itemids)
+    day0_data = pd.DataFrame({
+        'adm_pos': adm_pos[keep],
+        'row': lab_timeline.index.rows[positions[keep]],
+        'itemid': lab_timeline.columns['itemid'][positions[keep]],
+    }).sort_values(['adm_pos', 'row'])    # 입원 → 원본 행 순서 (기존 조인 결과와 같은 순서)
+    day0_itemids = day0_data.groupby('adm_pos', sort=False)['itemid'].unique()
+    day0_df = pd.DataFrame({
+        'hadm_id': adm_keys['hadm_id'].values[day0_itemids.index],
+        'itemids': [itemids.tolist() for itemids in day0_itemids.values],
+        'lab_count': [len(itemids) for itemids in day0_itemids.values]
+    })
     
     # 통계 계산
     if len(day0_df) > 0:
@@ -350,11 +351,11 @@ def main():
     print("🔍 " * 20)
     
     # 데이터 로드
-    wide_df, offset_df, items_df, labevents, admissions = load_data()
+    wide_df, offset_df, items_df, lab_timeline, admissions = load_data()
     
     # Day 0만 사용 분석
     day0_admissions, day0_coverage, day0_itemid_counts = analyze_day0_only(
-        labevents, admissions, items_df
+        lab_timeline, admissions, items_df
     )
     
     # 시간 윈도우별 기여도
@@ -4,16 +4,31 @@ MIMIC-IV 초기 혈액검사 데이터 추출 스크립트 (정리된 버전)
 - 87개 inclusion=1 itemid 모두 개별 처리
 - offset 정보는 별도 파일로 분리 저장
 - itemid 기반 처리 (중복 라벨 방지)
+
+사용법:
+    python extract_initial_labs_clean.py              # 직렬 실행
+    python extract_initial_labs_clean.py --workers 8  # subject_id 샤드 8개 프로세스 (0이면 CPU 코어 수)
+    python extract_initial_labs_clean.py --stream     # labevents_sampled.csv 없이 원본 labevents.csv 스트리밍
 """
 
 import pandas as pd
-import numpy as np
 import os
 import json
-from datetime import datetime, timedelta
+import sys
+from pathlib import Path
+from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+# 공용 유틸리티 (프로젝트 루트의 mimic_utils)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from mimic_utils.lab_window import select_initial_labs, build_offset_info
+from mimic_utils.schema import read_csv_typed
+from mimic_utils.event_time import add_time_keys
+from mimic_utils.wide_format import build_wide_format
+from mimic_utils.sharded_extract import run_sharded, workers_from_argv
+from mimic_utils.streaming_labs import stream_initial_labs
+
 # 경로 설정
 BASE_PATH = '/Users/hyungjun/Desktop/fast campus_lecture'
 OUTPUT_PATH = os.path.join(BASE_PATH, 'analysis_initial_lab_re')
@@ -80,29 +95,30 @@ def load_inclusion_items():
     
     return LAB_ITEMS, LAB_METADATA
 
-def load_data():
-    """샘플 데이터 로드"""
+def load_data(stream=False):
+    """샘플 데이터 로드 (stream=True면 검사 데이터는 추출 단계에서 원본을 직접 읽음)"""
     print("\n" + "=" * 70)
     print("2. 데이터 로딩")
     print("=" * 70)
     
     # 입원 데이터
-    admissions = pd.read_csv(os.path.join(BASE_PATH, 'processed_data/core/admissions_sampled.csv'))
-    admissions['admittime'] = pd.to_datetime(admissions['admittime'])
-    admissions['admit_date'] = admissions['admittime'].dt.date
+    admissions = read_csv_typed(os.path.join(BASE_PATH, 'processed_data/core/admissions_sampled.csv'), 'core/admissions')
+    add_time_keys(admissions, 'admittime', 'admit')
     
     # 환자 데이터
-    patients = pd.read_csv(os.path.join(BASE_PATH, 'processed_data/core/patients_sampled.csv'))
+    patients = read_csv_typed(os.path.join(BASE_PATH, 'processed_data/core/patients_sampled.csv'), 'core/patients')
     
     # 검사 데이터
-    labevents = pd.read_csv(os.path.join(BASE_PATH, 'processed_data/hosp/labevents_sampled.csv'))
-    labevents['charttime'] = pd.to_datetime(labevents['charttime'])
-    labevents['chart_date'] = labevents['charttime'].dt.date
+    labevents = None
+    if not stream:
+        labevents = read_csv_typed(os.path.join(BASE_PATH, 'processed_data/hosp/labevents_sampled.csv'), 'hosp/labevents')
+        add_time_keys(labevents, 'charttime', 'chart')
     
     print(f"✅ 데이터 로드 완료")
     print(f"   - 입원: {len(admissions):,}건")
     print(f"   - 환자: {len(patients):,}명")
-    print(f"   - 전체 검사: {len(labevents):,}건")
+    if labevents is not None:
+        print(f"   - 전체 검사: {len(labevents):,}건")
     
     return admissions, patients, labevents
 
@@ -112,103 +128,46 @@ def extract_labs_with_window(admissions, labevents, LAB_ITEMS):
     print("3. 시간 윈도우 검사 추출 (Day -1, 0, +1)")
     print("=" * 70)
     
-    # inclusion=1 itemid만 필터링
     lab_itemids = list(LAB_ITEMS.keys())
-    labevents_filtered = labevents[labevents['itemid'].isin(lab_itemids)].copy()
+    total = len(admissions)
     
-    print(f"✅ Inclusion=1 필터링: {len(labevents_filtered):,}건")
+    if labevents is None:
+        # --stream: 원본 labevents.csv를 청크로 읽으며 코호트/itemid 필터와 선택을 한 번에
+        print(f"\n⏳ {total}개 입원, 원본 labevents 스트리밍 중...")
+        selected, stream_stats = stream_initial_labs(admissions, LAB_ITEMS, base_path=BASE_PATH)
+        print(f"✅ Inclusion=1 + 코호트 필터링: {stream_stats['rows_kept']:,}건 "
+              f"(원본 {stream_stats['rows_read']:,}건, {stream_stats['chunks']}개 청크)")
+        available_itemids = stream_stats['itemids']
+    else:
+        # inclusion=1 itemid만 필터링
+        labevents_filtered = labevents[labevents['itemid'].isin(lab_itemids)].copy()
+        print(f"✅ Inclusion=1 필터링: {len(labevents_filtered):,}건")
+        available_itemids = set(labevents_filtered['itemid'].unique())
     
     # 실제 데이터가 있는 itemid 확인
-    available_itemids = set(labevents_filtered['itemid'].unique())
     missing_itemids = set(lab_itemids) - available_itemids
     
     print(f"   - 데이터 있는 itemid: {len(available_itemids)}개")
     print(f"   - 데이터 없는 itemid: {len(missing_itemids)}개")
     
-    results = []
-    offset_info = []
-    
-    total = len(admissions)
-    print(f"\n⏳ {total}개 입원 처리 중...")
-    
-    for idx, admission in admissions.iterrows():
-        if idx % 200 == 0 and idx > 0:
-            print(f"   처리 진행: {idx}/{total} ({idx/total*100:.1f}%)")
-            
-        hadm_id = admission['hadm_id']
-        subject_id = admission['subject_id']
-        admit_date = pd.to_datetime(admission['admit_date']).date()
-        
-        # 3일 윈도우 날짜
-        date_minus1 = admit_date - timedelta(days=1)
-        date_plus1 = admit_date + timedelta(days=1)
+    if labevents is not None:
+        print(f"\n⏳ {total}개 입원 처리 중...")
         
-        # 각 날짜별 검사 데이터
-        labs_by_day = {
-            0: labevents_filtered[
-                ((labevents_filtered['hadm_id'] == hadm_id) | 
-                 (labevents_filtered['subject_id'] == subject_id)) & 
-                (labevents_filtered['chart_date'] == admit_date)
-            ],
-            -1: labevents_filtered[
-                (labevents_filtered['subject_id'] == subject_id) & 
-                (labevents_filtered['chart_date'] == date_minus1)
-            ],
-            1: labevents_filtered[
-                ((labevents_filtered['hadm_id'] == hadm_id) | 
-                 (labevents_filtered['subject_id'] == subject_id)) & 
-                (labevents_filtered['chart_date'] == date_plus1)
-            ]
-        }
-        
-        # 각 itemid별 처리
-        for itemid, lab_name in LAB_ITEMS.items():
-            # 우선순위: Day 0 > Day -1 > Day +1
-            selected_data = None
-            selected_day = None
-            
-            for day in [0, -1, 1]:
-                day_labs = labs_by_day[day]
-                item_labs = day_labs[day_labs['itemid'] == itemid]
-                if len(item_labs) > 0:
-                    selected_data = item_labs.iloc[0]
-                    selected_day = day
-                    break
-            
-            # 데이터가 있으면 저장
-            if selected_data is not None:
-                results.append({
-                    'hadm_id': hadm_id,
-                    'subject_id': subject_id,
-                    'admit_date': admit_date,
-                    'itemid': itemid,
-                    'lab_name': lab_name,
-                    'charttime': selected_data['charttime'],
-                    'chart_date': selected_data['chart_date'],
-                    'valuenum': selected_data['valuenum'],
-                    'value': selected_data.get('value', ''),
-                    'valueuom': selected_data.get('valueuom', ''),
-                    'flag': selected_data.get('flag', ''),
-                    'ref_range_lower': selected_data.get('ref_range_lower', np.nan),
-                    'ref_range_upper': selected_data.get('ref_range_upper', np.nan)
-                })
-                
-                # Offset 정보 별도 저장
-                offset_info.append({
-                    'hadm_id': hadm_id,
-                    'itemid': itemid,
-                    'lab_name': lab_name,
-                    'day_offset': selected_day,
-                    'source': f"Day{selected_day:+d}" if selected_day != 0 else "Day0"
-                })
+        # (subject_id, 입원일) 조인 기반 일괄 선택 (Day 0 > Day -1 > Day +1)
+        # --workers N: subject_id 샤드별 병렬 실행 (결과는 직렬 실행과 동일)
+        workers = workers_from_argv()
+        if workers > 1:
+            print(f"   - 병렬 실행: {workers}개 프로세스 (subject_id 샤딩)")
+        selected = run_sharded(select_initial_labs, admissions, labevents_filtered, LAB_ITEMS,
+                               workers=workers)
+    
+    # DataFrame 생성 (offset 정보는 별도 테이블)
+    long_df = selected.drop(columns='day_offset') if not selected.empty else selected
+    offset_df = build_offset_info(selected)
     
     print(f"\n✅ 추출 완료")
-    print(f"   - 추출된 검사: {len(results):,}건")
-    print(f"   - Offset 정보: {len(offset_info):,}건")
-    
-    # DataFrame 생성
-    long_df = pd.DataFrame(results) if results else pd.DataFrame()
-    offset_df = pd.DataFrame(offset_info) if offset_info else pd.DataFrame()
+    print(f"   - 추출된 검사: {len(long_df):,}건")
+    print(f"   - Offset 정보: {len(offset_df):,}건")
     
     # 데이터 출처 통계
     if not offset_df.empty:
@@ -227,39 +186,14 @@ def create_wide_format(admissions, long_df, LAB_ITEMS):
     print("=" * 70)
     
     # 기본 입원 정보로 시작
-    wide_df = admissions[['hadm_id', 'subject_id', 'admittime', 
+    base_df = admissions[['hadm_id', 'subject_id', 'admittime', 
                           'hospital_expire_flag', 'deathtime']].copy()
-    wide_df['admit_date'] = pd.to_datetime(wide_df['admittime']).dt.date
-    
-    # 모든 87개 검사 컬럼을 NaN으로 초기화
-    print("⏳ 87개 검사 컬럼 초기화 중...")
-    for itemid, lab_name in LAB_ITEMS.items():
-        wide_df[lab_name] = np.nan
+    base_df['admit_date'] = base_df['admittime'].dt.normalize()
     
-    # 실제 데이터로 채우기
-    if not long_df.empty:
-        print("⏳ 실제 검사 데이터 채우기 중...")
-        
-        # Pivot table 생성
-        pivot_df = long_df.pivot_table(
-            index='hadm_id',
-            columns='lab_name',
-            values='valuenum',
-            aggfunc='first'  # 중복 시 첫 번째 값 사용
-        )
-        
-        # Wide format에 병합
-        for hadm_id in pivot_df.index:
-            if hadm_id in wide_df['hadm_id'].values:
-                idx = wide_df[wide_df['hadm_id'] == hadm_id].index[0]
-                for col in pivot_df.columns:
-                    if col in wide_df.columns:
-                        wide_df.loc[idx, col] = pivot_df.loc[hadm_id, col]
-    
-    # 통계 계산
-    lab_columns = [col for col in wide_df.columns 
-                   if col not in ['hadm_id', 'subject_id', 'admittime', 
-                                 'hospital_expire_flag', 'deathtime', 'admit_date']]
+    # 87개 검사 컬럼을 float32 블록 하나로 생성하고 hadm_id 기준으로 한 번에 채우기
+    # (중복 시 첫 번째 값 사용, 데이터 없는 검사도 NaN 컬럼 유지)
+    print("⏳ 87개 검사 컬럼 생성 중...")
+    wide_df, lab_columns = build_wide_format(base_df, long_df, list(LAB_ITEMS.values()))
     
     print(f"\n✅ Wide format 생성 완료")
     print(f"   - 차원: {wide_df.shape[0]} 입원 × {len(lab_columns)} 검사")
@@ -423,7 +357,7 @@ def main():
     LAB_ITEMS, LAB_METADATA = load_inclusion_items()
     
     # 2. 데이터 로드
-    admissions, patients, labevents = load_data()
+    admissions, patients, labevents = load_data(stream='--stream' in sys.argv[1:])
     
     # 3. 시간 윈도우 검사 추출
     long_df, offset_df = extract_labs_with_window(admissions, labevents, LAB_ITEMS)
@@ -3,96 +3,83 @@
 선택적 ItemID 통합 스크립트
 - 안전한 경우만 itemid 통합 (한쪽이 비어있는 경우)
 - 둘 다 활성인 경우는 통합하지 않음
+
+사용법:
+    python extract_initial_labs_merged.py              # CSV 저장
+    python extract_initial_labs_merged.py --sparse     # wide 테이블을 희소 형식(.npz)으로도 저장
+    python extract_initial_labs_merged.py --workers 8  # subject_id 샤드 8개 프로세스 (0이면 CPU 코어 수)
+    python extract_initial_labs_merged.py --stream     # 원본 labevents.csv 스트리밍 (청크마다 itemid 통합)
 """
 
 import pandas as pd
-import numpy as np
 import os
 import json
-from datetime import datetime, timedelta
+import sys
+from pathlib import Path
+from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+# 공용 유틸리티 (프로젝트 루트의 mimic_utils)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from mimic_utils.lab_window import select_initial_labs, build_offset_info
+from mimic_utils.schema import read_csv_typed
+from mimic_utils.event_time import add_time_keys
+from mimic_utils.wide_format import build_wide_format
+from mimic_utils.sharded_extract import run_sharded, workers_from_argv
+from mimic_utils.sparse_labs import save_sparse_wide, sparse_path
+from mimic_utils.streaming_labs import stream_initial_labs
+from mimic_utils.itemid_harmonize import ItemidHarmonizer
+
 # 경로 설정
 BASE_PATH = '/Users/hyungjun/Desktop/fast campus_lecture'
 OUTPUT_PATH = os.path.join(BASE_PATH, 'analysis_initial_lab_re')
 DATA_PATH = os.path.join(OUTPUT_PATH, 'data')
 
 def load_merge_rules():
-    """통합 규칙 로드 및 생성"""
+    """통합 규칙 로드 (규칙 파일 해시 기준 캐시 재사용)"""
     print("=" * 70)
     print("1. 통합 규칙 생성")
     print("=" * 70)
     
-    # 개선 가능 항목 (한쪽이 비어있는 경우)
-    improvable = pd.read_csv(os.path.join(DATA_PATH, 'improvable_items.csv'))
-    
-    # 중복 활성 라벨 (둘 다 데이터 있는 경우)
-    duplicate_active = pd.read_csv(os.path.join(DATA_PATH, 'duplicate_active_labels.csv'))
-    
-    # 통합 불가 라벨 (둘 다 활성)
-    no_merge_labels = set(duplicate_active['label'].tolist())
+    # 개선 가능 항목 (한쪽이 비어있는 경우) + 중복 활성 라벨 (둘 다 데이터 있는 경우 → 통합 불가)
+    harmonizer = ItemidHarmonizer.from_rule_files(
+        os.path.join(DATA_PATH, 'improvable_items.csv'),
+        os.path.join(DATA_PATH, 'duplicate_active_labels.csv'),
+        base_path=BASE_PATH)
+    merge_rules, unsafe_merges = harmonizer.merge_rules, harmonizer.unsafe_merges
     
     print(f"\n📊 분석 결과:")
-    print(f"   - 개선 가능 항목: {len(improvable)}개")
-    print(f"   - 중복 활성 라벨: {len(duplicate_active)}개 (통합 불가)")
-    
-    # 안전한 통합 규칙 생성
-    safe_merge_rules = {}
-    unsafe_merges = []
-    
-    for _, row in improvable.iterrows():
-        label = row['label']
-        
-        # 중복 활성 라벨은 제외
-        if label in no_merge_labels:
-            unsafe_merges.append({
-                'label': label,
-                'reason': '둘 다 활성 (값 차이 존재)'
-            })
-            continue
-        
-        # 빈 itemid들
-        empty_itemids = str(row['empty_itemids']).split(';')
-        # 활성 itemid들
-        active_itemids = str(row['active_itemids']).split(';')
-        
-        # 첫 번째 활성 itemid로 통합
-        target_itemid = int(active_itemids[0])
-        
-        for empty_id in empty_itemids:
-            try:
-                empty_id = int(empty_id)
-                safe_merge_rules[empty_id] = target_itemid
-            except:
-                continue
+    print(f"   - 개선 가능 항목: {harmonizer.summary['improvable_labels']}개")
+    print(f"   - 중복 활성 라벨: {harmonizer.summary['duplicate_active_labels']}개 (통합 불가)")
     
     print(f"\n✅ 통합 규칙 생성 완료:")
-    print(f"   - 안전한 통합: {len(safe_merge_rules)}개 itemid")
+    print(f"   - 안전한 통합: {len(merge_rules)}개 itemid")
     print(f"   - 통합 불가: {len(unsafe_merges)}개 라벨")
+    print(f"   - 규칙 해시: {harmonizer.digest[:16]}")
     
     if unsafe_merges:
         print(f"\n⚠️ 통합 불가 항목:")
         for item in unsafe_merges:
             print(f"   - {item['label']}: {item['reason']}")
     
-    return safe_merge_rules, unsafe_merges
+    return harmonizer
 
-def load_data():
-    """데이터 로드"""
+def load_data(stream=False):
+    """데이터 로드 (stream=True면 검사 데이터는 추출 단계에서 원본을 직접 읽음)"""
     print("\n" + "=" * 70)
     print("2. 데이터 로딩")
     print("=" * 70)
     
     # 입원 데이터
-    admissions = pd.read_csv(os.path.join(BASE_PATH, 'processed_data/core/admissions_sampled.csv'))
-    admissions['admittime'] = pd.to_datetime(admissions['admittime'])
-    admissions['admit_date'] = admissions['admittime'].dt.date
+    admissions = read_csv_typed(os.path.join(BASE_PATH, 'processed_data/core/admissions_sampled.csv'), 'core/admissions')
+    add_time_keys(admissions, 'admittime', 'admit')
     
     # 검사 데이터
-    labevents = pd.read_csv(os.path.join(BASE_PATH, 'processed_data/hosp/labevents_sampled.csv'))
-    labevents['charttime'] = pd.to_datetime(labevents['charttime'])
-    labevents['chart_date'] = labevents['charttime'].dt.date
+    labevents = None
+    if not stream:
+        labevents = read_csv_typed(os.path.join(BASE_PATH, 'processed_data/hosp/labevents_sampled.csv'), 'hosp/labevents')
+        add_time_keys(labevents, 'charttime', 'chart')
     
     # inclusion 정보
     inclusion_df = pd.read_csv(os.path.join(BASE_PATH, 'processed_data/hosp/d_labitems_inclusion.csv'))
@@ -100,46 +87,47 @@ def load_data():
     
     print(f"✅ 데이터 로드 완료")
     print(f"   - 입원: {len(admissions):,}건")
-    print(f"   - 전체 검사: {len(labevents):,}건")
+    if labevents is not None:
+        print(f"   - 전체 검사: {len(labevents):,}건")
     print(f"   - Inclusion=1 항목: {len(included_labs)}개")
     
     return admissions, labevents, included_labs
 
-def apply_merge_rules(labevents, merge_rules):
-    """통합 규칙 적용"""
+def apply_merge_rules(labevents, harmonizer):
+    """통합 규칙 적용 (조회 배열 gather 한 번)"""
     print("\n" + "=" * 70)
     print("3. ItemID 통합 적용")
     print("=" * 70)
     
-    # 원본 백업
-    original_counts = labevents['itemid'].value_counts()
+    # 규칙별 대상 행 수 (bincount 한 번)
+    itemids = labevents['itemid'].values
+    n_original = len(pd.unique(itemids))
+    source_counts = harmonizer.source_counts(itemids)
     
     # 통합 적용
+    harmonizer.apply(labevents)
+    
     merged_count = 0
-    for old_id, new_id in merge_rules.items():
-        mask = labevents['itemid'] == old_id
-        count = mask.sum()
+    for old_id, new_id in harmonizer.merge_rules.items():
+        count = source_counts[old_id]
         if count > 0:
-            labevents.loc[mask, 'itemid'] = new_id
             merged_count += count
             print(f"   - {old_id} → {new_id}: {count}건 통합")
     
-    # 통합 후 통계
-    new_counts = labevents['itemid'].value_counts()
-    
     print(f"\n✅ 통합 완료:")
     print(f"   - 통합된 레코드: {merged_count:,}건")
-    print(f"   - 고유 itemid: {len(original_counts)} → {len(new_counts)}")
+    print(f"   - 고유 itemid: {n_original} → {labevents['itemid'].nunique()}")
     
     return labevents
 
-def create_merged_lab_items(included_labs, merge_rules):
+def create_merged_lab_items(included_labs, harmonizer):
     """통합된 검사 항목 딕셔너리 생성"""
     print("\n" + "=" * 70)
     print("4. 통합된 검사 항목 생성")
     print("=" * 70)
     
     # 통합 대상 itemid들
+    merge_rules = harmonizer.merge_rules
     merged_itemids = set(merge_rules.keys())
     
     LAB_ITEMS = {}
@@ -163,10 +151,9 @@ def create_merged_lab_items(included_labs, merge_rules):
                       .replace('/', '_')
                       .replace('-', '_'))
         
-        # 통합 대상인 경우 표시
-        if itemid in merge_rules.values():
-            # 통합된 itemid 찾기
-            merged_from = [k for k, v in merge_rules.items() if v == itemid]
+        # 통합 대상인 경우 표시 (통합된 itemid는 캐시된 동치류에서)
+        merged_from = harmonizer.merged_from.get(itemid, [])
+        if merged_from:
             unique_label = f"{clean_label}_{itemid}_merged"
         else:
             unique_label = f"{clean_label}_{itemid}"
@@ -178,7 +165,7 @@ def create_merged_lab_items(included_labs, merge_rules):
             'unique_label': unique_label,
             'category': row.get('category', ''),
             'fluid': row.get('fluid', ''),
-            'merged_from': merged_from if itemid in merge_rules.values() else []
+            'merged_from': merged_from
         }
     
     print(f"✅ 통합된 검사 항목: {len(LAB_ITEMS)}개")
@@ -191,92 +178,35 @@ def create_merged_lab_items(included_labs, merge_rules):
     
     return LAB_ITEMS, LAB_METADATA
 
-def extract_labs_with_window(admissions, labevents, LAB_ITEMS):
-    """시간 윈도우 적용하여 검사 추출"""
+def extract_labs_with_window(admissions, labevents, LAB_ITEMS, harmonizer=None):
+    """시간 윈도우 적용하여 검사 추출 (labevents가 None이면 원본 스트리밍 + 청크별 통합)"""
     print("\n" + "=" * 70)
     print("5. 시간 윈도우 검사 추출")
     print("=" * 70)
     
-    # inclusion=1 itemid만 필터링
-    lab_itemids = list(LAB_ITEMS.keys())
-    labevents_filtered = labevents[labevents['itemid'].isin(lab_itemids)].copy()
-    
-    print(f"✅ 필터링: {len(labevents_filtered):,}건")
-    
-    results = []
-    offset_info = []
-    
-    for idx, admission in admissions.iterrows():
-        if idx % 200 == 0 and idx > 0:
-            print(f"   처리 진행: {idx}/{len(admissions)}")
-            
-        hadm_id = admission['hadm_id']
-        subject_id = admission['subject_id']
-        admit_date = pd.to_datetime(admission['admit_date']).date()
+    if labevents is None:
+        # --stream: 원본 labevents.csv를 청크로 읽으며 itemid 통합 → 코호트/itemid 필터 → 선택
+        selected, stream_stats = stream_initial_labs(admissions, LAB_ITEMS, base_path=BASE_PATH,
+                                                     transform=harmonizer.apply)
+        print(f"✅ 필터링: {stream_stats['rows_kept']:,}건 "
+              f"(원본 {stream_stats['rows_read']:,}건, {stream_stats['chunks']}개 청크)")
+    else:
+        # inclusion=1 itemid만 필터링
+        lab_itemids = list(LAB_ITEMS.keys())
+        labevents_filtered = labevents[labevents['itemid'].isin(lab_itemids)].copy()
         
-        # 3일 윈도우
-        date_minus1 = admit_date - timedelta(days=1)
-        date_plus1 = admit_date + timedelta(days=1)
+        print(f"✅ 필터링: {len(labevents_filtered):,}건")
         
-        # 각 날짜별 검사
-        labs_by_day = {
-            0: labevents_filtered[
-                ((labevents_filtered['hadm_id'] == hadm_id) | 
-                 (labevents_filtered['subject_id'] == subject_id)) & 
-                (labevents_filtered['chart_date'] == admit_date)
-            ],
-            -1: labevents_filtered[
-                (labevents_filtered['subject_id'] == subject_id) & 
-                (labevents_filtered['chart_date'] == date_minus1)
-            ],
-            1: labevents_filtered[
-                ((labevents_filtered['hadm_id'] == hadm_id) | 
-                 (labevents_filtered['subject_id'] == subject_id)) & 
-                (labevents_filtered['chart_date'] == date_plus1)
-            ]
-        }
-        
-        # 각 itemid별 처리
-        for itemid, lab_name in LAB_ITEMS.items():
-            selected_data = None
-            selected_day = None
-            
-            # 우선순위: Day 0 > Day -1 > Day +1
-            for day in [0, -1, 1]:
-                day_labs = labs_by_day[day]
-                item_labs = day_labs[day_labs['itemid'] == itemid]
-                if len(item_labs) > 0:
-                    selected_data = item_labs.iloc[0]
-                    selected_day = day
-                    break
-            
-            if selected_data is not None:
-                results.append({
-                    'hadm_id': hadm_id,
-                    'subject_id': subject_id,
-                    'admit_date': admit_date,
-                    'itemid': itemid,
-                    'lab_name': lab_name,
-                    'charttime': selected_data['charttime'],
-                    'chart_date': selected_data['chart_date'],
-                    'valuenum': selected_data['valuenum'],
-                    'value': selected_data.get('value', ''),
-                    'valueuom': selected_data.get('valueuom', ''),
-                    'flag': selected_data.get('flag', ''),
-                    'ref_range_lower': selected_data.get('ref_range_lower', np.nan),
-                    'ref_range_upper': selected_data.get('ref_range_upper', np.nan)
-                })
-                
-                offset_info.append({
-                    'hadm_id': hadm_id,
-                    'itemid': itemid,
-                    'lab_name': lab_name,
-                    'day_offset': selected_day,
-                    'source': f"Day{selected_day:+d}" if selected_day != 0 else "Day0"
-                })
-    
-    long_df = pd.DataFrame(results) if results else pd.DataFrame()
-    offset_df = pd.DataFrame(offset_info) if offset_info else pd.DataFrame()
+        # (subject_id, 입원일) 조인 기반 일괄 선택 (Day 0 > Day -1 > Day +1)
+        # --workers N: subject_id 샤드별 병렬 실행 (결과는 직렬 실행과 동일)
+        workers = workers_from_argv()
+        if workers > 1:
+            print(f"   - 병렬 실행: {workers}개 프로세스 (subject_id 샤딩)")
+        selected = run_sharded(select_initial_labs, admissions, labevents_filtered, LAB_ITEMS,
+                               workers=workers)
+    
+    long_df = selected.drop(columns='day_offset') if not selected.empty else selected
+    offset_df = build_offset_info(selected)
     
     print(f"\n✅ 추출 완료:")
     print(f"   - 검사 레코드: {len(long_df):,}건")
@@ -291,34 +221,12 @@ def create_wide_format(admissions, long_df, LAB_ITEMS):
     print("=" * 70)
     
     # 기본 입원 정보
-    wide_df = admissions[['hadm_id', 'subject_id', 'admittime', 
+    base_df = admissions[['hadm_id', 'subject_id', 'admittime', 
                           'hospital_expire_flag', 'deathtime']].copy()
-    wide_df['admit_date'] = pd.to_datetime(wide_df['admittime']).dt.date
-    
-    # 모든 검사 컬럼 초기화
-    for itemid, lab_name in LAB_ITEMS.items():
-        wide_df[lab_name] = np.nan
-    
-    # 실제 데이터 채우기
-    if not long_df.empty:
-        pivot_df = long_df.pivot_table(
-            index='hadm_id',
-            columns='lab_name',
-            values='valuenum',
-            aggfunc='first'
-        )
-        
-        for hadm_id in pivot_df.index:
-            if hadm_id in wide_df['hadm_id'].values:
-                idx = wide_df[wide_df['hadm_id'] == hadm_id].index[0]
-                for col in pivot_df.columns:
-                    if col in wide_df.columns:
-                        wide_df.loc[idx, col] = pivot_df.loc[hadm_id, col]
-    
-    # 통계
-    lab_columns = [col for col in wide_df.columns 
-                   if col not in ['hadm_id', 'subject_id', 'admittime', 
-                                 'hospital_expire_flag', 'deathtime', 'admit_date']]
+    base_df['admit_date'] = base_df['admittime'].dt.normalize()
+    
+    # 모든 검사 컬럼을 float32 블록으로 생성 후 hadm_id 기준으로 한 번에 채우기
+    wide_df, lab_columns = build_wide_format(base_df, long_df, list(dict.fromkeys(LAB_ITEMS.values())))
     
     print(f"✅ Wide format 생성 완료")
     print(f"   - 차원: {wide_df.shape[0]} × {len(lab_columns)} 검사")
@@ -403,6 +311,14 @@ def save_results(wide_df, long_df, offset_df, merge_rules, unsafe_merges,
     print(f"   - merge_mapping.csv: {len(merge_mapping)} mappings")
     print(f"   - merge_summary.json")
     
+    # 희소 형식 (값이 있는 칸만 저장)
+    if '--sparse' in sys.argv[1:]:
+        wide_path = os.path.join(DATA_PATH, 'labs_initial_merged_wide.csv')
+        sparse_info = save_sparse_wide(sparse_path(wide_path), wide_df, lab_columns)
+        print(f"   - labs_initial_merged_wide.npz: 값 {sparse_info['stored_values']:,}칸 "
+              f"(밀도 {sparse_info['density']*100:.1f}%, {sparse_info['file_mb']:.2f} MB, "
+              f"CSV {os.path.getsize(wide_path) / 1024**2:.2f} MB)")
+    
     return metadata
 
 def main():
@@ -412,19 +328,21 @@ def main():
     print("🔄 " * 20)
     
     # 1. 통합 규칙 생성
-    merge_rules, unsafe_merges = load_merge_rules()
+    harmonizer = load_merge_rules()
+    merge_rules, unsafe_merges = harmonizer.merge_rules, harmonizer.unsafe_merges
     
     # 2. 데이터 로드
-    admissions, labevents, included_labs = load_data()
+    admissions, labevents, included_labs = load_data(stream='--stream' in sys.argv[1:])
     
-    # 3. 통합 규칙 적용
-    labevents = apply_merge_rules(labevents, merge_rules)
+    # 3. 통합 규칙 적용 (스트리밍이면 추출 단계에서 청크마다 적용)
+    if labevents is not None:
+        labevents = apply_merge_rules(labevents, harmonizer)
     
     # 4. 통합된 검사 항목 생성
-    LAB_ITEMS, LAB_METADATA = create_merged_lab_items(included_labs, merge_rules)
+    LAB_ITEMS, LAB_METADATA = create_merged_lab_items(included_labs, harmonizer)
     
     # 5. 시간 윈도우 검사 추출
-    long_df, offset_df = extract_labs_with_window(admissions, labevents, LAB_ITEMS)
+    long_df, offset_df = extract_labs_with_window(admissions, labevents, LAB_ITEMS, harmonizer)
     
     # 6. Wide format 변환
     wide_df, lab_columns = create_wide_format(admissions, long_df, LAB_ITEMS)
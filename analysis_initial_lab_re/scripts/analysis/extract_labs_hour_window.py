@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+시간 단위 윈도우 초기 혈액검사 추출 스크립트
+- 입원(admittime) 또는 ICU 입실(intime) 기준 [시작h, 끝h] 윈도우를 우선순위대로 적용
+- 달력 날짜(Day -1/0/+1) 대신 실제 경과 시간으로 선택 (예: 입실 -6h ~ +24h)
+- subject별 정렬 인덱스에서 이진 탐색으로 조회 → 전체 코호트에서도 빠르게 실행
+- --aggregates 지정 시 윈도우별 first/last/min/max/mean/count/abnormal_count 컬럼 추가
+  (컬럼명: {검사명}_{윈도우}_{집계}, 예: Glucose_50931_0_24h_max)
+
+사용법:
+    python extract_labs_hour_window.py                                   # 입원 기준 기본 윈도우
+    python extract_labs_hour_window.py --anchor icu --window -6 24       # ICU 입실 -6h ~ +24h
+    python extract_labs_hour_window.py --window 0 24 --window -24 0 --select closest
+    python extract_labs_hour_window.py --aggregates first last min max mean count abnormal_count
+    python extract_labs_hour_window.py --workers 8                      # subject_id 샤드 8개 프로세스
+"""
+
+import pandas as pd
+import os
+import json
+import sys
+import argparse
+from pathlib import Path
+from datetime import datetime
+import warnings
+warnings.filterwarnings('ignore')
+
+# 공용 유틸리티 (프로젝트 루트의 mimic_utils)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from mimic_utils.lab_window import (
+    select_window_labs, aggregate_window_labs, pivot_window_aggregates,
+    HOUR_WINDOWS, SELECT_RULES, AGGREGATES
+)
+from mimic_utils.time_index import SubjectTimeIndex, window_label
+from mimic_utils.schema import read_csv_typed
+from mimic_utils.event_time import add_time_keys
+from mimic_utils.wide_format import build_wide_format
+from mimic_utils.sharded_extract import run_sharded
+
+# 경로 설정
+BASE_PATH = '/Users/hyungjun/Desktop/fast campus_lecture'
+OUTPUT_PATH = os.path.join(BASE_PATH, 'analysis_initial_lab_re')
+DATA_PATH = os.path.join(OUTPUT_PATH, 'data')
+
+# 기준 시각 설정: (기준 테이블, 스키마, 기준 시각 컬럼, 식별 컬럼, 출력 파일 접두어)
+ANCHORS = {
+    'admission': ('processed_data/core/admissions_sampled.csv', 'core/admissions',
+                  'admittime', ('hadm_id',), 'labs_hour_window'),
+    'icu': ('processed_data/icu/icustays_sampled.csv', 'icu/icustays',
+            'intime', ('stay_id', 'hadm_id'), 'labs_icu_hour_window'),
+}
+
+os.makedirs(DATA_PATH, exist_ok=True)
+
+def load_inclusion_items():
+    """inclusion=1 검사 항목 로드 (컬럼명: label_itemid)"""
+    print("=" * 70)
+    print("1. INCLUSION=1 검사 항목 로딩")
+    print("=" * 70)
+
+    inclusion_df = pd.read_csv(os.path.join(BASE_PATH, 'processed_data/hosp/d_labitems_inclusion.csv'))
+    included_labs = inclusion_df[inclusion_df['inclusion'] == 1]
+
+    LAB_ITEMS = {}
+    for itemid, label in zip(included_labs['itemid'], included_labs['label']):
+        clean_label = (label
+                      .replace(' ', '_')
+                      .replace(',', '_')
+                      .replace('(', '')
+                      .replace(')', '')
+                      .replace('/', '_')
+                      .replace('-', '_'))
+        LAB_ITEMS[itemid] = f"{clean_label}_{itemid}"
+
+    print(f"✅ {len(LAB_ITEMS)}개 검사 항목 로드 완료")
+    return LAB_ITEMS
+
+def load_data(anchor):
+    """기준 테이블과 검사 데이터 로드"""
+    print("\n" + "=" * 70)
+    print("2. 데이터 로딩")
+    print("=" * 70)
+
+    anchor_file, schema, time_col, _, _ = ANCHORS[anchor]
+    anchors = read_csv_typed(os.path.join(BASE_PATH, anchor_file), schema)
+
+    labevents = read_csv_typed(os.path.join(BASE_PATH, 'processed_data/hosp/labevents_sampled.csv'),
+                               'hosp/labevents')
+    add_time_keys(labevents, 'charttime', 'chart')
+
+    print(f"✅ 데이터 로드 완료")
+    print(f"   - 기준 ({anchor}, {time_col}): {len(anchors):,}건")
+    print(f"   - 전체 검사: {len(labevents):,}건")
+
+    return anchors, labevents
+
+def extract_labs(anchors, labevents, LAB_ITEMS, anchor, windows, select, workers=1):
+    """시간 윈도우 우선순위로 검사 선택"""
+    print("\n" + "=" * 70)
+    print("3. 시간 윈도우 검사 추출")
+    print("=" * 70)
+
+    _, _, time_col, key_cols, _ = ANCHORS[anchor]
+    print(f"   - 기준 시각: {time_col}")
+    print(f"   - 윈도우 우선순위: {' > '.join(window_label(*w) for w in windows)}")
+    print(f"   - 윈도우 내 선택: {select}")
+
+    labevents_filtered = labevents[labevents['itemid'].isin(LAB_ITEMS.keys())].reset_index(drop=True)
+
+    # 병렬 실행 시 시간 인덱스는 샤드마다 워커에서 생성
+    time_index = None
+    if workers > 1:
+        print(f"   - 병렬 실행: {workers}개 프로세스 (subject_id 샤딩)")
+    else:
+        # inclusion=1 검사로 subject별 시간 인덱스 생성 (한 번만 정렬)
+        time_index = SubjectTimeIndex.from_frame(labevents_filtered, sec_col='chart_sec')
+        print(f"   - 인덱스: {len(time_index):,}건, 환자 {len(time_index.subjects):,}명")
+
+    long_df = run_sharded(select_window_labs, anchors, labevents_filtered, LAB_ITEMS,
+                          workers=workers, windows=windows, anchor_col=time_col,
+                          select=select, key_cols=key_cols, time_index=time_index)
+
+    print(f"\n✅ 추출 완료: {len(long_df):,}건")
+    if not long_df.empty:
+        print(f"\n📊 윈도우별 선택 분포:")
+        for window, count in long_df.groupby('window_rank')['window'].agg(['first', 'size']).values:
+            print(f"   - {window}: {count:,}건 ({count/len(long_df)*100:.1f}%)")
+
+    return long_df, labevents_filtered, time_index
+
+def extract_aggregates(anchors, labevents_filtered, time_index, LAB_ITEMS, anchor, windows, aggregates,
+                       workers=1):
+    """윈도우별 검사값 집계 (윈도우마다 독립적으로, groupby 한 번)"""
+    print("\n" + "=" * 70)
+    print("3-1. 윈도우별 집계")
+    print("=" * 70)
+
+    _, _, time_col, key_cols, _ = ANCHORS[anchor]
+    print(f"   - 집계: {', '.join(aggregates)}")
+
+    agg_df = run_sharded(aggregate_window_labs, anchors, labevents_filtered, LAB_ITEMS,
+                         workers=workers, windows=windows, anchor_col=time_col,
+                         aggregates=aggregates, key_cols=key_cols, time_index=time_index)
+
+    print(f"✅ 집계 완료: {len(agg_df):,}개 (기준 행, 검사, 윈도우)")
+    return agg_df
+
+def create_wide_format(anchors, long_df, LAB_ITEMS, anchor, agg_df=None, windows=None, aggregates=None):
+    """기준 행 × 검사 wide format (검사 없는 행/항목도 NaN으로 유지)"""
+    print("\n" + "=" * 70)
+    print("4. Wide Format 변환")
+    print("=" * 70)
+
+    _, _, time_col, key_cols, _ = ANCHORS[anchor]
+    key = key_cols[0]
+    base_cols = list(key_cols) + ['subject_id', time_col]
+    wide_df, lab_columns = build_wide_format(anchors[base_cols].reset_index(drop=True), long_df,
+                                             list(LAB_ITEMS.values()), key=key)
+
+    # 윈도우 집계 컬럼 (검사가 없으면 count류는 0, 나머지는 NaN)
+    if aggregates:
+        wide_df, agg_columns = pivot_window_aggregates(wide_df, agg_df, LAB_ITEMS, windows,
+                                                       aggregates, key=key)
+        count_cols = [col for col in agg_columns if col.endswith('_count')]
+        wide_df[count_cols] = wide_df[count_cols].fillna(0)
+        print(f"   - 집계 컬럼: {len(agg_columns)}개")
+
+    has_any_lab = wide_df[lab_columns].notna().any(axis=1)
+    print(f"✅ Wide format 생성 완료: {wide_df.shape[0]} 행 × {len(lab_columns)} 검사")
+    print(f"   - 검사 있음: {has_any_lab.sum()}건 ({has_any_lab.mean()*100:.1f}%)")
+
+    return wide_df, lab_columns
+
+def save_results(long_df, wide_df, lab_columns, anchor, windows, select, agg_df=None, aggregates=None):
+    """결과 저장"""
+    print("\n" + "=" * 70)
+    print("5. 결과 저장")
+    print("=" * 70)
+
+    _, _, time_col, _, prefix = ANCHORS[anchor]
+
+    wide_df.to_csv(os.path.join(DATA_PATH, f'{prefix}_wide.csv'), index=False)
+    long_df.to_csv(os.path.join(DATA_PATH, f'{prefix}_long.csv'), index=False)
+    if aggregates:
+        agg_df.to_csv(os.path.join(DATA_PATH, f'{prefix}_aggregates_long.csv'), index=False)
+
+    coverage = wide_df[lab_columns].notna().mean() * 100
+    metadata = {
+        'extraction_info': {
+            'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'anchor': anchor,
+            'anchor_time': time_col,
+            'windows_priority': [window_label(*w) for w in windows],
+            'select_rule': select,
+            'aggregates': list(aggregates or []),
+        },
+        'data_summary': {
+            'total_rows': len(wide_df),
+            'total_lab_items': len(lab_columns),
+            'total_lab_records': len(long_df),
+            'rows_with_any_lab': int(wide_df[lab_columns].notna().any(axis=1).sum()),
+            'columns_with_data': int((coverage > 0).sum()),
+        },
+        'window_distribution': (long_df.groupby('window').size().to_dict()
+                                if not long_df.empty else {}),
+        'coverage_by_lab': {col: float(pct) for col, pct in coverage.items()},
+    }
+    with open(os.path.join(DATA_PATH, f'{prefix}_metadata.json'), 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+    print(f"✅ 저장 완료")
+    print(f"   - {prefix}_wide.csv: {wide_df.shape}")
+    print(f"   - {prefix}_long.csv: {len(long_df):,} records")
+    if aggregates:
+        print(f"   - {prefix}_aggregates_long.csv: {len(agg_df):,} records")
+    print(f"   - {prefix}_metadata.json")
+
+def parse_args():
+    """명령행 인자 파싱"""
+    parser = argparse.ArgumentParser(description='시간 단위 윈도우 초기 혈액검사 추출')
+    parser.add_argument('--anchor', choices=list(ANCHORS), default='admission',
+                        help='기준 시각 (admission: admittime, icu: intime)')
+    parser.add_argument('--window', nargs=2, type=float, action='append', metavar=('START_H', 'END_H'),
+                        help='윈도우 (시간, 여러 번 지정 시 지정 순서가 우선순위)')
+    parser.add_argument('--select', choices=SELECT_RULES, default='first',
+                        help='윈도우 안에 여러 값이 있을 때 선택 기준')
+    parser.add_argument('--aggregates', nargs='+', choices=AGGREGATES, default=[],
+                        help='윈도우별로 추가할 집계 컬럼')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='subject_id 샤드 병렬 프로세스 수 (0이면 CPU 코어 수, 결과는 직렬 실행과 동일)')
+    return parser.parse_args()
+
+def main():
+    """메인 실행 함수"""
+    args = parse_args()
+    windows = [tuple(w) for w in args.window] if args.window else HOUR_WINDOWS
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+
+    print("\n" + "🏥 " * 20)
+    print(" 시간 단위 윈도우 초기 혈액검사 추출")
+    print("🏥 " * 20)
+
+    LAB_ITEMS = load_inclusion_items()
+    anchors, labevents = load_data(args.anchor)
+    long_df, labevents_filtered, time_index = extract_labs(anchors, labevents, LAB_ITEMS,
+                                                           args.anchor, windows, args.select, workers)
+    agg_df = None
+    if args.aggregates:
+        agg_df = extract_aggregates(anchors, labevents_filtered, time_index, LAB_ITEMS,
+                                    args.anchor, windows, args.aggregates, workers)
+    wide_df, lab_columns = create_wide_format(anchors, long_df, LAB_ITEMS, args.anchor,
+                                              agg_df, windows, args.aggregates)
+    save_results(long_df, wide_df, lab_columns, args.anchor, windows, args.select,
+                 agg_df, args.aggregates)
+
+    print("\n" + "=" * 70)
+    print("🎉 모든 처리가 성공적으로 완료되었습니다!")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,18 @@
 """
 Add time columns to model datasets for time-based splitting
+
+Usage:
+    python add_time_columns.py           # rewrite each model dataset CSV with time columns
+    python add_time_columns.py --store   # store time columns once in the feature store and add them to each feature set
 """
 import pandas as pd
 import os
+import sys
+from pathlib import Path
+
+# 공용 유틸리티 (프로젝트 루트의 mimic_utils)
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from mimic_utils.feature_store import FeatureStore, store_dir
 
 # Base path
 base_path = '/Users/hyungjun/Desktop/fast campus_lecture'
@@ -15,6 +25,31 @@ admissions_time = admissions[['hadm_id', 'admittime', 'dischtime', 'deathtime']]
 patients = pd.read_csv(f'{base_path}/processed_data/core/patients_sampled.csv')
 patients_dod = patients[['subject_id', 'dod']].copy()
 
+# Column order shared by both modes
+id_cols = ['hadm_id', 'subject_id']
+time_cols = ['admittime', 'dischtime', 'deathtime', 'dod']
+target_cols = ['death_type', 'death_binary', 'hospital_death', 'los_hours', 'los_days']
+
+if '--store' in sys.argv[1:]:
+    # Feature store: one 'time' group keyed by hadm_id, feature sets only get new column lists
+    store = FeatureStore.open(store_dir(base_path))
+    keys = store.dataset(columns=id_cols)
+    time_df = keys.merge(admissions_time.drop_duplicates('hadm_id'), on='hadm_id', how='left')
+    time_df = time_df.merge(patients_dod.drop_duplicates('subject_id'), on='subject_id', how='left')
+    for col in time_cols:
+        time_df[col] = pd.to_datetime(time_df[col])
+    store.put('time', time_df[['hadm_id'] + time_cols])
+    print(f"Stored time group: {time_cols}")
+
+    for name, columns in store.feature_sets.items():
+        other_cols = [col for col in columns if col not in id_cols + time_cols + target_cols]
+        ordered_cols = id_cols + time_cols + [col for col in target_cols if col in columns] + other_cols
+        store.define(name, ordered_cols)
+        print(f"  - Updated feature set {name}: {len(ordered_cols)} columns")
+
+    print("All feature sets updated with time columns!")
+    sys.exit(0)
+
 # Process each dataset
 datasets = [
     'essential/model_dataset_essential.csv',
@@ -36,10 +71,6 @@ for dataset_path in datasets:
         df = df.merge(patients_dod, on='subject_id', how='left')
         
         # Reorder columns - put time columns after ids but before other features
-        id_cols = ['hadm_id', 'subject_id']
-        time_cols = ['admittime', 'dischtime', 'deathtime', 'dod']
-        target_cols = ['death_type', 'death_binary', 'hospital_death', 'los_hours', 'los_days']
-        
         # Get other columns
         other_cols = [col for col in df.columns if col not in id_cols + time_cols + target_cols]
         
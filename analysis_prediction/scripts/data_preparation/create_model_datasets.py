@@ -2,6 +2,12 @@
 """
 예측 모델을 위한 변수 선택 및 데이터셋 생성
 결측치 분석 결과를 기반으로 3가지 레벨의 데이터셋 생성
+
+사용법:
+    python create_model_datasets.py            # CSV 저장
+    python create_model_datasets.py --sparse   # 검사 컬럼을 희소 형식(.npz)으로도 저장
+    python create_model_datasets.py --trajectory  # 검사별 추세 변수(delta, slope, 첫 검사 시간, 반복 수) 추가
+    python create_model_datasets.py --store    # feature store에서 읽고, 세트는 컬럼 목록으로만 정의 (CSV 사본 없음)
 """
 
 import pandas as pd
@@ -10,6 +16,8 @@ import json
 import matplotlib.pyplot as plt
 import seaborn as sns
 import platform
+import sys
+import re
 from pathlib import Path
 from datetime import datetime
 import warnings
@@ -29,6 +37,18 @@ BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent
 DATA_DIR = BASE_DIR / 'analysis_prediction' / 'data'
 OUTPUT_DIR = BASE_DIR / 'analysis_prediction' / 'data'
 FIGURES_DIR = BASE_DIR / 'analysis_prediction' / 'figures'
+PROCESSED_DIR = BASE_DIR / 'processed_data'
+RULES_DIR = BASE_DIR / 'analysis_initial_lab_re' / 'data'
+
+# 공용 유틸리티 (프로젝트 루트의 mimic_utils)
+sys.path.insert(0, str(BASE_DIR))
+from mimic_utils.sparse_labs import read_wide_table, save_sparse_wide, sparse_path
+from mimic_utils.schema import read_csv_typed
+from mimic_utils.event_time import add_time_keys
+from mimic_utils.itemid_harmonize import ItemidHarmonizer
+from mimic_utils.lab_trajectory import (trajectory_features, trajectory_column,
+                                        TRAJECTORY_FEATURES, DEFAULT_WINDOW_HOURS)
+from mimic_utils.feature_store import FeatureStore, store_dir
 
 # 디렉토리 생성
 OUTPUT_DIR.mkdir(exist_ok=True)
@@ -112,13 +132,54 @@ VARIABLE_SETS = {
     }
 }
 
-def load_full_dataset():
-    """전체 데이터셋 로드"""
+# 추세 변수 (--trajectory일 때 각 세트의 lab 변수마다 추가, 입원 후 72시간 기준)
+for _set_info in VARIABLE_SETS.values():
+    _set_info['trajectory_features'] = [trajectory_column(lab, feature)
+                                        for lab in _set_info['lab_features']
+                                        for feature in TRAJECTORY_FEATURES]
+
+def load_full_dataset(store=None):
+    """전체 데이터셋 로드 (store: feature store의 모든 그룹 컬럼)"""
     print("전체 데이터셋 로딩 중...")
-    df = pd.read_csv(DATA_DIR / 'prediction_dataset.csv')
+    if store is not None:
+        df = store.dataset(columns=list(store.column_groups()))
+    else:
+        df = read_wide_table(DATA_DIR / 'prediction_dataset.csv')  # 희소 .npz가 최신이면 그 파일 사용
     print(f"  - 로드 완료: {len(df):,} x {len(df.columns):,}")
     return df
 
+def lab_itemid(column):
+    """wide 컬럼명 → itemid (예: Creatinine_50912_merged → 50912)"""
+    match = re.search(r'_(\d+)(_merged)?$', column)
+    return int(match.group(1)) if match else None
+
+def load_trajectory_features(df):
+    """모든 세트의 lab 변수에 대한 추세 변수 계산 (df와 같은 행 순서)"""
+    print(f"\n추세 변수 계산 중... (입원 후 {DEFAULT_WINDOW_HOURS}시간)")
+
+    lab_columns = list(dict.fromkeys(col for info in VARIABLE_SETS.values() for col in info['lab_features']))
+    LAB_ITEMS = {lab_itemid(col): col for col in lab_columns if lab_itemid(col) is not None}
+
+    admissions = read_csv_typed(PROCESSED_DIR / 'core' / 'admissions_sampled.csv', 'core/admissions',
+                                usecols=['hadm_id', 'admittime'])
+    anchors = df[['hadm_id', 'subject_id']].merge(admissions.drop_duplicates('hadm_id'), on='hadm_id', how='left')
+    add_time_keys(anchors, 'admittime', 'admit')
+
+    labevents = read_csv_typed(PROCESSED_DIR / 'hosp' / 'labevents_sampled.csv', 'hosp/labevents',
+                               usecols=['subject_id', 'itemid', 'charttime', 'valuenum'])
+    add_time_keys(labevents, 'charttime', 'chart')
+
+    # _merged 컬럼과 같은 itemid 통합 규칙 적용
+    harmonizer = ItemidHarmonizer.from_rule_files(RULES_DIR / 'improvable_items.csv',
+                                                  RULES_DIR / 'duplicate_active_labels.csv',
+                                                  base_path=BASE_DIR)
+    harmonizer.apply(labevents)
+
+    trajectory = trajectory_features(anchors, labevents, LAB_ITEMS, hours=DEFAULT_WINDOW_HOURS, key_cols=())
+    trajectory = trajectory.drop(columns='subject_id').set_index(df.index)
+    print(f"  - 검사 {len(LAB_ITEMS)}개 × 변수 {len(TRAJECTORY_FEATURES)}개 = {len(trajectory.columns)}개 컬럼")
+    return trajectory
+
 def calculate_missing_rates(df, lab_features):
     """선택된 변수들의 결측률 계산"""
     missing_rates = {}
@@ -153,12 +214,19 @@ def create_dataset_version(df, variable_set_name, variable_set_info):
         for feat in missing_features[:5]:  # 처음 5개만 표시
             print(f"    - {feat}")
     
+    # 추세 변수 (--trajectory로 계산된 경우만)
+    available_trajectory = [col for col in variable_set_info['trajectory_features']
+                            if col in df.columns]
+    
     # 최종 컬럼 리스트
-    final_cols = required_cols + available_lab_features
+    final_cols = required_cols + available_lab_features + available_trajectory
     
     # 데이터셋 생성
     df_subset = df[final_cols].copy()
     
+    # 결측률 / 완전한 케이스는 기본 변수 기준 (추세 변수는 검사 1회면 결측)
+    base_cols = required_cols + available_lab_features
+    
     # 결측률 계산
     missing_rates = calculate_missing_rates(df_subset, available_lab_features)
     
@@ -178,15 +246,18 @@ def create_dataset_version(df, variable_set_name, variable_set_info):
             'min': np.min(list(missing_rates.values()))
         },
         'complete_cases': {
-            'n_complete': df_subset.dropna().shape[0],
-            'percent_complete': (df_subset.dropna().shape[0] / len(df_subset)) * 100
+            'n_complete': df_subset[base_cols].dropna().shape[0],
+            'percent_complete': (df_subset[base_cols].dropna().shape[0] / len(df_subset)) * 100
         },
         'lab_features': available_lab_features,
+        'trajectory_features': available_trajectory,
         'missing_features': missing_features
     }
     
     # 결과 출력
     print(f"  - Lab 변수: {len(available_lab_features)}개")
+    if available_trajectory:
+        print(f"  - 추세 변수: {len(available_trajectory)}개")
     print(f"  - 평균 결측률: {stats['missing_rates']['mean']:.1f}%")
     print(f"  - 완전한 케이스: {stats['complete_cases']['n_complete']:,}개 ({stats['complete_cases']['percent_complete']:.1f}%)")
     
@@ -270,6 +341,23 @@ def visualize_dataset_comparison(all_stats):
     
     plt.close()
 
+def save_stats(name, stats):
+    """세트별 통계 정보 JSON 저장"""
+    stats_path = OUTPUT_DIR / f'model_dataset_{name}_stats.json'
+    with open(stats_path, 'w', encoding='utf-8') as f:
+        # numpy 타입을 Python 타입으로 변환
+        stats_serializable = json.loads(json.dumps(stats, default=lambda x: float(x) if isinstance(x, np.floating) else x))
+        json.dump(stats_serializable, f, indent=2, ensure_ascii=False)
+
+def define_store_datasets(store, datasets_dict):
+    """세트를 feature store의 컬럼 목록으로만 정의 (데이터 사본 없음, 결측 지시자는 필요할 때 생성)"""
+    print("\nfeature set 정의 중...")
+    
+    for name, (df, stats) in datasets_dict.items():
+        store.define(name, list(df.columns))
+        save_stats(name, stats)
+        print(f"  - {name}: {len(df.columns)}개 컬럼 → {store_dir(BASE_DIR) / 'manifest.json'}")
+
 def save_datasets(datasets_dict):
     """데이터셋 저장"""
     print("\n데이터셋 저장 중...")
@@ -280,19 +368,22 @@ def save_datasets(datasets_dict):
         df.to_csv(output_path, index=False)
         print(f"  - {name}: {output_path}")
         
+        # 희소 형식 (lab 변수만 희소 저장)
+        if '--sparse' in sys.argv[1:]:
+            sparse_info = save_sparse_wide(sparse_path(output_path), df, stats['lab_features'])
+            print(f"    + 희소 형식: {sparse_path(output_path)} "
+                  f"(밀도 {sparse_info['density']*100:.1f}%, {sparse_info['file_mb']:.2f} MB)")
+        
         # 통계 정보 JSON 저장
-        stats_path = OUTPUT_DIR / f'model_dataset_{name}_stats.json'
-        with open(stats_path, 'w', encoding='utf-8') as f:
-            # numpy 타입을 Python 타입으로 변환
-            stats_serializable = json.loads(json.dumps(stats, default=lambda x: float(x) if isinstance(x, np.floating) else x))
-            json.dump(stats_serializable, f, indent=2, ensure_ascii=False)
+        save_stats(name, stats)
         
         # Missing indicator 버전도 생성
         if name != 'comprehensive':  # comprehensive는 너무 많아서 제외
             lab_features = [col for col in df.columns 
                           if col not in ['hadm_id', 'subject_id', 'death_type', 'death_binary', 
                                        'hospital_death', 'los_hours', 'los_days', 'age', 
-                                       'gender', 'admission_type', 'hospital_expire_flag']]
+                                       'gender', 'admission_type', 'hospital_expire_flag']
+                          and col not in stats['trajectory_features']]
             
             df_with_indicators = create_missing_indicator_features(df, lab_features)
             indicator_path = OUTPUT_DIR / f'model_dataset_{name}_with_indicators.csv'
@@ -305,8 +396,16 @@ def main():
     print("예측 모델용 데이터셋 생성")
     print("=" * 80)
     
-    # 전체 데이터 로드
-    df = load_full_dataset()
+    # 전체 데이터 로드 (--store: prepare_prediction_data.py --store로 만든 feature store)
+    store = FeatureStore.open(store_dir(BASE_DIR)) if '--store' in sys.argv[1:] else None
+    df = load_full_dataset(store)
+    
+    # 추세 변수 (선택)
+    if '--trajectory' in sys.argv[1:]:
+        trajectory = load_trajectory_features(df)
+        if store is not None:
+            store.put('trajectory', pd.concat([df[['hadm_id']], trajectory], axis=1))
+        df = pd.concat([df, trajectory], axis=1)
     
     # 각 변수 세트별로 데이터셋 생성
     datasets = {}
@@ -320,8 +419,11 @@ def main():
     # 시각화
     visualize_dataset_comparison(all_stats)
     
-    # 저장
-    save_datasets(datasets)
+    # 저장 (--store: 세트는 컬럼 목록만 저장)
+    if store is not None:
+        define_store_datasets(store, datasets)
+    else:
+        save_datasets(datasets)
     
     # 최종 요약
     print("\n" + "=" * 80)
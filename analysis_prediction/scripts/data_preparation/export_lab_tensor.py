@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+시퀀스 모델용 시간 단위 검사 텐서 생성
+- 입원 후 첫 N시간 × inclusion=1 검사 87개를 1시간 구간으로 나눈 float32 텐서 + 관측 마스크
+- 입원마다 반복하지 않고 구간 조회 → 칸 번호 계산 → 한 번에 채우기 (mimic_utils/lab_tensor.py)
+- memory-map .npy로 저장 → 학습 코드에서 전체를 올리지 않고 mini-batch만 읽기
+
+사용법:
+    python export_lab_tensor.py                       # 입원 후 72시간, 구간 평균
+    python export_lab_tensor.py --hours 48 --agg last # 48시간, 구간 마지막 값
+    python export_lab_tensor.py --stream              # labevents_sampled.csv 없이 원본 labevents.csv 스트리밍
+
+출력 (analysis_prediction/data/tensor/):
+    values.npy  (입원, 시간, 검사) float32, 관측 없는 칸은 NaN
+    mask.npy    (입원, 시간, 검사) bool
+    index.csv   텐서 행 → hadm_id, subject_id, admittime
+    meta.json   shape, 집계 방법, 검사 목록
+
+학습 코드에서 읽기:
+    values, mask, index_df, meta = load_lab_tensor(DATA_OUTPUT_DIR / 'tensor')
+    batch = np.nan_to_num(values[batch_idx]), mask[batch_idx]
+"""
+
+import pandas as pd
+import numpy as np
+import sys
+import argparse
+from pathlib import Path
+import warnings
+warnings.filterwarnings('ignore')
+
+# 경로 설정
+BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent
+PROCESSED_DIR = BASE_DIR / 'processed_data'
+OUTPUT_DIR = BASE_DIR / 'analysis_prediction'
+DATA_OUTPUT_DIR = OUTPUT_DIR / 'data'
+TENSOR_DIR = DATA_OUTPUT_DIR / 'tensor'
+
+# 공용 유틸리티 (프로젝트 루트의 mimic_utils)
+sys.path.insert(0, str(BASE_DIR))
+from mimic_utils.schema import read_csv_typed
+from mimic_utils.event_time import add_time_keys
+from mimic_utils.lab_tensor import export_lab_tensor, DEFAULT_HOURS, TENSOR_AGGREGATES
+from mimic_utils.streaming_labs import iter_lab_chunks, labevents_path
+
+def load_lab_items():
+    """inclusion=1 검사 항목 (컬럼명: label_itemid)"""
+    inclusion_df = pd.read_csv(PROCESSED_DIR / 'hosp' / 'd_labitems_inclusion.csv')
+    included_labs = inclusion_df[inclusion_df['inclusion'] == 1]
+
+    LAB_ITEMS = {}
+    for itemid, label in zip(included_labs['itemid'], included_labs['label']):
+        clean_label = (label
+                      .replace(' ', '_')
+                      .replace(',', '_')
+                      .replace('(', '')
+                      .replace(')', '')
+                      .replace('/', '_')
+                      .replace('-', '_'))
+        LAB_ITEMS[itemid] = f"{clean_label}_{itemid}"
+
+    print(f"  - 검사 항목: {len(LAB_ITEMS)}개")
+    return LAB_ITEMS
+
+def load_data(LAB_ITEMS, stream=False):
+    """입원 / 검사 데이터 로드"""
+    print("데이터 로딩 중...")
+
+    admissions = read_csv_typed(PROCESSED_DIR / 'core' / 'admissions_sampled.csv', 'core/admissions')
+    add_time_keys(admissions, 'admittime', 'admit')
+    print(f"  - 입원: {len(admissions):,}건")
+
+    if stream:
+        # 원본 labevents.csv를 청크로 읽으며 코호트 환자 + 대상 itemid만 남김
+        stats = {}
+        parts = list(iter_lab_chunks(LAB_ITEMS, admissions['subject_id'].values,
+                                     labevents_path(BASE_DIR), stats=stats))
+        labevents = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(
+            columns=['subject_id', 'itemid', 'charttime', 'chart_sec', 'valuenum'])
+        print(f"  - 검사 (원본 스트리밍): {stats.get('rows_kept', 0):,}건 / {stats.get('rows_read', 0):,}건")
+    else:
+        labevents = read_csv_typed(PROCESSED_DIR / 'hosp' / 'labevents_sampled.csv', 'hosp/labevents',
+                                   usecols=['subject_id', 'itemid', 'charttime', 'valuenum'])
+        add_time_keys(labevents, 'charttime', 'chart')
+        print(f"  - 검사: {len(labevents):,}건")
+
+    return admissions, labevents
+
+def export_tensor(admissions, labevents, LAB_ITEMS, hours, agg):
+    """텐서 생성 및 저장"""
+    print(f"\n텐서 생성 중... (입원 후 {hours}시간, 구간 집계: {agg})")
+
+    meta = export_lab_tensor(TENSOR_DIR, admissions, labevents, LAB_ITEMS, hours=hours, agg=agg)
+
+    n_rows, n_hours, n_items = meta['shape']
+    size_mb = n_rows * n_hours * n_items * 5 / 1024 ** 2   # float32 값 + bool 마스크
+    print(f"✅ 저장 완료: {TENSOR_DIR}")
+    print(f"  - shape: {n_rows:,} 입원 × {n_hours} 시간 × {n_items} 검사 ({size_mb:,.1f} MB)")
+    print(f"  - 관측 칸: {meta['observed_cells']:,}개 (밀도 {meta['density']*100:.2f}%)")
+
+    return meta
+
+def print_summary(meta):
+    """시간 구간별 관측 요약"""
+    mask = np.load(TENSOR_DIR / 'mask.npy', mmap_mode='r')
+    observed_by_hour = mask.sum(axis=(0, 2))
+    admissions_with_any = mask.any(axis=(1, 2)).sum()
+
+    print(f"\n📊 관측 요약:")
+    print(f"  - 검사가 한 번이라도 있는 입원: {admissions_with_any:,}/{meta['shape'][0]:,}")
+    for start in range(0, meta['hours'], 12):
+        count = observed_by_hour[start:start + 12].sum()
+        print(f"  - {start:>2}~{min(start + 12, meta['hours']):>2}시간: {count:,}칸")
+
+def parse_args():
+    """명령행 인자 파싱"""
+    parser = argparse.ArgumentParser(description='시간 단위 검사 텐서 생성')
+    parser.add_argument('--hours', type=int, default=DEFAULT_HOURS, help='입원 후 시간 수')
+    parser.add_argument('--agg', choices=TENSOR_AGGREGATES, default='mean',
+                        help='같은 시간 구간에 여러 값이 있을 때 집계')
+    parser.add_argument('--stream', action='store_true',
+                        help='labevents_sampled.csv 대신 원본 labevents.csv 스트리밍')
+    return parser.parse_args()
+
+def main():
+    """메인 실행 함수"""
+    args = parse_args()
+
+    print("=" * 60)
+    print("시간 단위 검사 텐서 생성")
+    print("=" * 60)
+
+    LAB_ITEMS = load_lab_items()
+    admissions, labevents = load_data(LAB_ITEMS, stream=args.stream)
+    meta = export_tensor(admissions, labevents, LAB_ITEMS, args.hours, args.agg)
+    print_summary(meta)
+
+    print("\n" + "=" * 60)
+    print("✅ 완료!")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
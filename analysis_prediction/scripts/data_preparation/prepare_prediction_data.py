@@ -4,6 +4,11 @@
 - 입원 당일 혈액검사 데이터
 - 사망 구분 (병원 내/외)
 - 입원기간 계산
+
+사용법:
+    python prepare_prediction_data.py            # CSV 저장
+    python prepare_prediction_data.py --sparse   # 검사 컬럼을 희소 형식(.npz)으로도 저장
+    python prepare_prediction_data.py --store    # 변수 그룹별로 feature store(data/feature_store/)에도 저장
 """
 
 import pandas as pd
@@ -12,6 +17,7 @@ import json
 import matplotlib.pyplot as plt
 import seaborn as sns
 import platform
+import sys
 from pathlib import Path
 from datetime import datetime
 import warnings
@@ -34,6 +40,19 @@ OUTPUT_DIR = BASE_DIR / 'analysis_prediction'
 FIGURES_DIR = OUTPUT_DIR / 'figures'
 DATA_OUTPUT_DIR = OUTPUT_DIR / 'data'
 
+# 공용 유틸리티 (프로젝트 루트의 mimic_utils)
+sys.path.insert(0, str(BASE_DIR))
+from mimic_utils.table_cache import load_table
+from mimic_utils.sparse_labs import read_wide_table, save_sparse_wide, sparse_path
+from mimic_utils.feature_store import FeatureStore, store_dir
+
+# feature store 변수 그룹 (검사 컬럼은 'labs' 그룹)
+FEATURE_GROUPS = {
+    'targets': ['death_type', 'death_binary', 'hospital_death', 'hospital_expire_flag'],
+    'los': ['los_hours', 'los_days'],
+    'demographics': ['age', 'gender', 'admission_type'],
+}
+
 # 디렉토리 생성
 FIGURES_DIR.mkdir(exist_ok=True)
 DATA_OUTPUT_DIR.mkdir(exist_ok=True)
@@ -42,16 +61,16 @@ def load_data():
     """필요한 데이터 로드"""
     print("데이터 로딩 중...")
     
-    # 1. 입원 당일 혈액검사 데이터
-    labs_df = pd.read_csv(LAB_DATA_DIR / 'labs_initial_merged_wide.csv')
+    # 1. 입원 당일 혈액검사 데이터 (희소 .npz가 최신이면 그 파일 사용)
+    labs_df = read_wide_table(LAB_DATA_DIR / 'labs_initial_merged_wide.csv')
     print(f"  - 혈액검사 데이터: {len(labs_df):,}건")
     
     # 2. 입원 정보 (입원기간 계산용)
-    admissions_df = pd.read_csv(DATA_DIR / 'core' / 'admissions.csv')
+    admissions_df = load_table('core/admissions', base_path=BASE_DIR)
     print(f"  - 입원 데이터: {len(admissions_df):,}건")
     
     # 3. 환자 정보 (사망일, 나이, 성별)
-    patients_df = pd.read_csv(DATA_DIR / 'core' / 'patients.csv')
+    patients_df = load_table('core/patients', base_path=BASE_DIR)
     print(f"  - 환자 데이터: {len(patients_df):,}건")
     
     return labs_df, admissions_df, patients_df
@@ -302,6 +321,17 @@ def create_visualizations(df):
     
     plt.close('all')
 
+def save_feature_store(df_final, lab_columns):
+    """최종 데이터셋을 변수 그룹별로 feature store에 저장 (keys = hadm_id, subject_id)"""
+    store = FeatureStore.create(store_dir(BASE_DIR), df_final[['hadm_id', 'subject_id']])
+    for name, columns in FEATURE_GROUPS.items():
+        store.put(name, df_final[['hadm_id'] + [col for col in columns if col in df_final.columns]])
+    store.put('labs', df_final[['hadm_id'] + lab_columns])
+    
+    for name, columns in store.groups.items():
+        print(f"    • {name}: {len(columns)}개 컬럼")
+    return store
+
 def main():
     """메인 실행 함수"""
     print("=" * 80)
@@ -341,6 +371,21 @@ def main():
     print(f"  - 최종 데이터셋 저장: {output_path}")
     print(f"  - 데이터 크기: {df_final.shape[0]:,} x {df_final.shape[1]:,}")
     
+    # 희소 형식 (검사 컬럼만 희소 저장, 나머지는 기준 컬럼)
+    if '--sparse' in sys.argv[1:]:
+        lab_base_cols = ['hadm_id', 'subject_id', 'admittime', 'hospital_expire_flag', 'deathtime', 'admit_date']
+        lab_columns = [col for col in labs_df.columns if col not in lab_base_cols and col in df_final.columns]
+        sparse_info = save_sparse_wide(sparse_path(output_path), df_final, lab_columns)
+        print(f"  - 희소 형식 저장: {sparse_path(output_path)} "
+              f"(밀도 {sparse_info['density']*100:.1f}%, {sparse_info['file_mb']:.2f} MB)")
+    
+    # feature store (변수 그룹별 컬럼 저장, 모델 데이터셋은 create_model_datasets.py --store에서 정의)
+    if '--store' in sys.argv[1:]:
+        grouped = {'hadm_id', 'subject_id'}.union(*FEATURE_GROUPS.values())
+        lab_columns = [col for col in df_final.columns if col not in grouped]
+        print(f"  - feature store 저장: {store_dir(BASE_DIR)}")
+        save_feature_store(df_final, lab_columns)
+    
     # 컬럼 정보 출력
     print("\n데이터셋 컬럼 정보:")
     print(f"  - 식별자: hadm_id, subject_id")
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+subject_id 기준 교차검증으로 후보 모델 비교
+- 02_baseline / 03_tree 노트북의 train_test_split 대신 GroupKFold(subject_id) → 같은 환자가 학습/검증에 동시에 들어가지 않음
+- fold마다 SimpleImputer / StandardScaler를 한 번만 fit해서 memory-map 행렬로 저장 (모델 · 타겟 사이 재사용)
+- Logistic/Linear Regression, Random Forest, XGBoost × death_binary, hospital_death, los_days를 병렬 학습
+- fold별 학습 시간과 최대 메모리를 지표와 함께 저장
+
+사용법:
+    python cross_validate_models.py                           # essential, linear + rf, 5-fold
+    python cross_validate_models.py --dataset comprehensive --models linear,rf,xgb
+    python cross_validate_models.py --workers 4               # 프로세스 4개 (0이면 CPU 코어 수)
+    python cross_validate_models.py --store                   # CSV 대신 feature store의 세트 사용
+
+출력:
+    analysis_prediction/models/{dataset}/results/cv_folds.csv    (모델, 타겟, fold)별 지표 / 시간 / 메모리
+    analysis_prediction/models/{dataset}/results/cv_results.json 모델 · 타겟별 fold 평균 ± 표준편차
+"""
+
+import numpy as np
+import os
+import json
+import sys
+import time
+import argparse
+from pathlib import Path
+from datetime import datetime
+import warnings
+warnings.filterwarnings('ignore')
+
+# 경로 설정
+BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent
+DATA_DIR = BASE_DIR / 'analysis_prediction' / 'data'
+MODELS_DIR = BASE_DIR / 'analysis_prediction' / 'models'
+
+# 공용 유틸리티 (프로젝트 루트의 mimic_utils)
+sys.path.insert(0, str(BASE_DIR))
+from mimic_utils.sparse_labs import read_wide_table
+from mimic_utils.feature_store import FeatureStore, store_dir
+from mimic_utils.fold_cache import feature_matrix, build_folds
+from mimic_utils.cross_validation import (cross_validate, summarize_folds, available_models,
+                                          required_preprocessors, CANDIDATE_MODELS)
+
+# 타겟별 작업 (노트북과 동일)
+TARGETS = {
+    'death_binary': 'classification',
+    'hospital_death': 'classification',
+    'los_days': 'regression',
+}
+
+
+def parse_args():
+    """명령행 인자 파싱"""
+    parser = argparse.ArgumentParser(description='subject_id 기준 교차검증')
+    parser.add_argument('--dataset', default='essential', help='모델 데이터셋 (essential / extended / comprehensive)')
+    parser.add_argument('--models', default='linear,rf', help=f'쉼표로 구분 ({", ".join(CANDIDATE_MODELS)})')
+    parser.add_argument('--folds', type=int, default=5, help='fold 수')
+    parser.add_argument('--store', action='store_true', help='feature store의 세트 사용')
+    parser.add_argument('--workers', type=int, default=1, help='프로세스 수 (0이면 CPU 코어 수)')
+    return parser.parse_args()
+
+
+def load_dataset(name, use_store):
+    """모델 데이터셋 로드"""
+    print(f"\n📊 데이터 로드: {name}")
+    if use_store:
+        df = FeatureStore.open(store_dir(BASE_DIR)).dataset(name)
+        print(f"  - feature store: {store_dir(BASE_DIR)}")
+    else:
+        # 세트별 폴더 (data/{name}/, 02·03 노트북과 동일), 없으면 create_model_datasets.py의 평면 경로
+        path = DATA_DIR / name / f'model_dataset_{name}.csv'
+        if not path.exists():
+            path = DATA_DIR / f'model_dataset_{name}.csv'
+        df = read_wide_table(path)
+        print(f"  - 파일: {path}")
+    print(f"  - 크기: {len(df):,} x {len(df.columns)}, 환자 {df['subject_id'].nunique():,}명")
+    return df
+
+
+def prepare_folds(X, groups, models, n_splits):
+    """모델에 필요한 전처리별 fold 행렬 (같은 분할, 캐시 재사용)"""
+    print("\n🧮 fold 행렬 준비 (subject_id GroupKFold)")
+    fold_sets = {}
+    for preprocess in required_preprocessors(models):
+        started = time.perf_counter()
+        fold_sets[preprocess] = build_folds(X, groups=groups, n_splits=n_splits, preprocess=preprocess,
+                                            base_path=BASE_DIR)
+        print(f"  - {preprocess}: {fold_sets[preprocess].directory} ({time.perf_counter() - started:.1f}초)")
+    return fold_sets
+
+
+def print_folds(rows):
+    """fold별 지표 / 시간 / 메모리"""
+    print("\n📋 fold별 결과")
+    for (model, target), group in rows.groupby(['model', 'target'], sort=False):
+        print(f"\n  {CANDIDATE_MODELS[model]['description']} - {target}")
+        for _, row in group.iterrows():
+            if TARGETS[target] == 'classification':
+                metric = f"AUROC {row['auroc']:.4f}  F1 {row['f1_score']:.4f}"
+            else:
+                metric = f"MAE {row['mae']:.2f}  R² {row['r2']:.4f}"
+            print(f"    fold {row['fold']} | {metric} | 학습 {row['fit_seconds']:.2f}초 "
+                  f"예측 {row['predict_seconds']:.2f}초 | 할당 최대 {row['peak_alloc_mb']:.1f} MB "
+                  f"(워커 RSS {row['worker_max_rss_mb']:.0f} MB)")
+
+
+def print_summary(summary):
+    """모델 · 타겟별 fold 평균 ± 표준편차"""
+    print("\n📈 요약 (fold 평균 ± 표준편차)")
+    for _, row in summary.iterrows():
+        if TARGETS[row['target']] == 'classification':
+            metric = f"AUROC {row['auroc_mean']:.4f} ± {row['auroc_std']:.4f}"
+        else:
+            metric = f"MAE {row['mae_mean']:.2f} ± {row['mae_std']:.2f}"
+        print(f"  - {CANDIDATE_MODELS[row['model']]['description']:<30} {row['target']:<15} {metric} "
+              f"| 학습 {row['fit_seconds']:.1f}초 | 할당 최대 {row['peak_alloc_mb']:.1f} MB")
+
+
+def main():
+    """메인 실행 함수"""
+    args = parse_args()
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+
+    print("=" * 80)
+    print(f"subject_id 기준 {args.folds}-fold 교차검증")
+    print("=" * 80)
+
+    df = load_dataset(args.dataset, args.store)
+    X, feature_names = feature_matrix(df)
+    print(f"  - 특성: {len(feature_names)}개")
+
+    requested = args.models.split(',')
+    models = available_models(requested)
+    if 'xgb' in requested and 'xgb' not in models:
+        print("  ⚠️ xgboost가 없어 XGBoost는 건너뜁니다 (uv pip install xgboost)")
+
+    fold_sets = prepare_folds(X, df['subject_id'].values, models, args.folds)
+
+    targets = {}
+    for target, task in TARGETS.items():
+        y = df[target].to_numpy(dtype=np.float64)
+        targets[target] = (y.astype(np.int64) if task == 'classification' else y, task)
+
+    print(f"\n🚀 학습: 모델 {models} × 타겟 {len(targets)}개 × {args.folds} fold, 프로세스 {workers}개")
+    started = time.perf_counter()
+    rows = cross_validate(fold_sets, targets, models, workers=workers)
+    wall_seconds = time.perf_counter() - started
+
+    summary = summarize_folds(rows)
+    print_folds(rows)
+    print_summary(summary)
+
+    output_dir = MODELS_DIR / args.dataset / 'results'
+    output_dir.mkdir(parents=True, exist_ok=True)
+    rows.to_csv(output_dir / 'cv_folds.csv', index=False)
+    with open(output_dir / 'cv_results.json', 'w') as f:
+        json.dump({
+            'dataset': args.dataset,
+            'validation': f'GroupKFold by subject_id ({args.folds} folds)',
+            'n_samples': len(df),
+            'n_subjects': int(df['subject_id'].nunique()),
+            'n_features': len(feature_names),
+            'fold_cache': {pre: folds.digest for pre, folds in fold_sets.items()},
+            'workers': workers,
+            'wall_seconds': wall_seconds,
+            'summary': summary.to_dict(orient='records'),
+            'timestamp': datetime.now().isoformat(),
+        }, f, indent=2, ensure_ascii=False)
+
+    print("\n" + "=" * 80)
+    print(f"✅ 완료! (학습 경과 {wall_seconds:.1f}초, fold 학습 시간 합 {rows['fit_seconds'].sum():.1f}초)")
+    print(f"📁 결과: {output_dir / 'cv_folds.csv'}, {output_dir / 'cv_results.json'}")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+트리 모델(RandomForest / XGBoost) 하이퍼파라미터 탐색
+- 03_tree_models_with_xgb 노트북의 세 타겟(death_binary, hospital_death, los_days)별로 탐색
+- 격자 전체를 최대 트리 수로 평가하지 않고 successive halving / hyperband로 후보를 줄여 가며 평가
+- fold별 중앙값 대체 행렬은 한 번만 만들어 memory-map .npy로 저장 → 워커 프로세스가 공유
+- fold 행렬과 (설정, 트리 수, fold) 점수는 디스크 캐시 → 같은 데이터로 다시 실행하면 학습 없이 결과 출력
+
+사용법:
+    python tune_tree_models.py                          # comprehensive, RF, successive halving
+    python tune_tree_models.py --models rf,xgb --method hyperband
+    python tune_tree_models.py --dataset essential --targets death_binary,los_days
+    python tune_tree_models.py --workers 8              # 프로세스 8개 (0이면 CPU 코어 수)
+    python tune_tree_models.py --store                  # CSV 대신 feature store의 세트 사용
+
+출력:
+    analysis_prediction/models/{dataset}/results/tuning_results.json
+    analysis_prediction/data/fold_cache/  (fold 행렬 + 평가 캐시, 지워도 다시 생성)
+"""
+
+import numpy as np
+import os
+import json
+import sys
+import time
+import argparse
+from pathlib import Path
+from datetime import datetime
+import warnings
+warnings.filterwarnings('ignore')
+
+# 경로 설정
+BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent
+DATA_DIR = BASE_DIR / 'analysis_prediction' / 'data'
+MODELS_DIR = BASE_DIR / 'analysis_prediction' / 'models'
+
+# 공용 유틸리티 (프로젝트 루트의 mimic_utils)
+sys.path.insert(0, str(BASE_DIR))
+from mimic_utils.sparse_labs import read_wide_table
+from mimic_utils.feature_store import FeatureStore, store_dir
+from mimic_utils.fold_cache import feature_matrix, build_folds
+from mimic_utils.model_tuning import halving_search, hyperband, HAS_XGBOOST, SEARCH_SPACES
+
+# 타겟별 작업 (노트북과 동일)
+TARGETS = {
+    'death_binary': 'classification',
+    'hospital_death': 'classification',
+    'los_days': 'regression',
+}
+
+SEARCH_METHODS = {
+    'halving': halving_search,
+    'hyperband': hyperband,
+}
+
+MODEL_NAMES = {
+    'rf': 'Random Forest',
+    'xgb': 'XGBoost',
+}
+
+
+def parse_args():
+    """명령행 인자 파싱"""
+    parser = argparse.ArgumentParser(description='트리 모델 하이퍼파라미터 탐색')
+    parser.add_argument('--dataset', default='comprehensive', help='모델 데이터셋 (essential / extended / comprehensive)')
+    parser.add_argument('--models', default='rf', help='쉼표로 구분 (rf, xgb)')
+    parser.add_argument('--targets', default=','.join(TARGETS), help='쉼표로 구분')
+    parser.add_argument('--method', choices=list(SEARCH_METHODS), default='halving', help='탐색 방법')
+    parser.add_argument('--folds', type=int, default=5, help='교차검증 fold 수 (subject_id 기준 GroupKFold)')
+    parser.add_argument('--min-trees', type=int, default=25, help='첫 rung 트리 수')
+    parser.add_argument('--max-trees', type=int, default=400, help='마지막 rung 트리 수')
+    parser.add_argument('--eta', type=int, default=3, help='rung마다 남기는 비율 1/eta')
+    parser.add_argument('--store', action='store_true', help='feature store의 세트 사용')
+    parser.add_argument('--workers', type=int, default=1, help='프로세스 수 (0이면 CPU 코어 수)')
+    return parser.parse_args()
+
+
+def load_dataset(name, use_store):
+    """모델 데이터셋 로드"""
+    print(f"\n📊 데이터 로드: {name}")
+    if use_store:
+        df = FeatureStore.open(store_dir(BASE_DIR)).dataset(name)
+        print(f"  - feature store: {store_dir(BASE_DIR)}")
+    else:
+        # 세트별 폴더 (data/{name}/, 02·03 노트북과 동일), 없으면 create_model_datasets.py의 평면 경로
+        path = DATA_DIR / name / f'model_dataset_{name}.csv'
+        if not path.exists():
+            path = DATA_DIR / f'model_dataset_{name}.csv'
+        df = read_wide_table(path)
+        print(f"  - 파일: {path}")
+    print(f"  - 크기: {len(df):,} x {len(df.columns)}")
+    return df
+
+
+def select_models(names):
+    """요청한 모델 중 사용 가능한 것만 (xgboost 미설치면 건너뜀)"""
+    models = []
+    for name in names:
+        if name not in SEARCH_SPACES:
+            raise ValueError(f"지원하지 않는 모델입니다: {name} (가능: {list(SEARCH_SPACES)})")
+        if name == 'xgb' and not HAS_XGBOOST:
+            print("  ⚠️ xgboost가 없어 XGBoost 탐색은 건너뜁니다 (uv pip install xgboost)")
+            continue
+        models.append(name)
+    return models
+
+
+def print_rungs(result):
+    """bracket / rung별 요약"""
+    for b, rungs in enumerate(result['brackets']):
+        for rung in rungs:
+            valid = [score for _, score in rung['scores'] if not np.isnan(score)]
+            best = max(valid) if valid else float('nan')
+            print(f"    bracket {b} | 트리 {rung['resource']:>4} | 후보 {rung['n_configs']:>3} | "
+                  f"최고 {best:.4f} | 학습 {rung['trained']:>3}회 ({rung['seconds']:.1f}초)")
+
+
+def main():
+    """메인 실행 함수"""
+    args = parse_args()
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    search = SEARCH_METHODS[args.method]
+
+    print("=" * 80)
+    print(f"트리 모델 하이퍼파라미터 탐색 ({args.method})")
+    print("=" * 80)
+
+    df = load_dataset(args.dataset, args.store)
+    X, feature_names = feature_matrix(df)
+    print(f"  - 특성: {len(feature_names)}개")
+
+    # fold 행렬 (subject_id 기준 분할, 학습 구간으로만 결측 대체)
+    started = time.perf_counter()
+    folds = build_folds(X, groups=df['subject_id'].values, n_splits=args.folds, base_path=BASE_DIR)
+    print(f"  - fold 캐시: {folds.directory} ({time.perf_counter() - started:.1f}초)")
+
+    models = select_models(args.models.split(','))
+    targets = args.targets.split(',')
+    print(f"  - 모델: {models}, 타겟: {targets}, 프로세스: {workers}")
+
+    results = {}
+    total_started = time.perf_counter()
+    for model in models:
+        for target in targets:
+            if target not in TARGETS:
+                raise ValueError(f"지원하지 않는 타겟입니다: {target} (가능: {list(TARGETS)})")
+            task = TARGETS[target]
+            y = df[target].to_numpy(dtype=np.float64)
+            if task == 'classification':
+                y = y.astype(np.int64)
+
+            print(f"\n🔍 {MODEL_NAMES[model]} - {target} ({task})")
+            result = search(folds, y, task, model, min_resource=args.min_trees, max_resource=args.max_trees,
+                            eta=args.eta, target=target, workers=workers)
+            print_rungs(result)
+            metric = 'AUROC' if task == 'classification' else 'MAE'
+            score = result['best_score'] if task == 'classification' else -result['best_score']
+            print(f"  ✅ 최적: {result['best_params']} (트리 {result['best_resource']}) {metric} {score:.4f}")
+            print(f"     새 학습 {result['trained']}회, 학습 {result['train_seconds']:.1f}초, "
+                  f"경과 {result['wall_seconds']:.1f}초")
+            results[f'{model}_{target}'] = result
+
+    output_dir = MODELS_DIR / args.dataset / 'results'
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_path = output_dir / 'tuning_results.json'
+    with open(output_path, 'w') as f:
+        json.dump({
+            'dataset': args.dataset,
+            'method': args.method,
+            'n_folds': args.folds,
+            'fold_cache': folds.digest,
+            'feature_names': feature_names,
+            'min_trees': args.min_trees,
+            'max_trees': args.max_trees,
+            'eta': args.eta,
+            'workers': workers,
+            'results': results,
+            'timestamp': datetime.now().isoformat(),
+        }, f, indent=2, ensure_ascii=False)
+
+    print("\n" + "=" * 80)
+    print(f"✅ 완료! (전체 {time.perf_counter() - total_started:.1f}초)")
+    print(f"📁 결과: {output_path}")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,35 @@
 """
 Remove hospital_expire_flag from all model datasets to prevent data leakage
+
+Usage:
+    python remove_data_leakage.py           # rewrite each model dataset CSV without the column
+    python remove_data_leakage.py --store   # drop the column from each feature set definition (no data rewrite)
 """
 import pandas as pd
 import os
+import sys
+from pathlib import Path
+
+# 공용 유틸리티 (프로젝트 루트의 mimic_utils)
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from mimic_utils.feature_store import FeatureStore, store_dir
 
 # Base path
 base_path = '/Users/hyungjun/Desktop/fast campus_lecture/analysis_prediction/data'
 
+if '--store' in sys.argv[1:]:
+    # Feature store: the column stays in the 'targets' group, only the feature sets stop projecting it
+    store = FeatureStore.open(store_dir(Path(base_path).parents[1]))
+    for name, columns in store.feature_sets.items():
+        if 'hospital_expire_flag' in columns:
+            store.define(name, [col for col in columns if col != 'hospital_expire_flag'])
+            print(f"  - Removed hospital_expire_flag from feature set {name}")
+        else:
+            print(f"  - hospital_expire_flag not found in feature set {name}")
+
+    print("Data leakage issue fixed!")
+    sys.exit(0)
+
 # Process each dataset
 datasets = [
     'essential/model_dataset_essential.csv',
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+대용량 이벤트 테이블 subject_id 분할 저장소 생성 스크립트 (최초 1회)
+- labevents 등 대용량 테이블을 subject_id 구간별 파일로 분할
+- 이후 코호트 추출(extract_hosp_essential.py)은 필요한 bucket만 읽음
+
+사용법:
+    python build_partitioned_store.py                        # 기본: hosp/labevents
+    python build_partitioned_store.py hosp/labevents icu/chartevents
+    python build_partitioned_store.py --all                  # LARGE_EVENT_TABLES 전체
+"""
+
+import os
+import sys
+from pathlib import Path
+from datetime import datetime
+import warnings
+warnings.filterwarnings('ignore')
+
+# 공용 유틸리티 (프로젝트 루트의 mimic_utils)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from mimic_utils.partitioned_store import (
+    LARGE_EVENT_TABLES, N_BUCKETS, build_store, has_store
+)
+
+# 설정
+BASE_PATH = '/Users/hyungjun/Desktop/fast campus_lecture'
+DEFAULT_TABLES = ['hosp/labevents']
+
+def main(tables):
+    """메인 실행 함수"""
+    print("=" * 80)
+    print("📦 대용량 테이블 subject_id 분할 저장소 생성")
+    print("=" * 80)
+
+    for table in tables:
+        source_path = os.path.join(BASE_PATH, 'dataset2', f'{table}.csv')
+        if not os.path.exists(source_path):
+            print(f"\n⚠️ {table}: 원본 파일 없음")
+            continue
+
+        if has_store(table, BASE_PATH):
+            print(f"\n✅ {table}: 이미 최신 저장소 존재 (건너뜀)")
+            continue
+
+        print(f"\n⏳ {table} 분할 중 ({N_BUCKETS}개 bucket)...")
+        start_time = datetime.now()
+        manifest = build_store(table, BASE_PATH)
+        elapsed = (datetime.now() - start_time).total_seconds()
+
+        print(f"✅ {table}: {manifest['total_rows']:,} 행 → "
+              f"{len(manifest['buckets'])}개 bucket ({manifest['format']}, {elapsed:.1f}초)")
+
+    print(f"\n💾 저장 위치: processed_data/partitioned/")
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args == ['--all']:
+        tables = LARGE_EVENT_TABLES
+    else:
+        tables = args or DEFAULT_TABLES
+    main(tables)
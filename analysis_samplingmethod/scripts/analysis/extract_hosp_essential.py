@@ -9,13 +9,21 @@ import numpy as np
 import os
 import shutil
 import json
+import sys
+from pathlib import Path
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+# 공용 유틸리티 (프로젝트 루트의 mimic_utils)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from mimic_utils.partitioned_store import has_store, read_cohort
+from mimic_utils.parallel_filter import parallel_filter_csv
+
 # 설정
 BASE_PATH = '/Users/hyungjun/Desktop/fast campus_lecture'
 CHUNK_SIZE = 100000  # 대용량 파일 청크 크기
+N_WORKERS = os.cpu_count()  # 병렬 필터링 프로세스 수
 
 def load_sampled_ids():
     """샘플된 ID 로드"""
@@ -63,6 +71,33 @@ def copy_dictionary_tables():
     
     return copied_count
 
+def filter_in_chunks(source_path, target_path, id_filters):
+    """청크 단위 순차 필터링 (매칭 행은 결과 파일에 바로 이어쓰기)"""
+    total_rows = 0
+    chunk_count = 0
+    header_written = False
+    
+    for chunk in pd.read_csv(source_path, chunksize=CHUNK_SIZE):
+        mask = np.zeros(len(chunk), dtype=bool)
+        for col, ids in id_filters.items():
+            mask |= chunk[col].isin(ids).values
+        filtered = chunk[mask]
+        
+        if not filtered.empty:
+            filtered.to_csv(target_path, mode='a' if header_written else 'w',
+                            header=not header_written, index=False)
+            header_written = True
+            total_rows += len(filtered)
+        
+        chunk_count += 1
+        if chunk_count % 100 == 0:
+            print(f"      처리 중... {chunk_count * CHUNK_SIZE:,} 행 검사, {total_rows:,} 행 매칭")
+    
+    if not header_written:
+        pd.read_csv(source_path, nrows=0).to_csv(target_path, index=False)
+    
+    return total_rows
+
 def extract_patient_table(table_name, subject_ids, hadm_ids, use_chunks=False):
     """환자별 데이터 테이블 추출"""
     source_path = os.path.join(BASE_PATH, f'dataset2/hosp/{table_name}.csv')
@@ -75,42 +110,46 @@ def extract_patient_table(table_name, subject_ids, hadm_ids, use_chunks=False):
     print(f"   처리 중: {table_name}...")
     
     try:
-        if use_chunks:
-            # 대용량 파일은 청크로 처리
-            filtered_chunks = []
-            total_rows = 0
-            chunk_count = 0
+        if has_store(f'hosp/{table_name}', BASE_PATH):
+            # 분할 저장소: 샘플 subject_id가 속한 bucket만 읽음
+            # (hadm_id는 subject_id에 종속되므로 subject_id 조건만으로 충분)
+            filtered = read_cohort(f'hosp/{table_name}', subject_ids, base_path=BASE_PATH)
             
-            for chunk_num, chunk in enumerate(pd.read_csv(source_path, chunksize=CHUNK_SIZE)):
-                # subject_id 또는 hadm_id로 필터링
-                if 'subject_id' in chunk.columns and 'hadm_id' in chunk.columns:
-                    filtered = chunk[
-                        (chunk['subject_id'].isin(subject_ids)) | 
-                        (chunk['hadm_id'].isin(hadm_ids))
-                    ]
-                elif 'subject_id' in chunk.columns:
-                    filtered = chunk[chunk['subject_id'].isin(subject_ids)]
-                elif 'hadm_id' in chunk.columns:
-                    filtered = chunk[chunk['hadm_id'].isin(hadm_ids)]
-                else:
-                    print(f"      ⚠️ {table_name}: subject_id/hadm_id 컬럼 없음")
-                    return 0
-                
-                if not filtered.empty:
-                    filtered_chunks.append(filtered)
-                    total_rows += len(filtered)
-                
-                chunk_count += 1
-                if chunk_count % 100 == 0:
-                    print(f"      처리 중... {chunk_count * CHUNK_SIZE:,} 행 검사, {total_rows:,} 행 매칭")
+            if not filtered.empty:
+                filtered.to_csv(target_path, index=False)
+                file_size = os.path.getsize(target_path) / (1024 * 1024)  # MB
+                print(f"   ✅ {table_name}: {len(filtered):,} 행 추출 ({file_size:.1f} MB, 분할 저장소)")
+                return len(filtered)
+            else:
+                print(f"   ⚠️ {table_name}: 매칭 데이터 없음")
+                return 0
+        
+        elif use_chunks:
+            # 대용량 파일은 byte 구간으로 나눠 병렬 필터링 (매칭 행은 결과 파일에 바로 기록)
+            header = pd.read_csv(source_path, nrows=0).columns
+            id_filters = {}
+            if 'subject_id' in header:
+                id_filters['subject_id'] = subject_ids
+            if 'hadm_id' in header:
+                id_filters['hadm_id'] = hadm_ids
+            if not id_filters:
+                print(f"      ⚠️ {table_name}: subject_id/hadm_id 컬럼 없음")
+                return 0
             
-            if filtered_chunks:
-                result_df = pd.concat(filtered_chunks, ignore_index=True)
-                result_df.to_csv(target_path, index=False)
+            try:
+                _, total_rows = parallel_filter_csv(source_path, target_path, id_filters,
+                                                    n_workers=N_WORKERS)
+            except ValueError as e:
+                # 따옴표 안 줄바꿈 등으로 byte 분할이 불가능하면 순차 청크 처리
+                print(f"      ⚠️ 병렬 처리 불가 ({e}) → 순차 처리")
+                total_rows = filter_in_chunks(source_path, target_path, id_filters)
+            
+            if total_rows > 0:
                 file_size = os.path.getsize(target_path) / (1024 * 1024)  # MB
                 print(f"   ✅ {table_name}: {total_rows:,} 행 추출 ({file_size:.1f} MB)")
                 return total_rows
             else:
+                os.remove(target_path)
                 print(f"   ⚠️ {table_name}: 매칭 데이터 없음")
                 return 0
                 
@@ -182,14 +221,15 @@ def main():
     essential_tables = [
         ('diagnoses_icd', False),      # 진단 코드
         ('drgcodes', False),           # DRG 코드
-        # ('labevents', True),           # 검사 결과 (대용량) - 별도 처리 필요
+        ('labevents', True),           # 검사 결과 (대용량) - 분할 저장소, 없으면 병렬 전체 스캔
         ('microbiologyevents', False), # 미생물 검사
         ('services', False)            # 진료 서비스
     ]
     
-    print("\n   ⚠️ 참고: labevents는 매우 큰 파일(1.2억 행)이므로 별도로 처리합니다.")
-    
     for table_name, use_chunks in essential_tables:
+        if use_chunks and not has_store(f'hosp/{table_name}', BASE_PATH):
+            print(f"\n   ⚠️ 참고: {table_name} 분할 저장소가 없어 전체 파일을 병렬 스캔합니다 (프로세스 {N_WORKERS}개).")
+            print(f"      → 반복 추출이라면 build_partitioned_store.py로 저장소를 먼저 만드세요.")
         row_count = extract_patient_table(table_name, subject_ids, hadm_ids, use_chunks)
         extraction_stats['patient_tables'][table_name] = row_count
     
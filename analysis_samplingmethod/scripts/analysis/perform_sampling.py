@@ -5,6 +5,14 @@ MIMIC-IV 데이터 샘플링 스크립트
 - 병원 후 사망: 300건  
 - 생존: 600건
 총 1,200건의 균형잡힌 admission 샘플 추출
+
+사용법:
+    python perform_sampling.py                      # 전체 admissions 로드 후 그룹별 .sample
+    python perform_sampling.py --stream             # admissions.csv를 한 번 스트리밍하며 층별 저수지 샘플링
+    python perform_sampling.py --stream --scale 100 # 그룹별 할당량 ×100 (총 120,000건)
+    python perform_sampling.py --family 50          # 시드 50개 샘플을 한 번에, 관련 테이블은 합집합으로 한 번만 추출
+    python perform_sampling.py --family 50 --bootstrap  # 기준 샘플의 층화 bootstrap 50개
+    python perform_sampling.py --matched            # 생존 그룹을 사망 입원에 매칭 (연령, 성별, 입원 유형, 입원 연도)
 """
 
 import pandas as pd
@@ -14,9 +22,21 @@ import json
 from datetime import datetime
 import matplotlib.pyplot as plt
 import seaborn as sns
+import sys
+import argparse
+from pathlib import Path
 import warnings
 warnings.filterwarnings('ignore')
 
+# 공용 유틸리티 (프로젝트 루트의 mimic_utils)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from mimic_utils.table_cache import load_table
+from mimic_utils.cohort_extract import extract_cohort
+from mimic_utils.stratified_sampling import stream_stratified_sample, stream_sample_family
+from mimic_utils.sample_family import SampleFamily, bootstrap_family, family_ids, FAMILY_DIRNAME
+from mimic_utils.matched_sampling import match_controls, balance_table, add_admit_year, MATCH_CALIPERS
+from mimic_utils.sampling_weights import admission_weights
+
 # 설정
 RANDOM_STATE = 42
 BASE_PATH = '/Users/hyungjun/Desktop/fast campus_lecture'
@@ -26,6 +46,28 @@ N_IN_HOSPITAL_DEATH = 300
 N_POST_HOSPITAL_DEATH = 300
 N_SURVIVED = 600
 
+# 그룹별 할당량 (순서 = 샘플 결과 순서)
+SAMPLE_QUOTAS = {
+    'in_hospital_death': N_IN_HOSPITAL_DEATH,
+    'post_hospital_death': N_POST_HOSPITAL_DEATH,
+    'survived': N_SURVIVED,
+}
+
+# 코호트 추출 대상: {결과 이름: (테이블, 필터 컬럼)}
+# (patients는 샘플링 단계에서 이미 읽었으므로 메모리에서 필터링)
+COHORT_TABLES = {
+    'transfers': ('core/transfers', 'hadm_id'),
+    'hosp_diagnoses_icd': ('hosp/diagnoses_icd', 'subject_id'),
+    'hosp_procedures_icd': ('hosp/procedures_icd', 'subject_id'),
+    'hosp_labevents': ('hosp/labevents', 'subject_id'),
+    'hosp_prescriptions': ('hosp/prescriptions', 'subject_id'),
+    'hosp_services': ('hosp/services', 'subject_id'),
+    'icu_icustays': ('icu/icustays', 'hadm_id'),
+}
+
+# 샘플 묶음(--family) 공유 테이블: 코호트 테이블 + patients
+FAMILY_TABLES = {'patients': ('core/patients', 'subject_id'), **COHORT_TABLES}
+
 def load_main_data():
     """메인 데이터 로드 (admissions, patients)"""
     print("=" * 80)
@@ -33,9 +75,9 @@ def load_main_data():
     print("=" * 80)
     print("\n1. 데이터 로딩 중...")
     
-    # 데이터 로드
-    admissions = pd.read_csv(os.path.join(BASE_PATH, 'dataset2/core/admissions.csv'))
-    patients = pd.read_csv(os.path.join(BASE_PATH, 'dataset2/core/patients.csv'))
+    # 데이터 로드 (Parquet 캐시)
+    admissions = load_table('core/admissions', base_path=BASE_PATH)
+    patients = load_table('core/patients', base_path=BASE_PATH)
     
     print(f"✅ Admissions 로드: {len(admissions):,} 건")
     print(f"✅ Patients 로드: {len(patients):,} 명")
@@ -86,32 +128,32 @@ def categorize_admissions(df):
     
     return in_hospital_death, post_hospital_death, survived
 
-def perform_sampling(in_hospital_death, post_hospital_death, survived):
+def perform_sampling(in_hospital_death, post_hospital_death, survived, quotas=SAMPLE_QUOTAS):
     """각 그룹에서 랜덤 샘플링"""
     print("\n4. 샘플링 수행 중...")
     
     samples = {}
     
     # 병원 내 사망 샘플링
-    n_in_hospital = min(N_IN_HOSPITAL_DEATH, len(in_hospital_death))
+    n_in_hospital = min(quotas['in_hospital_death'], len(in_hospital_death))
     samples['in_hospital_death'] = in_hospital_death.sample(
         n=n_in_hospital, random_state=RANDOM_STATE
     )
-    print(f"✅ 병원 내 사망: {n_in_hospital}/{N_IN_HOSPITAL_DEATH} 샘플")
+    print(f"✅ 병원 내 사망: {n_in_hospital}/{quotas['in_hospital_death']} 샘플")
     
     # 병원 후 사망 샘플링
-    n_post_hospital = min(N_POST_HOSPITAL_DEATH, len(post_hospital_death))
+    n_post_hospital = min(quotas['post_hospital_death'], len(post_hospital_death))
     samples['post_hospital_death'] = post_hospital_death.sample(
         n=n_post_hospital, random_state=RANDOM_STATE
     )
-    print(f"✅ 병원 후 사망: {n_post_hospital}/{N_POST_HOSPITAL_DEATH} 샘플")
+    print(f"✅ 병원 후 사망: {n_post_hospital}/{quotas['post_hospital_death']} 샘플")
     
     # 생존 샘플링
-    n_survived = min(N_SURVIVED, len(survived))
+    n_survived = min(quotas['survived'], len(survived))
     samples['survived'] = survived.sample(
         n=n_survived, random_state=RANDOM_STATE
     )
-    print(f"✅ 생존: {n_survived}/{N_SURVIVED} 샘플")
+    print(f"✅ 생존: {n_survived}/{quotas['survived']} 샘플")
     
     # 전체 샘플 합치기
     sampled_admissions = pd.concat([
@@ -124,7 +166,170 @@ def perform_sampling(in_hospital_death, post_hospital_death, survived):
     
     return sampled_admissions, samples
 
-def extract_related_data(sampled_admissions):
+def matching_frame(df, patients):
+    """매칭 키만 담은 프레임 (hadm_id, anchor_age, gender, admission_type, admit_year)"""
+    gender = patients.set_index('subject_id')['gender']
+    frame = df[['hadm_id', 'anchor_age', 'admission_type', 'admittime']].copy()
+    frame['gender'] = df['subject_id'].map(gender).values
+    return add_admit_year(frame)
+
+def perform_matched_sampling(in_hospital_death, post_hospital_death, survived, patients, quotas=SAMPLE_QUOTAS):
+    """사망 그룹은 랜덤 샘플링, 생존 그룹은 사망 입원에 매칭해서 추출"""
+    print("\n4. 매칭 샘플링 수행 중...")
+    
+    samples = {}
+    
+    # 사망 그룹은 기존과 같은 랜덤 샘플링
+    n_in_hospital = min(quotas['in_hospital_death'], len(in_hospital_death))
+    samples['in_hospital_death'] = in_hospital_death.sample(n=n_in_hospital, random_state=RANDOM_STATE)
+    print(f"✅ 병원 내 사망: {n_in_hospital}/{quotas['in_hospital_death']} 샘플")
+    
+    n_post_hospital = min(quotas['post_hospital_death'], len(post_hospital_death))
+    samples['post_hospital_death'] = post_hospital_death.sample(n=n_post_hospital, random_state=RANDOM_STATE)
+    print(f"✅ 병원 후 사망: {n_post_hospital}/{quotas['post_hospital_death']} 샘플")
+    
+    # 생존: 사망 입원마다 조건이 맞는 생존 입원을 비복원 매칭 (그룹별 KD-tree)
+    deaths = pd.concat([samples['in_hospital_death'], samples['post_hospital_death']], ignore_index=True)
+    ratio = max(1, quotas['survived'] // max(len(deaths), 1))
+    case_frame = matching_frame(deaths, patients)
+    controls, report = match_controls(case_frame, matching_frame(survived, patients),
+                                      ratio=ratio, random_state=RANDOM_STATE)
+    
+    survived_index = pd.Index(survived['hadm_id'].values)
+    samples['survived'] = survived.iloc[survived_index.get_indexer(controls['hadm_id'].values)]
+    print(f"✅ 생존 (매칭 1:{ratio}): {len(samples['survived'])} 샘플 "
+          f"(매칭 실패 사망 입원 {report['unmatched_cases']}건)")
+    caliper_text = ', '.join(f'{col} ±{value:g}' for col, value in MATCH_CALIPERS.items())
+    print(f"   - 조건: gender, admission_type 일치 / {caliper_text}")
+    
+    # 매칭 전(기존 랜덤 샘플) / 후 균형 비교
+    random_controls = survived.sample(n=min(quotas['survived'], len(survived)), random_state=RANDOM_STATE)
+    before = balance_table(case_frame, matching_frame(random_controls, patients))
+    after = balance_table(case_frame, controls)
+    # 두 표의 행(범주 수준)이 다를 수 있으므로 변수 이름으로 맞춤
+    # (예: 랜덤 생존에만 있는 admission_type 수준 → 사망 / 매칭 대조군 모두 비율 0, SMD 0)
+    balance = before.merge(after, on='variable', how='outer', suffixes=('_random', '_matched'), sort=False)
+    balance.insert(1, 'case', balance.pop('case_random').fillna(balance.pop('case_matched')))
+    balance = balance.fillna(0.0)
+    order = pd.Index(pd.unique(pd.concat([before['variable'], after['variable']])))
+    balance = balance.iloc[order.get_indexer(balance['variable'])
+                           .argsort(kind='stable')].reset_index(drop=True)
+    
+    print(f"\n📊 균형 비교 (SMD, 사망 vs 생존):")
+    for _, row in balance.iterrows():
+        print(f"• {row['variable']}: 랜덤 {row['smd_random']:+.3f} → 매칭 {row['smd_matched']:+.3f}")
+    
+    output_path = os.path.join(BASE_PATH, 'analysis_samplingmethod/data')
+    balance.to_csv(os.path.join(output_path, 'matching_balance.csv'), index=False)
+    controls[['matched_hadm_id', 'hadm_id', 'match_distance']].rename(
+        columns={'matched_hadm_id': 'case_hadm_id', 'hadm_id': 'control_hadm_id'}
+    ).to_csv(os.path.join(output_path, 'matched_pairs.csv'), index=False)
+    print(f"✅ matching_balance.csv / matched_pairs.csv 저장")
+    
+    sampled_admissions = pd.concat([
+        samples['in_hospital_death'],
+        samples['post_hospital_death'],
+        samples['survived']
+    ], ignore_index=True)
+    
+    print(f"\n✅ 총 샘플 수: {len(sampled_admissions):,} 건")
+    
+    return sampled_admissions, samples
+
+def perform_stream_sampling(quotas=SAMPLE_QUOTAS):
+    """admissions.csv를 한 번 스트리밍하며 그룹별 저수지 샘플링 (병합/분할 사본 없음)"""
+    print("=" * 80)
+    print("📊 MIMIC-IV 데이터 샘플링 (스트리밍)")
+    print("=" * 80)
+    print("\n1. patients 로딩 중...")
+    
+    # patients는 환자 단위라 작음 → 메모리에 두고 subject_id로 조회
+    patients = load_table('core/patients', base_path=BASE_PATH)
+    print(f"✅ Patients 로드: {len(patients):,} 명")
+    
+    print("\n2~4. admissions 스트리밍 + 그룹 판정 + 저수지 샘플링...")
+    samples, stream_stats = stream_stratified_sample(patients, quotas, random_state=RANDOM_STATE,
+                                                     base_path=BASE_PATH)
+    
+    print(f"✅ Admissions 읽음: {stream_stats['rows_read']:,} 건 ({stream_stats['chunks']}개 청크)")
+    print(f"✅ 0세 환자 제외: {stream_stats['excluded']:,} 건")
+    print(f"✅ 샘플링 대상: {stream_stats['eligible']:,} 건")
+    
+    print(f"\n분류 결과:")
+    print(f"• 병원 내 사망: {stream_stats['strata']['in_hospital_death']:,} 건")
+    print(f"• 병원 후 사망: {stream_stats['strata']['post_hospital_death']:,} 건")
+    print(f"• 생존: {stream_stats['strata']['survived']:,} 건")
+    
+    print()
+    print(f"✅ 병원 내 사망: {len(samples['in_hospital_death'])}/{quotas['in_hospital_death']} 샘플")
+    print(f"✅ 병원 후 사망: {len(samples['post_hospital_death'])}/{quotas['post_hospital_death']} 샘플")
+    print(f"✅ 생존: {len(samples['survived'])}/{quotas['survived']} 샘플")
+    
+    sampled_admissions = pd.concat(list(samples.values()), ignore_index=True)
+    print(f"\n✅ 총 샘플 수: {len(sampled_admissions):,} 건")
+    
+    return sampled_admissions, samples, patients, stream_stats['strata']
+
+def perform_family_sampling(quotas, n_samples, bootstrap=False):
+    """샘플 K개를 한 번에 뽑고, 관련 테이블은 ID 합집합으로 한 번만 추출해서 공유"""
+    print("=" * 80)
+    print(f"📊 MIMIC-IV 샘플 묶음 ({n_samples}개, {'bootstrap' if bootstrap else '다중 시드'})")
+    print("=" * 80)
+    
+    patients = load_table('core/patients', base_path=BASE_PATH)
+    print(f"✅ Patients 로드: {len(patients):,} 명")
+    
+    print("\n1. admissions 스트리밍 + 샘플 추출...")
+    if bootstrap:
+        # 기준 샘플 하나를 뽑고 층마다 같은 크기로 복원 추출
+        base_samples, stream_stats = stream_stratified_sample(patients, quotas, random_state=RANDOM_STATE,
+                                                              base_path=BASE_PATH)
+        family = bootstrap_family(base_samples, n_samples, random_state=RANDOM_STATE)
+        seeds = None
+    else:
+        # 시드별 저수지를 동시에 유지 (admissions는 한 번만 읽음)
+        seeds = [RANDOM_STATE + k for k in range(n_samples)]
+        family, stream_stats = stream_sample_family(patients, quotas, seeds, base_path=BASE_PATH)
+    print(f"✅ Admissions 읽음: {stream_stats['rows_read']:,} 건, 샘플링 대상: {stream_stats['eligible']:,} 건")
+    
+    # 모든 샘플의 ID 합집합으로 한 번만 추출
+    subject_ids = family_ids(family, 'subject_id')
+    hadm_ids = family_ids(family, 'hadm_id')
+    print(f"\n2. 관련 데이터 추출 (합집합: 환자 {len(subject_ids):,} 명 / 입원 {len(hadm_ids):,} 건)...")
+    results, errors = extract_cohort(COHORT_TABLES, {'subject_id': subject_ids, 'hadm_id': hadm_ids},
+                                     base_path=BASE_PATH)
+    for name, error in errors.items():
+        print(f"❌ {name} 처리 중 오류: {error}")
+    tables = {'patients': patients[patients['subject_id'].isin(subject_ids)], **results}
+    specs = {name: spec for name, spec in FAMILY_TABLES.items() if name in tables}
+    for name, df in tables.items():
+        print(f"✅ {name}: {len(df):,} 행")
+    
+    meta = {
+        'mode': 'bootstrap' if bootstrap else 'seeds',
+        'random_state': RANDOM_STATE,
+        'seeds': seeds,
+        'quotas': quotas,
+        'population_strata': stream_stats['strata'],
+        'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    sample_family = SampleFamily.from_samples(family, tables, specs, meta)
+    
+    print("\n3. 샘플 묶음 저장...")
+    family_dir = os.path.join(BASE_PATH, FAMILY_DIRNAME)
+    sample_family.save(family_dir)
+    print(f"✅ 저장: {FAMILY_DIRNAME}/ (공유 테이블 {len(tables) + 1}개 + members.npz)")
+    
+    # 샘플 간 안정성: 그룹별 평균 연령의 샘플 간 평균 ± 표준편차
+    print(f"\n📊 샘플 간 변동 (그룹별 평균 연령):")
+    ages = pd.DataFrame([sample_family.admissions(k).groupby('mortality_group')['anchor_age'].mean()
+                         for k in range(len(sample_family))])
+    for group in ages.columns:
+        print(f"• {group}: {ages[group].mean():.2f} ± {ages[group].std():.2f} 세")
+    
+    return sample_family
+
+def extract_related_data(sampled_admissions, patients):
     """샘플된 admission과 관련된 모든 데이터 추출"""
     print("\n5. 관련 데이터 추출 중...")
     
@@ -135,15 +340,20 @@ def extract_related_data(sampled_admissions):
     print(f"• 고유 환자 수: {len(sampled_subject_ids):,} 명")
     print(f"• 고유 입원 수: {len(sampled_hadm_ids):,} 건")
     
+    # 모든 테이블을 한 번씩만, 동시에 필터링 (메모리에는 추출 결과만 유지)
+    print("\n⏳ Core / Hosp / ICU 테이블 동시 추출 중...")
+    results, errors = extract_cohort(
+        COHORT_TABLES,
+        {'subject_id': sampled_subject_ids, 'hadm_id': sampled_hadm_ids},
+        base_path=BASE_PATH
+    )
+    
     extracted_data = {}
     
-    # Core 테이블 추출
+    # Core 테이블
     print("\n5.1 Core 테이블 추출...")
-    
-    # patients
-    patients_full = pd.read_csv(os.path.join(BASE_PATH, 'dataset2/core/patients.csv'))
-    extracted_data['patients'] = patients_full[
-        patients_full['subject_id'].isin(sampled_subject_ids)
+    extracted_data['patients'] = patients[
+        patients['subject_id'].isin(sampled_subject_ids)
     ]
     print(f"✅ patients: {len(extracted_data['patients']):,} 행")
     
@@ -151,62 +361,30 @@ def extract_related_data(sampled_admissions):
     extracted_data['admissions'] = sampled_admissions
     print(f"✅ admissions: {len(extracted_data['admissions']):,} 행")
     
-    # transfers
-    transfers = pd.read_csv(os.path.join(BASE_PATH, 'dataset2/core/transfers.csv'))
-    extracted_data['transfers'] = transfers[
-        transfers['hadm_id'].isin(sampled_hadm_ids)
-    ]
+    extracted_data['transfers'] = results['transfers']
     print(f"✅ transfers: {len(extracted_data['transfers']):,} 행")
     
-    # Hosp 테이블 추출 (주요 테이블만)
+    # Hosp 테이블 (주요 테이블만)
     print("\n5.2 Hosp 테이블 추출...")
-    hosp_tables = [
-        'diagnoses_icd', 'procedures_icd', 'labevents', 
-        'prescriptions', 'services'
-    ]
-    
-    for table in hosp_tables:
-        try:
-            file_path = os.path.join(BASE_PATH, f'dataset2/hosp/{table}.csv')
-            if os.path.exists(file_path):
-                # 첫 줄을 읽어 컬럼 확인
-                temp_df = pd.read_csv(file_path, nrows=1)
-                
-                if 'subject_id' in temp_df.columns:
-                    df = pd.read_csv(file_path)
-                    extracted_data[f'hosp_{table}'] = df[
-                        df['subject_id'].isin(sampled_subject_ids)
-                    ]
-                elif 'hadm_id' in temp_df.columns:
-                    df = pd.read_csv(file_path)
-                    extracted_data[f'hosp_{table}'] = df[
-                        df['hadm_id'].isin(sampled_hadm_ids)
-                    ]
-                else:
-                    print(f"⚠️ {table}: subject_id/hadm_id 컬럼 없음")
-                    continue
-                    
-                print(f"✅ {table}: {len(extracted_data[f'hosp_{table}']):,} 행")
-            else:
-                print(f"⚠️ {table}: 파일 없음")
-        except Exception as e:
-            print(f"❌ {table} 처리 중 오류: {e}")
-    
-    # ICU 테이블 추출 (주요 테이블만)
+    for name in COHORT_TABLES:
+        if not name.startswith('hosp_'):
+            continue
+        table = name.replace('hosp_', '')
+        if name in results:
+            extracted_data[name] = results[name]
+            print(f"✅ {table}: {len(results[name]):,} 행")
+        else:
+            print(f"❌ {table} 처리 중 오류: {errors[name]}")
+    
+    # ICU 테이블 (주요 테이블만)
     print("\n5.3 ICU 테이블 추출...")
-    
-    # icustays 먼저 추출
-    try:
-        icustays = pd.read_csv(os.path.join(BASE_PATH, 'dataset2/icu/icustays.csv'))
-        extracted_data['icu_icustays'] = icustays[
-            icustays['hadm_id'].isin(sampled_hadm_ids)
-        ]
+    if 'icu_icustays' in results:
+        extracted_data['icu_icustays'] = results['icu_icustays']
         sampled_stay_ids = extracted_data['icu_icustays']['stay_id'].unique()
         print(f"✅ icustays: {len(extracted_data['icu_icustays']):,} 행")
         print(f"• ICU stays: {len(sampled_stay_ids):,} 건")
-    except Exception as e:
-        print(f"❌ icustays 처리 중 오류: {e}")
-        sampled_stay_ids = []
+    else:
+        print(f"❌ icustays 처리 중 오류: {errors['icu_icustays']}")
     
     return extracted_data, sampled_subject_ids, sampled_hadm_ids
 
@@ -256,11 +434,19 @@ def save_extracted_data(extracted_data):
         )
         print(f"✅ icustays_sampled.csv 저장")
 
-def analyze_sample_statistics(sampled_admissions, samples):
-    """샘플 통계 분석 및 시각화"""
+def analyze_sample_statistics(sampled_admissions, samples, patients, population_strata=None, design='random'):
+    """
+    샘플 통계 분석 및 시각화 (patients: 추출된 샘플 환자 테이블)
+    
+    population_strata: {그룹: 전체 대상 입원 수} → 가중치(sampling_weight) 계산용
+    design: 'random' / 'matched' (매칭된 생존 그룹은 가중치로 전체 추정 불가)
+    """
     print("\n7. 샘플 통계 분석...")
     
     stats = {}
+    stats['sampling_design'] = design
+    if population_strata is not None:
+        stats['population_strata'] = {name: int(n) for name, n in population_strata.items()}
     
     # 기본 통계
     stats['total_samples'] = len(sampled_admissions)
@@ -277,8 +463,7 @@ def analyze_sample_statistics(sampled_admissions, samples):
     # 성별 분포
     stats['gender_distribution'] = {}
     for group_name, group_df in samples.items():
-        # subject_id로 patients 정보 가져오기
-        patients = pd.read_csv(os.path.join(BASE_PATH, 'dataset2/core/patients.csv'))
+        # subject_id로 patients 정보 가져오기 (이미 추출된 테이블 재사용)
         group_with_gender = group_df.merge(
             patients[['subject_id', 'gender']], 
             on='subject_id', 
@@ -291,7 +476,7 @@ def analyze_sample_statistics(sampled_admissions, samples):
     create_visualizations(samples, stats)
     
     # 결과 저장
-    save_results(stats, sampled_admissions)
+    save_results(stats, sampled_admissions, samples)
     
     return stats
 
@@ -374,8 +559,8 @@ def plot_gender_pie(ax, gender_dict, title):
         ax.text(0.5, 0.5, 'No Data', ha='center', va='center')
         ax.set_title(title, fontsize=10, fontweight='bold')
 
-def save_results(stats, sampled_admissions):
-    """분석 결과 저장"""
+def save_results(stats, sampled_admissions, samples):
+    """분석 결과 저장 (sampled_admissions: samples를 그룹 순서대로 합친 것)"""
     print("\n9. 결과 저장 중...")
     
     output_path = os.path.join(BASE_PATH, 'analysis_samplingmethod/data')
@@ -388,13 +573,16 @@ def save_results(stats, sampled_admissions):
         json.dump(stats, f, indent=2)
     print(f"✅ sampling_results.json 저장")
     
-    # 샘플링된 ID 저장
+    # 샘플링된 ID 저장 (mortality_group = 실제로 추출된 그룹, 기준이 겹치는 입원도 추출 그룹 그대로)
     sampled_ids = sampled_admissions[['subject_id', 'hadm_id', 'hospital_expire_flag']].copy()
-    sampled_ids['mortality_group'] = sampled_admissions.apply(
-        lambda x: 'in_hospital_death' if x['hospital_expire_flag'] == 1
-        else 'post_hospital_death' if pd.notna(x['dod'])
-        else 'survived', axis=1
-    )
+    sampled_ids['mortality_group'] = np.repeat(list(samples), [len(rows) for rows in samples.values()])
+    
+    # 그룹별 역확률 가중치 (전체 그룹 크기 / 샘플 크기) → 전체 코호트 기준 추정용
+    if 'population_strata' in stats and stats['sampling_design'] != 'matched':
+        sampled_ids['sampling_weight'] = admission_weights(sampled_ids['mortality_group'],
+                                                           stats['population_strata'])
+        for group, weight in sampled_ids.groupby('mortality_group', sort=False)['sampling_weight'].first().items():
+            print(f"   - {group} 가중치: {weight:,.1f} (샘플 1건 = 전체 {weight:,.1f}건)")
     
     sampled_ids.to_csv(os.path.join(output_path, 'sampled_ids.csv'), index=False)
     print(f"✅ sampled_ids.csv 저장")
@@ -416,33 +604,72 @@ def save_results(stats, sampled_admissions):
                         index=False)
     print(f"✅ sampling_statistics.csv 저장")
 
+def parse_args():
+    """명령행 인자 파싱"""
+    parser = argparse.ArgumentParser(description='MIMIC-IV 층화 샘플링')
+    parser.add_argument('--stream', action='store_true',
+                        help='admissions.csv를 한 번 스트리밍하며 그룹별 저수지 샘플링')
+    parser.add_argument('--scale', type=int, default=1,
+                        help='그룹별 할당량 배수 (기본 300/300/600)')
+    parser.add_argument('--family', type=int, default=0,
+                        help='샘플 K개를 한 번에 추출해서 processed_data/sample_family/에 저장')
+    parser.add_argument('--bootstrap', action='store_true',
+                        help='--family에서 시드 대신 기준 샘플의 층화 bootstrap 사용')
+    parser.add_argument('--matched', action='store_true',
+                        help='생존 그룹을 사망 입원에 매칭 (anchor_age, gender, admission_type, 입원 연도)')
+    args = parser.parse_args()
+    if args.matched and (args.stream or args.family):
+        parser.error('--matched는 --stream / --family와 함께 쓸 수 없습니다')
+    return args
+
 def main():
     """메인 실행 함수"""
+    args = parse_args()
+    quotas = {name: n * args.scale for name, n in SAMPLE_QUOTAS.items()}
+    
+    if args.family:
+        perform_family_sampling(quotas, args.family, bootstrap=args.bootstrap)
+        return None
+    
     try:
-        # 1. 데이터 로드
-        admissions, patients = load_main_data()
-        
-        # 2. 데이터 준비
-        df_filtered = prepare_sampling_data(admissions, patients)
-        
-        # 3. 데이터 분류
-        in_hospital_death, post_hospital_death, survived = categorize_admissions(df_filtered)
-        
-        # 4. 샘플링
-        sampled_admissions, samples = perform_sampling(
-            in_hospital_death, post_hospital_death, survived
-        )
+        if args.stream:
+            # 1~4. 스트리밍 층화 샘플링
+            sampled_admissions, samples, patients, population_strata = perform_stream_sampling(quotas)
+        else:
+            # 1. 데이터 로드
+            admissions, patients = load_main_data()
+            
+            # 2. 데이터 준비
+            df_filtered = prepare_sampling_data(admissions, patients)
+            
+            # 3. 데이터 분류
+            in_hospital_death, post_hospital_death, survived = categorize_admissions(df_filtered)
+            population_strata = {'in_hospital_death': len(in_hospital_death),
+                                 'post_hospital_death': len(post_hospital_death),
+                                 'survived': len(survived)}
+            
+            # 4. 샘플링 (--matched: 생존 그룹은 사망 입원에 매칭)
+            if args.matched:
+                sampled_admissions, samples = perform_matched_sampling(
+                    in_hospital_death, post_hospital_death, survived, patients, quotas
+                )
+            else:
+                sampled_admissions, samples = perform_sampling(
+                    in_hospital_death, post_hospital_death, survived, quotas
+                )
         
         # 5. 관련 데이터 추출
         extracted_data, sampled_subject_ids, sampled_hadm_ids = extract_related_data(
-            sampled_admissions
+            sampled_admissions, patients
         )
         
         # 6. 데이터 저장
         save_extracted_data(extracted_data)
         
         # 7. 통계 분석 및 시각화
-        stats = analyze_sample_statistics(sampled_admissions, samples)
+        stats = analyze_sample_statistics(sampled_admissions, samples,
+                                          extracted_data['patients'], population_strata,
+                                          design='matched' if args.matched else 'random')
         
         print("\n" + "=" * 80)
         print("✅ 샘플링 완료!")
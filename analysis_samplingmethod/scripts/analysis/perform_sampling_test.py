@@ -8,10 +8,16 @@ import pandas as pd
 import numpy as np
 import os
 import json
+import sys
+from pathlib import Path
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+# 공용 유틸리티 (프로젝트 루트의 mimic_utils)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from mimic_utils.table_cache import load_table
+
 # 설정
 RANDOM_STATE = 42
 BASE_PATH = '/Users/hyungjun/Desktop/fast campus_lecture'
@@ -28,14 +34,11 @@ def main():
     
     # 1. 데이터 로드
     print("\n1. 데이터 로딩 중...")
-    admissions_path = os.path.join(BASE_PATH, 'dataset2/core/admissions.csv')
-    patients_path = os.path.join(BASE_PATH, 'dataset2/core/patients.csv')
-    
-    # 필요한 컬럼만 로드
-    admissions = pd.read_csv(admissions_path, 
-                            usecols=['hadm_id', 'subject_id', 'hospital_expire_flag'])
-    patients = pd.read_csv(patients_path,
-                          usecols=['subject_id', 'anchor_age', 'gender', 'dod'])
+    # 필요한 컬럼만 로드 (Parquet 캐시)
+    admissions = load_table('core/admissions', base_path=BASE_PATH,
+                            columns=['hadm_id', 'subject_id', 'hospital_expire_flag'])
+    patients = load_table('core/patients', base_path=BASE_PATH,
+                          columns=['subject_id', 'anchor_age', 'gender', 'dod'])
     
     print(f"✅ Admissions 로드: {len(admissions):,} 건")
     print(f"✅ Patients 로드: {len(patients):,} 명")
@@ -139,10 +142,8 @@ def main():
     print(f"✅ admissions_sampled.csv 저장 ({len(sampled_admissions_full)} 행)")
     
     # patients 저장
-    patients_full = pd.read_csv(patients_path)
-    sampled_patients = patients_full[
-        patients_full['subject_id'].isin(sampled_subject_ids)
-    ]
+    sampled_patients = load_table('core/patients', base_path=BASE_PATH,
+                                  filters=[('subject_id', 'in', sampled_subject_ids)])
     sampled_patients.to_csv(
         os.path.join(core_path, 'patients_sampled.csv'), index=False
     )
@@ -150,19 +151,11 @@ def main():
     
     # transfers 저장
     print("\n8. Transfers 테이블 추출 중...")
-    transfers_path = os.path.join(BASE_PATH, 'dataset2/core/transfers.csv')
-    
-    # 청크로 읽어서 필터링 (메모리 절약)
-    chunk_size = 100000
-    transfers_filtered = []
-    
-    for chunk in pd.read_csv(transfers_path, chunksize=chunk_size):
-        filtered = chunk[chunk['hadm_id'].isin(sampled_hadm_ids)]
-        if not filtered.empty:
-            transfers_filtered.append(filtered)
+    # 필터 조건을 Parquet 캐시에 전달 (메모리 절약)
+    transfers_sampled = load_table('core/transfers', base_path=BASE_PATH,
+                                   filters=[('hadm_id', 'in', sampled_hadm_ids)])
     
-    if transfers_filtered:
-        transfers_sampled = pd.concat(transfers_filtered, ignore_index=True)
+    if not transfers_sampled.empty:
         transfers_sampled.to_csv(
             os.path.join(core_path, 'transfers_sampled.csv'), index=False
         )
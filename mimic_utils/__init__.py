@@ -0,0 +1,4 @@
+"""
+MIMIC-IV 분석 스크립트 공용 유틸리티
+- 각 analysis_* 폴더의 스크립트가 공통으로 사용하는 처리 엔진 모음
+"""
@@ -0,0 +1,106 @@
+"""
+코호트 다중 테이블 추출기
+- 샘플 subject_id / hadm_id / stay_id 집합으로 여러 테이블을 동시에(스레드) 필터링
+- 테이블마다 가장 싼 경로를 선택: 분할 저장소 > Parquet 캐시 > CSV 청크 스트리밍
+- 어떤 경로든 원본은 실행당 한 번만 읽고, 메모리에는 필터된 결과만 남김
+"""
+
+import os
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from mimic_utils.table_cache import PROJECT_ROOT, STRING_COLUMNS, HAS_PYARROW, is_cache_valid, load_table
+from mimic_utils.partitioned_store import has_store, read_cohort
+from mimic_utils.schema import apply_schema, csv_dtypes
+
+CHUNK_SIZE = 500_000
+N_WORKERS = 4
+
+
+def filter_table(table, key, ids, columns=None, base_path=None, chunk_size=CHUNK_SIZE):
+    """
+    한 테이블에서 key 컬럼이 ids에 포함된 행만 추출
+
+    Parameters
+    ----------
+    table : str
+        'core/transfers' 형식 (dataset2 기준 경로)
+    key : str
+        필터 컬럼 ('subject_id', 'hadm_id', 'stay_id')
+    ids : iterable
+        포함할 ID 집합
+    columns : list, optional
+        결과에 남길 컬럼 (column projection)
+    """
+    base = Path(base_path) if base_path else PROJECT_ROOT
+    csv_path = base / 'dataset2' / f'{table}.csv'
+
+    if key == 'subject_id' and has_store(table, base_path):
+        return read_cohort(table, ids, columns=columns, base_path=base_path)
+
+    if not csv_path.exists():
+        raise FileNotFoundError(f"{table}: 파일 없음")
+
+    if HAS_PYARROW and is_cache_valid(table, base_path):
+        return load_table(table, columns=columns, filters=[(key, 'in', ids)], base_path=base_path)
+
+    # CSV 청크 스트리밍: 필요한 컬럼만 파싱하고 매칭 행만 보관
+    header = pd.read_csv(csv_path, nrows=0).columns
+    usecols = None
+    if columns:
+        usecols = list(dict.fromkeys([key] + list(columns)))
+    # category는 청크마다 범주가 달라 concat 시 object로 풀리므로 합친 뒤에 적용
+    dtype = {col: str for col in header if col in STRING_COLUMNS}
+    dtype.update({col: t for col, t in csv_dtypes(table, header).items() if t != 'category'})
+    id_index = pd.Index(list(ids))
+
+    frames = []
+    for chunk in pd.read_csv(csv_path, usecols=usecols, dtype=dtype, chunksize=chunk_size):
+        matched = chunk[chunk[key].isin(id_index)]
+        if not matched.empty:
+            frames.append(matched)
+
+    if not frames:
+        return pd.DataFrame(columns=columns or header)
+    result = pd.concat(frames, ignore_index=True)
+    return apply_schema(result[columns] if columns else result, table)
+
+
+def extract_cohort(table_specs, ids, base_path=None, n_workers=N_WORKERS):
+    """
+    여러 테이블을 동시에 코호트 필터링
+
+    Parameters
+    ----------
+    table_specs : dict
+        {결과 이름: (테이블, key 컬럼)} 또는 {결과 이름: (테이블, key 컬럼, 컬럼 목록)}
+    ids : dict
+        {'subject_id': ids, 'hadm_id': ids, 'stay_id': ids}
+
+    Returns
+    -------
+    (results, errors)
+        results: {결과 이름: DataFrame}, errors: {결과 이름: 오류 메시지}
+    """
+    id_sets = {key: set(values) for key, values in ids.items()}
+
+    def run(item):
+        name, spec = item
+        table, key = spec[0], spec[1]
+        columns = spec[2] if len(spec) > 2 else None
+        return name, filter_table(table, key, id_sets[key], columns=columns, base_path=base_path)
+
+    results = {}
+    errors = {}
+    with ThreadPoolExecutor(max_workers=n_workers or os.cpu_count()) as executor:
+        futures = {name: executor.submit(run, (name, spec)) for name, spec in table_specs.items()}
+        for name, future in futures.items():
+            try:
+                _, df = future.result()
+                results[name] = df
+            except Exception as e:
+                errors[name] = str(e)
+
+    return results, errors
@@ -0,0 +1,193 @@
+"""
+subject_id 기준 교차검증 (여러 모델 × 세 타겟 병렬)
+- 같은 환자의 입원이 학습/검증에 나뉘지 않도록 GroupKFold(subject_id) 분할
+- 전처리(중앙값 대체 / + StandardScaler)는 fold_cache가 fold마다 한 번만 fit해서 memory-map .npy로 저장
+  → 모델 · 타겟마다 다시 대체 / 스케일링하지 않음 (선형 모델은 impute_scale, 트리 모델은 impute 행렬)
+- (모델, 타겟, fold) 조합을 프로세스 풀에 분배, 워커는 행렬 경로만 받아 memory-map으로 열기
+- fold마다 학습 / 예측 시간, 최대 메모리를 지표와 함께 기록
+  - peak_alloc_mb: 학습 / 예측 중 Python · numpy 할당 최대치 (tracemalloc, Cython 내부 버퍼는 제외)
+  - worker_max_rss_mb: 그 fold까지 워커 프로세스의 최대 RSS (memory-map 행렬은 페이지 캐시 공유)
+
+사용 예:
+    fold_sets = {pre: build_folds(X, groups=subject_ids, preprocess=pre, base_path=BASE_DIR)
+                 for pre in required_preprocessors(['linear', 'rf'])}
+    rows = cross_validate(fold_sets, {'death_binary': (y, 'classification')}, ['linear', 'rf'], workers=4)
+    summary = summarize_folds(rows)
+"""
+
+import sys
+import time
+import resource
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from mimic_utils.fold_cache import open_array
+from mimic_utils.model_tuning import make_model, HAS_XGBOOST
+
+# 후보 모델 (02_baseline / 03_tree 노트북과 같은 설정)
+CANDIDATE_MODELS = {
+    'linear': {
+        'description': 'Logistic / Linear Regression',
+        'preprocess': 'impute_scale',
+        'params': {},
+    },
+    'rf': {
+        'description': 'Random Forest',
+        'preprocess': 'impute',
+        'params': {'max_depth': 10, 'min_samples_split': 20, 'min_samples_leaf': 10},
+        'n_estimators': 100,
+    },
+    'xgb': {
+        'description': 'XGBoost',
+        'preprocess': 'impute',
+        'params': {'max_depth': 6, 'learning_rate': 0.1, 'subsample': 0.8, 'colsample_bytree': 0.8},
+        'n_estimators': 100,
+    },
+}
+
+CLASSIFICATION_METRICS = ('auroc', 'f1_score', 'precision', 'recall')
+REGRESSION_METRICS = ('mae', 'rmse', 'r2')
+
+# ru_maxrss 단위: Linux는 KB, macOS는 byte
+_RSS_TO_MB = 1 / 1024 ** 2 if sys.platform == 'darwin' else 1 / 1024
+
+
+def available_models(names):
+    """요청한 후보 중 사용 가능한 것 (xgboost 미설치면 xgb 제외)"""
+    unknown = [name for name in names if name not in CANDIDATE_MODELS]
+    if unknown:
+        raise ValueError(f"지원하지 않는 모델입니다: {unknown} (가능: {list(CANDIDATE_MODELS)})")
+    return [name for name in names if name != 'xgb' or HAS_XGBOOST]
+
+
+def required_preprocessors(models):
+    """모델 목록에 필요한 fold 전처리 이름 (build_folds의 preprocess)"""
+    return list(dict.fromkeys(CANDIDATE_MODELS[name]['preprocess'] for name in models))
+
+
+def make_candidate(name, task, random_state=42):
+    """후보 이름 + 작업 → 학습 전 추정기 (워커 안에서는 n_jobs=1)"""
+    spec = CANDIDATE_MODELS[name]
+    if name == 'linear':
+        from sklearn.linear_model import LogisticRegression, LinearRegression
+        if task == 'classification':
+            return LogisticRegression(random_state=random_state, max_iter=1000)
+        return LinearRegression()
+    return make_model(name, task, spec['params'], spec['n_estimators'], random_state)
+
+
+def fold_metrics(task, y_valid, pred, proba=None):
+    """노트북과 같은 지표 (분류: AUROC, F1, precision, recall / 회귀: MAE, RMSE, R²)"""
+    from sklearn.metrics import (roc_auc_score, f1_score, precision_score, recall_score,
+                                 mean_absolute_error, mean_squared_error, r2_score)
+
+    if task == 'classification':
+        two_classes = len(np.unique(y_valid)) == 2
+        return {
+            'auroc': float(roc_auc_score(y_valid, proba)) if two_classes else float('nan'),
+            'f1_score': float(f1_score(y_valid, pred, zero_division=0)),
+            'precision': float(precision_score(y_valid, pred, zero_division=0)),
+            'recall': float(recall_score(y_valid, pred, zero_division=0)),
+        }
+    return {
+        'mae': float(mean_absolute_error(y_valid, pred)),
+        'rmse': float(np.sqrt(mean_squared_error(y_valid, pred))),
+        'r2': float(r2_score(y_valid, pred)),
+    }
+
+
+def _fit_fold(task_args):
+    """워커: fold 행렬을 memory-map으로 열고 후보 하나 학습 / 평가"""
+    name, target, task, fold, train_path, valid_path, y_train, y_valid, random_state = task_args
+    X_train, X_valid = open_array(train_path), open_array(valid_path)
+    # 추정기 생성(첫 호출의 sklearn import 포함)은 시간 / 메모리 측정에서 제외
+    estimator = make_candidate(name, task, random_state)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    estimator.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    pred = estimator.predict(X_valid)
+    proba = estimator.predict_proba(X_valid)[:, 1] if task == 'classification' else None
+    if task == 'regression':
+        # 입원기간은 음수가 될 수 없으므로 0으로 (노트북과 동일)
+        pred = np.maximum(pred, 0)
+    predict_seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    row = {
+        'model': name,
+        'target': target,
+        'fold': fold,
+        'n_train': len(y_train),
+        'n_valid': len(y_valid),
+        'fit_seconds': fit_seconds,
+        'predict_seconds': predict_seconds,
+        'peak_alloc_mb': peak / 1024 ** 2,
+        'worker_max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_TO_MB,
+    }
+    row.update(fold_metrics(task, y_valid, pred, proba))
+    return row
+
+
+def cross_validate(fold_sets, targets, models, workers=1, random_state=42):
+    """
+    후보 모델 × 타겟 × fold 교차검증
+
+    Parameters
+    ----------
+    fold_sets : dict
+        {전처리 이름: FoldSet} (required_preprocessors(models) 모두, 같은 groups / 분할 설정)
+    targets : dict
+        {타겟 이름: (y 배열, 'classification' 또는 'regression')} (원래 행 순서)
+    models : list
+        CANDIDATE_MODELS 이름
+    workers : int
+        프로세스 수 (1이면 현재 프로세스에서 순서대로)
+
+    Returns
+    -------
+    DataFrame
+        (모델, 타겟, fold)별 지표 + fit_seconds, predict_seconds, peak_alloc_mb(학습 / 예측 중 할당 최대치),
+        worker_max_rss_mb(그 시점까지 워커 프로세스 최대 RSS)
+    """
+    tasks = []
+    for name in models:
+        folds = fold_sets[CANDIDATE_MODELS[name]['preprocess']]
+        for target, (y, task) in targets.items():
+            for k in range(len(folds)):
+                train_path, valid_path = folds.paths(k)
+                y_train, y_valid = folds.split_target(y, k)
+                tasks.append((name, target, task, k, str(train_path), str(valid_path),
+                              y_train, y_valid, random_state))
+
+    # 오래 걸리는 모델(트리)부터 제출 → 마지막에 워커 하나만 바쁜 시간이 줄어듦
+    tasks.sort(key=lambda t: t[0] == 'linear')
+    if workers and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rows = list(executor.map(_fit_fold, tasks))
+    else:
+        rows = [_fit_fold(t) for t in tasks]
+
+    result = pd.DataFrame(rows)
+    return result.sort_values(['model', 'target', 'fold'], kind='stable').reset_index(drop=True)
+
+
+def summarize_folds(rows):
+    """(모델, 타겟)별 fold 평균 / 표준편차 + 시간 합, 최대 메모리"""
+    metrics = [col for col in CLASSIFICATION_METRICS + REGRESSION_METRICS if col in rows.columns]
+    grouped = rows.groupby(['model', 'target'], sort=False)
+    summary = grouped[metrics].agg(['mean', 'std'])
+    summary.columns = [f'{metric}_{stat}' for metric, stat in summary.columns]
+    summary['fit_seconds'] = grouped['fit_seconds'].sum()
+    summary['predict_seconds'] = grouped['predict_seconds'].sum()
+    summary['peak_alloc_mb'] = grouped['peak_alloc_mb'].max()
+    summary['worker_max_rss_mb'] = grouped['worker_max_rss_mb'].max()
+    # 해당 작업이 아닌 지표 컬럼 (모두 NaN) 정리
+    return summary.dropna(axis=1, how='all').reset_index()
@@ -0,0 +1,106 @@
+"""
+이벤트 시각 정수 표현
+- MIMIC 시각 문자열('2180-07-23 14:00:00')을 고정 포맷으로 한 번만 파싱
+- 파싱 결과를 int64 epoch 초 + int32 일 번호(1970-01-01 기준)로 보관
+- 윈도우 비교는 Python date 객체 대신 정수 배열 연산으로 수행
+"""
+
+import numpy as np
+import pandas as pd
+
+MIMIC_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+MIMIC_DATE_FORMAT = '%Y-%m-%d'
+
+SECONDS_PER_HOUR = 3600
+SECONDS_PER_DAY = 86400
+
+# 결측(NaT) 표시값
+MISSING_SECONDS = np.iinfo(np.int64).min
+MISSING_DAY = np.iinfo(np.int32).min
+
+
+def parse_times(values):
+    """
+    시각 문자열 → datetime64[ns] Series
+
+    고정 포맷(시분초 → 날짜만) 순서로 시도하고, 둘 다 맞지 않을 때만 ISO8601 추론으로 파싱
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.astype('datetime64[ns]')
+    for fmt in (MIMIC_TIME_FORMAT, MIMIC_DATE_FORMAT):
+        try:
+            return pd.to_datetime(series, format=fmt)
+        except (ValueError, TypeError):
+            continue
+    return pd.to_datetime(series, format='ISO8601')
+
+
+def epoch_seconds(times):
+    """시각 → int64 epoch 초 배열 (NaT는 MISSING_SECONDS)"""
+    values = parse_times(times).values.astype('datetime64[s]')
+    return values.astype(np.int64)
+
+
+def day_numbers(times):
+    """시각 → int32 일 번호 배열 (NaT는 MISSING_DAY)"""
+    return seconds_to_days(epoch_seconds(times))
+
+
+def seconds_to_days(seconds):
+    """epoch 초 → int32 일 번호 (결측 유지)"""
+    seconds = np.asarray(seconds, dtype=np.int64)
+    missing = seconds == MISSING_SECONDS
+    days = np.floor_divide(seconds, SECONDS_PER_DAY)
+    days[missing] = MISSING_DAY
+    return days.astype(np.int32)
+
+
+def days_to_datetime(days):
+    """int32 일 번호 → datetime64[ns] 배열 (자정, MISSING_DAY는 NaT)"""
+    days = np.asarray(days, dtype=np.int64)
+    result = days.astype('datetime64[D]').astype('datetime64[ns]')
+    result[days == MISSING_DAY] = np.datetime64('NaT')
+    return result
+
+
+def add_time_keys(df, column, prefix):
+    """
+    df[column]을 파싱해서 정수 시각 컬럼 추가 (제자리 수정 후 반환)
+
+    - {prefix}_sec : int64 epoch 초
+    - {prefix}_day : int32 일 번호
+
+    예: add_time_keys(labevents, 'charttime', 'chart') → chart_sec, chart_day
+    """
+    df[column] = parse_times(df[column]).values
+    seconds = epoch_seconds(df[column])
+    df[f'{prefix}_sec'] = seconds
+    df[f'{prefix}_day'] = seconds_to_days(seconds)
+    return df
+
+
+def day_offsets(event_day, anchor_day):
+    """이벤트 일 번호 - 기준 일 번호 (int64, 어느 한쪽이 결측이면 MISSING_DAY)"""
+    event_day = np.asarray(event_day, dtype=np.int64)
+    anchor_day = np.asarray(anchor_day, dtype=np.int64)
+    offsets = event_day - anchor_day
+    offsets[(event_day == MISSING_DAY) | (anchor_day == MISSING_DAY)] = MISSING_DAY
+    return offsets
+
+
+def in_day_window(event_day, anchor_day, start, end):
+    """기준일 대비 [start, end]일 범위에 있는지 (양 끝 포함)"""
+    offsets = day_offsets(event_day, anchor_day)
+    return (offsets != MISSING_DAY) & (offsets >= start) & (offsets <= end)
+
+
+def in_hour_window(event_sec, anchor_sec, start_hours, end_hours):
+    """기준 시각 대비 [start_hours, end_hours]시간 범위에 있는지 (양 끝 포함)"""
+    event_sec = np.asarray(event_sec, dtype=np.int64)
+    anchor_sec = np.asarray(anchor_sec, dtype=np.int64)
+    valid = (event_sec != MISSING_SECONDS) & (anchor_sec != MISSING_SECONDS)
+    delta = np.where(valid, event_sec, 0) - np.where(valid, anchor_sec, 0)
+    return (valid
+            & (delta >= int(start_hours * SECONDS_PER_HOUR))
+            & (delta <= int(end_hours * SECONDS_PER_HOUR)))
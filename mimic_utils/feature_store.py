@@ -0,0 +1,234 @@
+"""
+예측 데이터셋용 feature store (hadm_id 기준)
+- 변수 그룹(검사, 인구통계, 입원기간, 사망 타겟, 시각 등)을 그룹마다 한 번만 컬럼 저장
+  (pyarrow가 있으면 그룹별 Parquet, 없으면 CSV)
+- 모든 그룹은 keys(hadm_id, subject_id)와 같은 행 순서 → 데이터셋 조립은 merge 없이 컬럼 이어 붙이기
+- 모델 데이터셋(essential / extended / comprehensive)은 컬럼 목록(feature set)만 manifest에 저장
+  → 세트나 컬럼을 추가해도 데이터 사본이 늘지 않음
+- 읽기는 필요한 컬럼만, 한 번 읽은 컬럼과 조립한 데이터셋은 메모리에 재사용
+
+사용 예:
+    store = FeatureStore.create(store_dir(BASE_DIR), df[['hadm_id', 'subject_id']])
+    store.put('labs', df[['hadm_id'] + lab_columns])
+    store.define('essential', ['hadm_id', 'subject_id', 'age', ...])
+
+    store = FeatureStore.open(store_dir(BASE_DIR))
+    df = store.dataset('essential')
+"""
+
+import os
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from mimic_utils.table_cache import PROJECT_ROOT, HAS_PYARROW
+
+if HAS_PYARROW:
+    import pyarrow.parquet as pq
+
+STORE_DIRNAME = 'analysis_prediction/data/feature_store'
+KEY_GROUP = 'keys'
+KEY_COLUMNS = ['hadm_id', 'subject_id']
+STORE_VERSION = 1
+
+
+def store_dir(base_path=None):
+    """feature store 위치 (analysis_prediction/data/feature_store)"""
+    return Path(base_path or PROJECT_ROOT) / STORE_DIRNAME
+
+
+class FeatureStore:
+    """
+    hadm_id 기준 변수 그룹 저장소
+
+    Attributes
+    ----------
+    directory : Path
+        저장 위치 (manifest.json + 그룹별 파일)
+    manifest : dict
+        format, n_rows, groups({그룹: {file, columns, datetime_columns}}), feature_sets({세트: 컬럼 목록})
+    """
+
+    def __init__(self, directory, manifest):
+        self.directory = Path(directory)
+        self.manifest = manifest
+        self._columns = {}
+        self._datasets = {}
+
+    @classmethod
+    def create(cls, directory, keys):
+        """
+        빈 저장소 생성 (기존 그룹 / 세트는 행 기준이 바뀌므로 모두 삭제)
+
+        Parameters
+        ----------
+        keys : DataFrame
+            hadm_id, subject_id (저장소 행 순서)
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        old = cls._read_manifest(directory)
+        if old is not None:
+            for meta in old['groups'].values():
+                (directory / meta['file']).unlink(missing_ok=True)
+
+        manifest = {
+            'version': STORE_VERSION,
+            'format': 'parquet' if HAS_PYARROW else 'csv',
+            'n_rows': len(keys),
+            'groups': {},
+            'feature_sets': {},
+        }
+        store = cls(directory, manifest)
+        store._write_group(KEY_GROUP, keys[KEY_COLUMNS].reset_index(drop=True))
+        return store
+
+    @classmethod
+    def open(cls, directory):
+        """저장소 열기 (manifest만 읽고 데이터는 요청할 때 읽음)"""
+        manifest = cls._read_manifest(directory)
+        if manifest is None:
+            raise FileNotFoundError(f"feature store가 없습니다: {directory} (prepare_prediction_data.py --store 먼저 실행)")
+        if manifest.get('version') != STORE_VERSION:
+            raise ValueError(f"feature store 버전이 다릅니다 ({manifest.get('version')} != {STORE_VERSION}), 다시 생성하세요")
+        return cls(directory, manifest)
+
+    @staticmethod
+    def _read_manifest(directory):
+        path = Path(directory) / 'manifest.json'
+        if not path.exists():
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_manifest(self):
+        tmp_path = self.directory / 'manifest.json.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.directory / 'manifest.json')
+
+    def __len__(self):
+        return self.manifest['n_rows']
+
+    @property
+    def groups(self):
+        """{그룹: 컬럼 목록}"""
+        return {name: meta['columns'] for name, meta in self.manifest['groups'].items()}
+
+    @property
+    def feature_sets(self):
+        """{세트: 컬럼 목록}"""
+        return dict(self.manifest['feature_sets'])
+
+    def column_groups(self):
+        """{컬럼: 그룹} (같은 컬럼이 여러 그룹에 있으면 나중에 넣은 그룹)"""
+        return {col: name for name, meta in self.manifest['groups'].items() for col in meta['columns']}
+
+    def _write_group(self, name, frame):
+        """그룹 파일 쓰기 (임시 파일 → 교체) + manifest 갱신"""
+        ext = self.manifest['format']
+        path = self.directory / f'{name}.{ext}'
+        tmp_path = self.directory / f'{name}.tmp.{ext}'
+        if ext == 'parquet':
+            frame.to_parquet(tmp_path, index=False, compression='zstd')
+        else:
+            frame.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+        self.manifest['groups'][name] = {
+            'file': path.name,
+            'columns': list(frame.columns),
+            'datetime_columns': [col for col in frame.columns if pd.api.types.is_datetime64_any_dtype(frame[col])],
+        }
+        self._save_manifest()
+
+        # 이 그룹 컬럼을 쓰는 메모 결과 폐기
+        for col in frame.columns:
+            self._columns.pop(col, None)
+        self._datasets = {key: df for key, df in self._datasets.items() if not set(key) & set(frame.columns)}
+
+    def _aligned(self, frame):
+        """frame(hadm_id 포함) → 저장소 행 순서 (같은 순서면 그대로, 아니면 hadm_id로 재배열)"""
+        if 'hadm_id' not in frame.columns:
+            raise ValueError("그룹 데이터에 hadm_id 컬럼이 필요합니다")
+        keys = self.read([KEY_COLUMNS[0]])['hadm_id'].values
+        values = frame.drop(columns=[col for col in KEY_COLUMNS if col in frame.columns])
+        if len(frame) == len(keys) and np.array_equal(frame['hadm_id'].values, keys):
+            return values.reset_index(drop=True)
+        if frame['hadm_id'].duplicated().any():
+            raise ValueError("행 순서가 저장소와 다르면 hadm_id가 고유해야 합니다")
+        return values.set_index(frame['hadm_id'].values).reindex(keys).reset_index(drop=True)
+
+    def put(self, name, frame):
+        """
+        변수 그룹 저장 (같은 이름이 있으면 교체)
+
+        Parameters
+        ----------
+        frame : DataFrame
+            hadm_id + 그룹 컬럼 (저장소와 행 순서가 다르면 hadm_id 기준 정렬, 없는 입원은 결측)
+        """
+        if name == KEY_GROUP:
+            raise ValueError(f"'{KEY_GROUP}' 그룹은 create()로만 만듭니다")
+        self._write_group(name, self._aligned(frame))
+
+    def define(self, name, columns):
+        """feature set 정의 / 수정 (컬럼 목록만 저장, 데이터 복사 없음)"""
+        known = self.column_groups()
+        missing = [col for col in columns if col not in known]
+        if missing:
+            raise KeyError(f"저장소에 없는 컬럼입니다: {missing}")
+        self.manifest['feature_sets'][name] = list(columns)
+        self._save_manifest()
+
+    def _read_group(self, name, columns):
+        meta = self.manifest['groups'][name]
+        path = self.directory / meta['file']
+        if self.manifest['format'] == 'parquet':
+            return pq.read_table(path, columns=columns).to_pandas()
+        parse_dates = [col for col in meta['datetime_columns'] if col in columns]
+        return pd.read_csv(path, usecols=columns, parse_dates=parse_dates)[columns]
+
+    def read(self, columns):
+        """
+        컬럼 읽기 (그룹별로 아직 읽지 않은 컬럼만 파일에서 읽고, 결과는 메모)
+
+        Returns
+        -------
+        DataFrame
+            columns 순서 (메모된 배열을 공유하므로 수정하려면 copy())
+        """
+        known = self.column_groups()
+        missing = [col for col in columns if col not in known]
+        if missing:
+            raise KeyError(f"저장소에 없는 컬럼입니다: {missing}")
+
+        todo = {}
+        for col in dict.fromkeys(columns):
+            if col not in self._columns:
+                todo.setdefault(known[col], []).append(col)
+        for name, cols in todo.items():
+            frame = self._read_group(name, cols)
+            for col in cols:
+                self._columns[col] = frame[col]
+        return pd.DataFrame({col: self._columns[col] for col in columns}, copy=False)
+
+    def dataset(self, name=None, columns=None):
+        """
+        feature set(또는 임의 컬럼 목록)으로 데이터셋 조립 (같은 컬럼 목록은 한 번만 조립)
+
+        Returns
+        -------
+        DataFrame
+            컬럼 순서 = 정의 순서 (공유 객체이므로 수정하려면 copy())
+        """
+        if columns is None:
+            if name not in self.manifest['feature_sets']:
+                raise KeyError(f"정의되지 않은 feature set입니다: {name} (가능: {list(self.manifest['feature_sets'])})")
+            columns = self.manifest['feature_sets'][name]
+        key = tuple(columns)
+        if key not in self._datasets:
+            self._datasets[key] = self.read(list(columns))
+        return self._datasets[key]
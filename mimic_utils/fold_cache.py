@@ -0,0 +1,211 @@
+"""
+교차검증 fold 행렬 캐시 (memory-map)
+- fold마다 학습 구간으로만 전처리(중앙값 대체, 선형 모델용은 + StandardScaler)를 한 번 fit
+  → 학습/검증 행렬을 float32 .npy로 저장
+- 워커 프로세스에는 경로만 넘기고 np.load(mmap_mode='r')로 열기 → 행렬 복사/피클 없이 페이지 캐시 공유
+- 캐시 키: 특성 행렬 + 그룹 + 분할 설정의 sha256 → 같은 데이터로 다시 실행하면 fit/저장 생략
+- groups(subject_id)를 주면 GroupKFold (같은 환자가 학습/검증에 동시에 들어가지 않음)
+
+사용 예:
+    X, feature_names = feature_matrix(df)
+    folds = build_folds(X, groups=df['subject_id'].values, n_splits=5, base_path=BASE_DIR)
+    X_train, X_valid = folds.arrays(0)
+    y_train, y_valid = folds.split_target(y, 0)
+"""
+
+import os
+import json
+import hashlib
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from mimic_utils.table_cache import PROJECT_ROOT
+
+FOLD_DIRNAME = 'analysis_prediction/data/fold_cache'
+FOLD_CACHE_VERSION = 1
+
+# 모델 데이터셋 컬럼 구분 (create_model_datasets / add_time_columns 기준)
+ID_COLUMNS = ['hadm_id', 'subject_id']
+TARGET_COLUMNS = ['death_type', 'death_binary', 'hospital_death', 'los_hours', 'los_days']
+TIME_COLUMNS = ['admittime', 'dischtime', 'deathtime', 'dod']
+LEAKAGE_COLUMNS = ['hospital_expire_flag']
+CATEGORICAL_COLUMNS = ['gender', 'admission_type']
+
+
+def _median_imputer():
+    from sklearn.impute import SimpleImputer
+    return SimpleImputer(strategy='median', keep_empty_features=True)
+
+
+def _median_imputer_scaler():
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+    return make_pipeline(_median_imputer(), StandardScaler())
+
+
+# fold별 전처리 (이름 → 새 변환기, 학습 구간으로만 fit)
+PREPROCESSORS = {
+    'impute': _median_imputer,
+    'impute_scale': _median_imputer_scaler,
+}
+
+# 워커 프로세스에서 연 memory-map (경로 → 배열, 프로세스마다 한 번만 열기)
+_OPEN_ARRAYS = {}
+
+
+def feature_matrix(df):
+    """
+    모델 데이터셋 → float32 특성 행렬 (노트북과 같은 전처리: 범주형 drop_first 더미, 결측은 NaN 유지)
+
+    Returns
+    -------
+    (X, feature_names)
+    """
+    exclude = set(ID_COLUMNS + TARGET_COLUMNS + TIME_COLUMNS + LEAKAGE_COLUMNS)
+    feature_cols = [col for col in df.columns if col not in exclude]
+    categorical = [col for col in CATEGORICAL_COLUMNS if col in feature_cols]
+    encoded = pd.get_dummies(df[feature_cols], columns=categorical, drop_first=True)
+    return encoded.to_numpy(dtype=np.float32, na_value=np.nan), list(encoded.columns)
+
+
+def fold_digest(X, groups, n_splits, random_state, preprocess='impute'):
+    """특성 행렬 + 그룹 + 분할 / 전처리 설정의 sha256 (fold 캐시 키)"""
+    digest = hashlib.sha256(f'v{FOLD_CACHE_VERSION}|{n_splits}|{random_state}|{preprocess}|{X.shape}'.encode())
+    digest.update(np.ascontiguousarray(X, dtype=np.float32).tobytes())
+    if groups is not None:
+        digest.update(np.ascontiguousarray(groups, dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+
+def open_array(path):
+    """memory-map으로 .npy 열기 (같은 프로세스에서는 재사용)"""
+    path = str(path)
+    if path not in _OPEN_ARRAYS:
+        _OPEN_ARRAYS[path] = np.load(path, mmap_mode='r')
+    return _OPEN_ARRAYS[path]
+
+
+def _split_indices(n_rows, groups, n_splits, random_state):
+    """fold별 (학습 위치, 검증 위치)"""
+    from sklearn.model_selection import GroupKFold, KFold
+
+    placeholder = np.zeros(n_rows)
+    if groups is not None:
+        splitter = GroupKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+        return list(splitter.split(placeholder, groups=groups))
+    splitter = KFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    return list(splitter.split(placeholder))
+
+
+class FoldSet:
+    """
+    디스크에 저장된 fold 행렬 묶음
+
+    Attributes
+    ----------
+    directory : Path
+        fold_{k}/X_train.npy, X_valid.npy, train_idx.npy, valid_idx.npy + meta.json
+    meta : dict
+        digest, n_splits, n_rows, n_features, grouped, preprocess
+    """
+
+    def __init__(self, directory, meta):
+        self.directory = Path(directory)
+        self.meta = meta
+
+    def __len__(self):
+        return self.meta['n_splits']
+
+    @property
+    def digest(self):
+        return self.meta['digest']
+
+    def paths(self, k):
+        """fold k의 (X_train, X_valid) 경로 (워커에 넘길 값)"""
+        fold_dir = self.directory / f'fold_{k}'
+        return fold_dir / 'X_train.npy', fold_dir / 'X_valid.npy'
+
+    def arrays(self, k):
+        """fold k의 (X_train, X_valid) memory-map (읽기 전용)"""
+        return tuple(open_array(path) for path in self.paths(k))
+
+    def indices(self, k):
+        """fold k의 (학습 위치, 검증 위치) (원래 행 순서 기준)"""
+        fold_dir = self.directory / f'fold_{k}'
+        return open_array(fold_dir / 'train_idx.npy'), open_array(fold_dir / 'valid_idx.npy')
+
+    def split_target(self, y, k):
+        """타겟 배열 → fold k의 (y_train, y_valid)"""
+        train_idx, valid_idx = self.indices(k)
+        y = np.asarray(y)
+        return y[train_idx], y[valid_idx]
+
+
+def _write_npy(path, array):
+    """임시 파일에 쓰고 교체 (중간에 끊겨도 불완전한 파일이 남지 않음)"""
+    tmp_path = path.with_name(path.stem + '.tmp.npy')
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+def build_folds(X, groups=None, n_splits=5, random_state=42, preprocess='impute', base_path=None, directory=None):
+    """
+    fold별 전처리 행렬을 저장하고 FoldSet 반환 (같은 입력이면 저장된 것 재사용)
+
+    Parameters
+    ----------
+    X : ndarray
+        특성 행렬 (결측 NaN)
+    groups : array-like, optional
+        GroupKFold 그룹 (예: subject_id)
+    preprocess : str
+        PREPROCESSORS 중 fold별 전처리 (기본: 중앙값 대체)
+
+    Returns
+    -------
+    FoldSet
+    """
+    if preprocess not in PREPROCESSORS:
+        raise ValueError(f"지원하지 않는 전처리입니다: {preprocess} (가능: {list(PREPROCESSORS)})")
+
+    X = np.asarray(X, dtype=np.float32)
+    digest = fold_digest(X, groups, n_splits, random_state, preprocess)
+    root = Path(directory) if directory else Path(base_path or PROJECT_ROOT) / FOLD_DIRNAME
+    fold_root = root / digest[:16]
+
+    meta_path = fold_root / 'meta.json'
+    if meta_path.exists():
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get('digest') == digest:
+            return FoldSet(fold_root, meta)
+
+    # meta.json이 없으면 이전 저장이 중간에 끊긴 것 → 처음부터 다시
+    shutil.rmtree(fold_root, ignore_errors=True)
+    fold_root.mkdir(parents=True)
+
+    for k, (train_idx, valid_idx) in enumerate(_split_indices(len(X), groups, n_splits, random_state)):
+        fold_dir = fold_root / f'fold_{k}'
+        fold_dir.mkdir()
+        fitted = PREPROCESSORS[preprocess]().fit(X[train_idx])
+        _write_npy(fold_dir / 'X_train.npy', fitted.transform(X[train_idx]).astype(np.float32))
+        _write_npy(fold_dir / 'X_valid.npy', fitted.transform(X[valid_idx]).astype(np.float32))
+        _write_npy(fold_dir / 'train_idx.npy', train_idx.astype(np.int64))
+        _write_npy(fold_dir / 'valid_idx.npy', valid_idx.astype(np.int64))
+
+    meta = {
+        'version': FOLD_CACHE_VERSION,
+        'digest': digest,
+        'n_splits': n_splits,
+        'n_rows': int(X.shape[0]),
+        'n_features': int(X.shape[1]),
+        'grouped': groups is not None,
+        'preprocess': preprocess,
+        'random_state': random_state,
+    }
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+    return FoldSet(fold_root, meta)
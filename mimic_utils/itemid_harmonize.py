@@ -0,0 +1,184 @@
+"""
+itemid 통합(harmonization) 규칙 컴파일러
+- improvable_items.csv / duplicate_active_labels.csv → 안전한 통합 규칙 {빈 itemid: 활성 itemid}
+- 규칙을 itemid로 바로 인덱싱하는 조회 배열(lookup[itemid] = 통합 itemid)로 컴파일
+  → 규칙마다 전체 컬럼을 비교하는 대신 배열 gather 한 번으로 수억 행도 재매핑
+- 통합 대상별 원본 itemid 목록(동치류)과 규칙 요약을 규칙 파일 해시 기준 JSON으로 캐시
+  (규칙 파일 내용이 바뀌면 해시가 달라져 자동으로 다시 생성)
+
+사용 예:
+    harmonizer = ItemidHarmonizer.from_rule_files(improvable_path, duplicate_path, base_path=BASE_PATH)
+    labevents['itemid'] = harmonizer.remap(labevents['itemid'].values)
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from mimic_utils.table_cache import PROJECT_ROOT
+
+CACHE_DIRNAME = 'processed_data/harmonize_cache'
+CACHE_VERSION = 1               # 규칙 해석 방식이 바뀌면 올려서 기존 캐시를 다시 생성
+
+UNSAFE_REASON = '둘 다 활성 (값 차이 존재)'
+
+
+def build_merge_rules(improvable, duplicate_active):
+    """
+    안전한 통합 규칙 생성 (한쪽 itemid가 비어있는 라벨만, 둘 다 활성인 라벨은 제외)
+
+    Parameters
+    ----------
+    improvable : DataFrame
+        label, empty_itemids, active_itemids (itemid는 ';' 구분)
+    duplicate_active : DataFrame
+        label (둘 다 데이터가 있어 통합하면 안 되는 라벨)
+
+    Returns
+    -------
+    (merge_rules, unsafe_merges)
+        merge_rules: {빈 itemid: 첫 번째 활성 itemid}, unsafe_merges: [{'label', 'reason'}]
+    """
+    no_merge_labels = set(duplicate_active['label'].tolist())
+
+    merge_rules = {}
+    unsafe_merges = []
+    for label, empty_ids, active_ids in zip(improvable['label'], improvable['empty_itemids'],
+                                            improvable['active_itemids']):
+        if label in no_merge_labels:
+            unsafe_merges.append({'label': label, 'reason': UNSAFE_REASON})
+            continue
+
+        target_itemid = int(str(active_ids).split(';')[0])
+        for empty_id in str(empty_ids).split(';'):
+            try:
+                merge_rules[int(empty_id)] = target_itemid
+            except ValueError:
+                continue
+
+    return merge_rules, unsafe_merges
+
+
+def compile_lookup(merge_rules):
+    """
+    통합 규칙 → 조회 배열 (lookup[itemid] = 통합 후 itemid, 규칙 없는 itemid는 자기 자신)
+
+    규칙을 순서대로 적용한 결과와 같도록 컴파일 (a→b 다음 b→c가 있으면 a도 c로)
+    """
+    if not merge_rules:
+        return np.zeros(0, dtype=np.int64)
+    size = max(max(merge_rules), max(merge_rules.values())) + 1
+    lookup = np.arange(size, dtype=np.int64)
+    for old_id, new_id in merge_rules.items():
+        lookup[lookup == old_id] = new_id
+    return lookup
+
+
+def rules_digest(paths):
+    """규칙 파일 내용 + CACHE_VERSION의 sha256 (캐시 키)"""
+    digest = hashlib.sha256(f'v{CACHE_VERSION}'.encode())
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def cache_path(digest, base_path=None):
+    """규칙 해시 → 캐시 JSON 경로"""
+    base = Path(base_path) if base_path else PROJECT_ROOT
+    return base / CACHE_DIRNAME / f'itemid_rules_{digest[:16]}.json'
+
+
+class ItemidHarmonizer:
+    """
+    컴파일된 itemid 통합 규칙
+
+    Attributes
+    ----------
+    merge_rules : dict
+        {원본 itemid: 통합 itemid} (규칙 파일 순서)
+    unsafe_merges : list
+        통합하지 않은 라벨 [{'label', 'reason'}]
+    lookup : ndarray
+        lookup[itemid] = 통합 후 itemid (배열 범위 밖 itemid는 그대로)
+    merged_from : dict
+        {통합 itemid: [원본 itemid, ...]} 동치류
+    summary : dict
+        규칙 파일 행 수 등 요약
+    """
+
+    def __init__(self, merge_rules, unsafe_merges=(), summary=None, digest=None):
+        self.merge_rules = dict(merge_rules)
+        self.unsafe_merges = list(unsafe_merges)
+        self.summary = dict(summary or {})
+        self.digest = digest
+        self.lookup = compile_lookup(self.merge_rules)
+
+        self.merged_from = {}
+        for old_id in self.merge_rules:
+            self.merged_from.setdefault(int(self.lookup[old_id]), []).append(old_id)
+
+    @classmethod
+    def from_rule_files(cls, improvable_path, duplicate_path, base_path=None, use_cache=True):
+        """규칙 파일에서 생성 (같은 내용의 규칙 파일이면 캐시 JSON 재사용)"""
+        digest = rules_digest([improvable_path, duplicate_path])
+        path = cache_path(digest, base_path)
+        if use_cache and path.exists():
+            with open(path) as f:
+                return cls.from_dict(json.load(f))
+
+        improvable = pd.read_csv(improvable_path)
+        duplicate_active = pd.read_csv(duplicate_path)
+        merge_rules, unsafe_merges = build_merge_rules(improvable, duplicate_active)
+        summary = {'improvable_labels': len(improvable), 'duplicate_active_labels': len(duplicate_active)}
+        harmonizer = cls(merge_rules, unsafe_merges, summary, digest)
+
+        if use_cache:
+            # 다 쓴 뒤에만 교체 (중단 시 깨진 캐시가 남지 않도록)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix('.json.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(harmonizer.to_dict(), f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        return harmonizer
+
+    def to_dict(self):
+        """캐시용 dict (규칙 순서 유지를 위해 [원본, 통합] 쌍 목록으로 저장)"""
+        return {
+            'version': CACHE_VERSION,
+            'digest': self.digest,
+            'merge_rules': [[int(old_id), int(new_id)] for old_id, new_id in self.merge_rules.items()],
+            'unsafe_merges': self.unsafe_merges,
+            'merged_from': {str(target): sources for target, sources in self.merged_from.items()},
+            'summary': self.summary,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """to_dict 결과에서 복원"""
+        return cls({old_id: new_id for old_id, new_id in data['merge_rules']},
+                   data['unsafe_merges'], data.get('summary'), data.get('digest'))
+
+    def remap(self, itemids):
+        """itemid 배열 → 통합 itemid 배열 (gather 한 번, 입력 dtype 유지)"""
+        itemids = np.asarray(itemids)
+        if len(self.lookup) == 0:
+            return itemids.copy()
+        in_range = (itemids >= 0) & (itemids < len(self.lookup))
+        return np.where(in_range, self.lookup[np.where(in_range, itemids, 0)], itemids).astype(itemids.dtype)
+
+    def source_counts(self, itemids):
+        """규칙의 원본 itemid별 행 수 {원본 itemid: 행 수} (bincount 한 번)"""
+        itemids = np.asarray(itemids)
+        itemids = itemids[(itemids >= 0) & (itemids < len(self.lookup))].astype(np.int64)
+        counts = np.bincount(itemids, minlength=len(self.lookup))
+        return {old_id: int(counts[old_id]) for old_id in self.merge_rules}
+
+    def apply(self, df, column='itemid'):
+        """df[column]을 통합 itemid로 교체 (제자리 수정 후 반환)"""
+        df[column] = self.remap(df[column].values)
+        return df
@@ -0,0 +1,176 @@
+"""
+시간 단위 검사 텐서 (입원 × 시간 × 검사) 생성
+- 기준 시각(입원) 후 첫 N시간을 1시간 구간으로 나눠 구간별 검사값 + 관측 마스크
+- 입원마다 반복하지 않고 SubjectTimeIndex 구간 조회 → (입원, 시간, 검사) 평면 칸 번호 → 칸별 집계를 한 번에 scatter
+- 결과는 .npy memory-map에 입원 블록 단위로 바로 기록 → 전체 텐서를 메모리에 올리지 않음
+- 학습 코드는 load_lab_tensor로 열어서 values[batch_idx]처럼 mini-batch만 읽음
+
+사용 예:
+    meta = export_lab_tensor(out_dir, admissions, labevents, LAB_ITEMS, hours=72)
+    values, mask, index_df, meta = load_lab_tensor(out_dir)
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from mimic_utils.event_time import epoch_seconds, MISSING_SECONDS, SECONDS_PER_HOUR
+from mimic_utils.time_index import SubjectTimeIndex
+
+DEFAULT_HOURS = 72
+
+# 같은 시간 구간에 여러 값이 있을 때 (first/last는 charttime 기준)
+TENSOR_AGGREGATES = ('mean', 'last', 'first')
+
+# 한 번에 채우는 입원 수 (블록 크기 = 입원 수 × 시간 × 검사 float32)
+BLOCK_SIZE = 4096
+
+
+def _reduce_cells(cells, values, agg):
+    """
+    평면 칸 번호별 값 집계
+
+    cells는 조회별로 시각 순이어야 함 (SubjectTimeIndex.query 결과 순서)
+
+    Returns
+    -------
+    (unique_cells, reduced)
+    """
+    if agg == 'mean':
+        unique_cells, inverse = np.unique(cells, return_inverse=True)
+        sums = np.bincount(inverse, weights=values, minlength=len(unique_cells))
+        counts = np.bincount(inverse, minlength=len(unique_cells))
+        return unique_cells, sums / counts
+    if agg == 'first':
+        unique_cells, first = np.unique(cells, return_index=True)
+        return unique_cells, values[first]
+    if agg == 'last':
+        unique_cells, last = np.unique(cells[::-1], return_index=True)
+        return unique_cells, values[::-1][last]
+    raise ValueError(f"agg는 {TENSOR_AGGREGATES} 중 하나여야 합니다: {agg}")
+
+
+def build_lab_tensor(anchors, labevents, lab_items, hours=DEFAULT_HOURS, anchor_col='admittime',
+                     agg='mean', values_out=None, mask_out=None, block_size=BLOCK_SIZE):
+    """
+    (기준 행 × 시간 × 검사) 텐서 채우기
+
+    Parameters
+    ----------
+    anchors : DataFrame
+        subject_id, anchor_col 컬럼 필요 (결과 행 순서 = anchors 순서)
+    labevents : DataFrame
+        subject_id, itemid, charttime, valuenum 필요 (chart_sec가 있으면 재사용)
+    lab_items : dict
+        {itemid: lab_name}, 텐서 마지막 축 순서
+    hours : int
+        기준 시각 후 시간 수 (구간 h = [기준 + h시간, 기준 + h+1시간))
+    agg : str
+        같은 구간의 여러 값 집계 ('mean', 'last', 'first')
+    values_out, mask_out : ndarray, optional
+        (기준 행 수, hours, 검사 수) 출력 배열 (memory-map 가능). 없으면 새로 생성
+
+    Returns
+    -------
+    (values, mask)
+        values: float32 (관측 없는 칸은 NaN), mask: bool (valuenum이 관측된 칸)
+    """
+    if agg not in TENSOR_AGGREGATES:
+        raise ValueError(f"agg는 {TENSOR_AGGREGATES} 중 하나여야 합니다: {agg}")
+
+    lab_itemids = list(lab_items.keys())
+    n_rows, n_items = len(anchors), len(lab_itemids)
+    shape = (n_rows, hours, n_items)
+    if values_out is None:
+        values_out = np.empty(shape, dtype=np.float32)
+    if mask_out is None:
+        mask_out = np.empty(shape, dtype=bool)
+
+    # 대상 itemid + 값이 있는 검사만 인덱스 (인덱스 순서로 itemid 위치 / 값 정렬)
+    keep = labevents['itemid'].isin(lab_itemids).values & labevents['valuenum'].notna().values
+    labs = labevents[keep]
+    index = SubjectTimeIndex.from_frame(labs, sec_col='chart_sec')
+    item_code = pd.Index(lab_itemids).get_indexer(labs['itemid'].values)[index.rows]
+    lab_values = labs['valuenum'].to_numpy(dtype=np.float64)[index.rows]
+
+    sec_col = anchor_col.replace('time', '_sec')
+    anchor_sec = (anchors[sec_col].values.astype(np.int64) if sec_col in anchors.columns
+                  else epoch_seconds(anchors[anchor_col]))
+    subject_ids = anchors['subject_id'].values
+    span = hours * SECONDS_PER_HOUR
+
+    for start in range(0, n_rows, block_size):
+        stop = min(start + block_size, n_rows)
+        sec = anchor_sec[start:stop]
+        valid = sec != MISSING_SECONDS
+        # 기준 시각 결측 행은 빈 구간 (start > end)
+        query_pos, positions = index.query(subject_ids[start:stop],
+                                           np.where(valid, sec, 0), np.where(valid, sec + span - 1, -1))
+
+        hour = (index.seconds[positions] - sec[query_pos]) // SECONDS_PER_HOUR
+        cells = (query_pos * hours + hour) * n_items + item_code[positions]
+        unique_cells, reduced = _reduce_cells(cells, lab_values[positions], agg)
+
+        block_values = np.full((stop - start) * hours * n_items, np.nan, dtype=np.float32)
+        block_mask = np.zeros((stop - start) * hours * n_items, dtype=bool)
+        block_values[unique_cells] = reduced
+        block_mask[unique_cells] = True
+        values_out[start:stop] = block_values.reshape(stop - start, hours, n_items)
+        mask_out[start:stop] = block_mask.reshape(stop - start, hours, n_items)
+
+    return values_out, mask_out
+
+
+def export_lab_tensor(directory, anchors, labevents, lab_items, hours=DEFAULT_HOURS, anchor_col='admittime',
+                      agg='mean', key_cols=('hadm_id',)):
+    """
+    텐서를 directory에 memory-map .npy로 저장
+
+    저장 파일: values.npy (float32), mask.npy (bool), index.csv (행 → key_cols, subject_id, 기준 시각),
+    meta.json (shape, hours, agg, 검사 목록)
+
+    Returns
+    -------
+    dict
+        meta.json 내용
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    shape = (len(anchors), hours, len(lab_items))
+
+    values = np.lib.format.open_memmap(directory / 'values.npy', mode='w+', dtype=np.float32, shape=shape)
+    mask = np.lib.format.open_memmap(directory / 'mask.npy', mode='w+', dtype=bool, shape=shape)
+    build_lab_tensor(anchors, labevents, lab_items, hours=hours, anchor_col=anchor_col, agg=agg,
+                     values_out=values, mask_out=mask)
+    observed = int(mask.sum())
+    values.flush()
+    mask.flush()
+    del values, mask
+
+    anchors[list(key_cols) + ['subject_id', anchor_col]].to_csv(directory / 'index.csv', index=False)
+    meta = {
+        'shape': list(shape),
+        'hours': hours,
+        'anchor_col': anchor_col,
+        'agg': agg,
+        'itemids': [int(itemid) for itemid in lab_items],
+        'lab_names': list(lab_items.values()),
+        'observed_cells': observed,
+        'density': observed / max(np.prod(shape), 1),
+    }
+    with open(directory / 'meta.json', 'w') as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+    return meta
+
+
+def load_lab_tensor(directory, mmap_mode='r'):
+    """export_lab_tensor로 저장한 텐서 열기 → (values, mask, index_df, meta) (배열은 memory-map)"""
+    directory = Path(directory)
+    values = np.load(directory / 'values.npy', mmap_mode=mmap_mode)
+    mask = np.load(directory / 'mask.npy', mmap_mode=mmap_mode)
+    index_df = pd.read_csv(directory / 'index.csv')
+    with open(directory / 'meta.json') as f:
+        meta = json.load(f)
+    return values, mask, index_df, meta
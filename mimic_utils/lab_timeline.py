@@ -0,0 +1,176 @@
+"""
+환자별 검사 타임라인 (디스크 저장 + memory-map)
+- labevents를 (subject_id, charttime) 순으로 한 번 정렬해서 컬럼별 .npy로 저장
+- 다시 열 때는 memory-map → CSV 파싱/정렬 없이 바로 조회 (짧은 분석 스크립트도 즉시 시작)
+- "환자 S의 [t0, t1] 검사 (특정 itemid / 입원만)" 조회는 SubjectTimeIndex 이진 탐색
+- 원본 CSV의 수정시간(mtime) 또는 크기가 바뀌면 다시 생성
+
+사용 예:
+    timeline = open_lab_timeline(base_path=BASE_PATH)
+    labs = timeline.labs(subject_id, start_sec, end_sec, itemids=[50931])
+"""
+
+import os
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from mimic_utils.table_cache import PROJECT_ROOT
+from mimic_utils.schema import read_csv_typed
+from mimic_utils.event_time import add_time_keys
+from mimic_utils.time_index import SubjectTimeIndex
+
+TIMELINE_DIRNAME = 'processed_data/lab_timeline'
+TIMELINE_VERSION = 1            # 저장 형식이 바뀌면 올려서 기존 타임라인을 다시 생성
+
+DEFAULT_SOURCE = 'processed_data/hosp/labevents_sampled.csv'
+
+# 인덱스 순서로 함께 저장하는 검사 컬럼과 저장 dtype
+PAYLOAD_COLUMNS = {
+    'itemid': np.int32,
+    'hadm_id': np.int32,        # 결측은 MISSING_ID
+    'valuenum': np.float32,
+}
+MISSING_ID = -1
+
+
+class LabTimeline:
+    """
+    (subject_id, charttime) 정렬 검사 타임라인
+
+    Attributes
+    ----------
+    index : SubjectTimeIndex
+        정렬 인덱스 (index.rows: 정렬 위치 → 원본 행 번호, index.seconds: epoch 초)
+    columns : dict
+        {컬럼명: 정렬 위치 순서의 배열} (PAYLOAD_COLUMNS)
+    """
+
+    def __init__(self, index, columns):
+        self.index = index
+        self.columns = columns
+
+    @classmethod
+    def from_frame(cls, labevents, sec_col='chart_sec'):
+        """labevents DataFrame에서 생성 (시각 결측 행은 제외)"""
+        index = SubjectTimeIndex.from_frame(labevents, sec_col=sec_col)
+        columns = {}
+        for col, dtype in PAYLOAD_COLUMNS.items():
+            values = labevents[col]
+            if pd.api.types.is_integer_dtype(dtype):
+                values = values.fillna(MISSING_ID)
+            columns[col] = values.to_numpy(dtype=dtype)[index.rows]
+        return cls(index, columns)
+
+    def save(self, directory):
+        """directory에 인덱스와 컬럼 배열 저장"""
+        directory = Path(directory)
+        self.index.save(directory)
+        for col, values in self.columns.items():
+            np.save(directory / f'col_{col}.npy', values)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """save로 저장한 타임라인 열기 (기본은 memory-map)"""
+        directory = Path(directory)
+        index = SubjectTimeIndex.load(directory, mmap_mode=mmap_mode)
+        columns = {col: np.load(directory / f'col_{col}.npy', mmap_mode=mmap_mode)
+                   for col in PAYLOAD_COLUMNS}
+        return cls(index, columns)
+
+    def __len__(self):
+        return len(self.index)
+
+    def query(self, subject_ids, start_sec, end_sec):
+        """구간 조회 (SubjectTimeIndex.query와 동일: (조회 번호, 정렬 위치))"""
+        return self.index.query(subject_ids, start_sec, end_sec)
+
+    def frame(self, positions):
+        """정렬 위치 → DataFrame (subject_id, chart_sec, 검사 컬럼, 원본 행 번호 row)"""
+        positions = np.asarray(positions, dtype=np.int64)
+        df = pd.DataFrame({
+            'subject_id': self.index.subjects[self.index.keys[positions] // self.index.span],
+            'chart_sec': self.index.seconds[positions],
+        })
+        for col, values in self.columns.items():
+            df[col] = values[positions]
+        df['hadm_id'] = df['hadm_id'].astype('Int32').mask(df['hadm_id'] == MISSING_ID)
+        df['row'] = self.index.rows[positions]
+        return df
+
+    def positions(self, subject_id, start_sec=None, end_sec=None, itemids=None, hadm_id=None):
+        """환자 한 명의 [start_sec, end_sec] 검사 정렬 위치 (시각 순, 조건 필터 적용)"""
+        if start_sec is None and end_sec is None:
+            lo, hi = self.index.subject_bounds([subject_id])
+            positions = np.arange(lo[0], hi[0])
+        else:
+            start_sec = self.index.sec_min if start_sec is None else start_sec
+            end_sec = self.index.sec_min + self.index.span - 1 if end_sec is None else end_sec
+            _, positions = self.index.query([subject_id], [start_sec], [end_sec])
+
+        if itemids is not None:
+            positions = positions[np.isin(self.columns['itemid'][positions], list(itemids))]
+        if hadm_id is not None:
+            positions = positions[self.columns['hadm_id'][positions] == hadm_id]
+        return positions
+
+    def labs(self, subject_id, start_sec=None, end_sec=None, itemids=None, hadm_id=None):
+        """환자 한 명의 [start_sec, end_sec] 검사 DataFrame (시각 순)"""
+        return self.frame(self.positions(subject_id, start_sec, end_sec, itemids, hadm_id))
+
+
+def timeline_dir(source=DEFAULT_SOURCE, base_path=None):
+    """원본 CSV → 타임라인 저장 폴더 (예: processed_data/lab_timeline/labevents_sampled)"""
+    base = Path(base_path) if base_path else PROJECT_ROOT
+    return base / TIMELINE_DIRNAME / Path(source).stem
+
+
+def _source_signature(csv_path):
+    """재생성 기준: 원본 CSV의 mtime, 크기"""
+    stat = os.stat(csv_path)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def is_timeline_valid(source=DEFAULT_SOURCE, base_path=None):
+    """타임라인이 존재하고 원본 CSV와 일치하는지 확인"""
+    base = Path(base_path) if base_path else PROJECT_ROOT
+    meta_path = timeline_dir(source, base_path) / 'meta.json'
+    if not meta_path.exists():
+        return False
+    with open(meta_path) as f:
+        meta = json.load(f)
+    return (meta.get('source') == _source_signature(base / source)
+            and meta.get('version') == TIMELINE_VERSION)
+
+
+def build_lab_timeline(source=DEFAULT_SOURCE, base_path=None):
+    """원본 CSV → 타임라인 저장 (정렬은 여기서 한 번만)"""
+    base = Path(base_path) if base_path else PROJECT_ROOT
+    csv_path = base / source
+    directory = timeline_dir(source, base_path)
+    tmp_dir = directory.with_name(directory.name + '.tmp')
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    labevents = read_csv_typed(csv_path, 'hosp/labevents',
+                               usecols=['subject_id', 'charttime'] + list(PAYLOAD_COLUMNS))
+    add_time_keys(labevents, 'charttime', 'chart')
+    timeline = LabTimeline.from_frame(labevents)
+    timeline.save(tmp_dir)
+    with open(tmp_dir / 'meta.json', 'w') as f:
+        json.dump({'source': _source_signature(csv_path), 'version': TIMELINE_VERSION,
+                   'rows': len(labevents), 'indexed_rows': len(timeline)}, f, indent=2)
+
+    # 저장이 끝난 뒤에만 교체 (중단 시 깨진 타임라인이 남지 않도록)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_dir, directory)
+    return directory
+
+
+def open_lab_timeline(source=DEFAULT_SOURCE, base_path=None, mmap_mode='r'):
+    """타임라인 열기 (없거나 원본이 바뀌었으면 먼저 생성)"""
+    if not is_timeline_valid(source, base_path):
+        build_lab_timeline(source, base_path)
+    return LabTimeline.load(timeline_dir(source, base_path), mmap_mode=mmap_mode)
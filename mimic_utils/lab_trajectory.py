@@ -0,0 +1,141 @@
+"""
+검사값 추세(trajectory) 변수
+- (입원, itemid)별로 기준 시각 후 N시간 안의 검사 변화를 요약
+  - delta: 마지막 값 - 첫 값 (검사가 2번 이상일 때)
+  - slope: 시간(h)에 대한 최소제곱 기울기 (측정 시각이 2개 이상일 때)
+  - hours_to_first: 기준 시각부터 첫 검사까지 시간(h)
+  - n_repeats: 첫 검사 이후 반복 검사 수 (검사가 없으면 0)
+- 입원마다 반복하지 않고 SubjectTimeIndex 구간 조회 → (입원, 검사) 그룹 번호로 정렬
+  → np.add.reduceat로 그룹별 합계를 한 번에 계산 (전체 코호트도 같은 코드)
+- wide 컬럼명은 {lab_name}_{변수} (예: Glucose_50931_slope)
+
+사용 예:
+    trajectory = trajectory_features(admissions, labevents, LAB_ITEMS, hours=72)
+"""
+
+import numpy as np
+import pandas as pd
+
+from mimic_utils.event_time import epoch_seconds, MISSING_SECONDS, SECONDS_PER_HOUR
+from mimic_utils.time_index import SubjectTimeIndex
+
+DEFAULT_WINDOW_HOURS = 72
+
+TRAJECTORY_FEATURES = ('delta', 'slope', 'hours_to_first', 'n_repeats')
+
+
+def trajectory_column(lab_name, feature):
+    """wide 컬럼명: {lab_name}_{변수} (예: Glucose_50931_delta)"""
+    return f"{lab_name}_{feature}"
+
+
+def _group_reductions(hours, values, starts):
+    """
+    정렬된 그룹별 추세 계산 (starts: 그룹 시작 위치)
+
+    Returns
+    -------
+    dict
+        {변수: 그룹별 값}
+    """
+    counts = np.diff(np.append(starts, len(hours)))
+
+    # 그룹 평균 시각을 빼고 합산 (Σt² - (Σt)²/n의 자릿수 손실 방지)
+    centered = hours - np.repeat(np.add.reduceat(hours, starts) / counts, counts)
+    sxx = np.add.reduceat(centered * centered, starts)
+    sxy = np.add.reduceat(centered * values, starts)
+
+    # 기울기 = Sxy / Sxx (측정 시각이 모두 같으면 Sxx = 0 → 정의 안 됨)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.where(sxx > 0, sxy / sxx, np.nan)
+
+    first = values[starts]
+    last = values[starts + counts - 1]
+    return {
+        'delta': np.where(counts > 1, last - first, np.nan),
+        'slope': slope,
+        'hours_to_first': hours[starts],
+        'n_repeats': counts - 1,
+    }
+
+
+def trajectory_features(anchors, labevents, lab_items, hours=DEFAULT_WINDOW_HOURS, anchor_col='admittime',
+                        features=TRAJECTORY_FEATURES, key_cols=('hadm_id',)):
+    """
+    (기준 행, itemid)별 추세 변수를 wide format으로 계산
+
+    Parameters
+    ----------
+    anchors : DataFrame
+        subject_id, anchor_col 컬럼 필요 (결과 행 순서 = anchors 순서)
+    labevents : DataFrame
+        subject_id, itemid, charttime, valuenum 필요 (chart_sec가 있으면 재사용)
+    lab_items : dict
+        {itemid: lab_name}
+    hours : int
+        기준 시각 후 구간 [기준, 기준 + hours시간)
+    features : tuple
+        TRAJECTORY_FEATURES 중 계산할 항목
+
+    Returns
+    -------
+    DataFrame
+        key_cols + subject_id + lab_items → features 순서의 추세 컬럼
+        (float32, 검사가 없거나 정의되지 않으면 NaN, n_repeats는 정수)
+    """
+    unknown = [feature for feature in features if feature not in TRAJECTORY_FEATURES]
+    if unknown:
+        raise ValueError(f"지원하지 않는 추세 변수입니다: {unknown} (가능: {TRAJECTORY_FEATURES})")
+
+    lab_itemids = list(lab_items.keys())
+    n_rows, n_items = len(anchors), len(lab_itemids)
+
+    # 대상 itemid + 값이 있는 검사만 인덱스
+    keep = labevents['itemid'].isin(lab_itemids).values & labevents['valuenum'].notna().values
+    labs = labevents[keep]
+    index = SubjectTimeIndex.from_frame(labs, sec_col='chart_sec')
+    item_code = pd.Index(lab_itemids).get_indexer(labs['itemid'].values)[index.rows]
+    lab_values = labs['valuenum'].to_numpy(dtype=np.float64)[index.rows]
+
+    sec_col = anchor_col.replace('time', '_sec')
+    anchor_sec = (anchors[sec_col].values.astype(np.int64) if sec_col in anchors.columns
+                  else epoch_seconds(anchors[anchor_col]))
+    valid = anchor_sec != MISSING_SECONDS
+    span = hours * SECONDS_PER_HOUR
+    query_pos, positions = index.query(anchors['subject_id'].values, np.where(valid, anchor_sec, 0),
+                                       np.where(valid, anchor_sec + span - 1, -1))
+
+    # (기준 행, 검사) 그룹 번호로 안정 정렬 → 그룹 안에서는 조회 결과의 시각 순서 유지
+    groups = query_pos * n_items + item_code[positions]
+    order = np.argsort(groups, kind='stable')
+    groups = groups[order]
+    positions = positions[order]
+    elapsed = (index.seconds[positions] - anchor_sec[query_pos[order]]) / SECONDS_PER_HOUR
+
+    result = pd.DataFrame({col: anchors[col].values for col in key_cols if col in anchors.columns})
+    result['subject_id'] = anchors['subject_id'].values
+
+    reduced = {}
+    cells = np.zeros(0, dtype=np.int64)
+    if len(groups):
+        starts = np.flatnonzero(np.diff(groups, prepend=-1))
+        cells = groups[starts]
+        reduced = _group_reductions(elapsed, lab_values[positions], starts)
+
+    # (기준 행 × 검사) 평면 배열에 한 번에 채운 뒤 검사 순서대로 컬럼 구성
+    columns = {}
+    for feature in features:
+        if feature == 'n_repeats':
+            grid = np.zeros(n_rows * n_items, dtype=np.int32)
+        else:
+            grid = np.full(n_rows * n_items, np.nan, dtype=np.float32)
+        if len(cells):
+            grid[cells] = reduced[feature]
+        columns[feature] = grid.reshape(n_rows, n_items)
+
+    feature_frame = pd.DataFrame({
+        trajectory_column(lab_name, feature): columns[feature][:, pos]
+        for pos, lab_name in enumerate(lab_items.values())
+        for feature in features
+    }, index=result.index)
+    return pd.concat([result, feature_frame], axis=1)
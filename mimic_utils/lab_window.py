@@ -0,0 +1,499 @@
+"""
+입원 초기 검사 시간 윈도우 추출 엔진
+- 입원 × itemid 반복문 대신 (subject_id, 입원일) 조인 + 정렬 한 번으로 처리
+- 우선순위 Day 0 > Day -1 > Day +1, 같은 날은 원본 행 순서상 첫 번째 값 사용
+- 날짜 비교는 int32 일 번호(event_time)로 수행, date 객체를 만들지 않음
+- 시간 단위 윈도우(select_window_labs): 입원/ICU 입실 시각 기준 [시작h, 끝h] 구간을
+  우선순위대로 적용, subject별 정렬 인덱스(SubjectTimeIndex) 이진 탐색으로 조회
+- 윈도우 집계(aggregate_window_labs): (기준 행, itemid, 윈도우)별 first/last/min/max/mean/
+  count/abnormal_count를 groupby 한 번으로 계산, wide 컬럼은 {lab_name}_{window_key}_{집계}
+- 윈도우 민감도 분석(sweep_lab_windows): 여러 윈도우의 커버리지/결측률을
+  가장 넓은 구간 조회 한 번으로 함께 계산
+"""
+
+import pandas as pd
+import numpy as np
+
+from mimic_utils.event_time import (
+    day_numbers, days_to_datetime, epoch_seconds, seconds_to_days,
+    MISSING_DAY, MISSING_SECONDS, SECONDS_PER_HOUR, SECONDS_PER_DAY
+)
+from mimic_utils.time_index import SubjectTimeIndex, hours_to_seconds, windows_frame
+from mimic_utils.wide_format import build_wide_format
+
+# 기본 우선순위: 입원 당일 > 입원 전일 > 입원 익일
+DAY_PRIORITY = (0, -1, 1)
+
+# 기본 시간 윈도우 (우선순위 순): 입원 후 24시간 > 입원 전 24시간 > 입원 후 24~48시간
+HOUR_WINDOWS = [(0, 24), (-24, 0), (24, 48)]
+
+# 민감도 분석 기본 윈도우: (이름, 단위, 시작, 끝) - 'day'는 입원일 대비 달력 날짜, 'hour'는 기준 시각 대비 시간
+SWEEP_WINDOWS = [
+    ('day0', 'day', 0, 0),
+    ('day_pm1', 'day', -1, 1),
+    ('day_pm2', 'day', -2, 2),
+    ('first_6h', 'hour', 0, 6),
+    ('first_12h', 'hour', 0, 12),
+    ('first_24h', 'hour', 0, 24),
+    ('first_48h', 'hour', 0, 48),
+]
+
+# 같은 윈도우 안에서 여러 값이 있을 때 선택 기준
+SELECT_RULES = ('first', 'last', 'closest')
+
+# 윈도우별 집계 (first/last는 charttime 기준, count는 valuenum이 있는 검사 수)
+AGGREGATES = ('first', 'last', 'min', 'max', 'mean', 'count', 'abnormal_count')
+
+# 선택된 검사 행에서 가져올 컬럼 (없으면 기본값 사용)
+OPTIONAL_LAB_COLUMNS = {
+    'value': '',
+    'valueuom': '',
+    'flag': '',
+    'ref_range_lower': np.nan,
+    'ref_range_upper': np.nan,
+}
+
+
+def _day_column(df, time_col, day_col):
+    """add_time_keys로 만든 일 번호 컬럼이 있으면 재사용, 없으면 시각 컬럼에서 계산"""
+    if day_col in df.columns:
+        return df[day_col].values.astype(np.int32)
+    return day_numbers(df[time_col])
+
+
+def offset_source(day_offset):
+    """day_offset → 'Day0', 'Day-1', 'Day+1' 형식의 출처 라벨"""
+    return f"Day{day_offset:+d}" if day_offset != 0 else "Day0"
+
+
+def select_initial_labs(admissions, labevents, lab_items, day_priority=DAY_PRIORITY, position_col=None):
+    """
+    모든 (입원, itemid) 쌍에 대해 우선순위 윈도우 검사값을 한 번에 선택
+
+    Parameters
+    ----------
+    admissions : DataFrame
+        hadm_id, subject_id, admittime 컬럼 필요 (admit_day가 있으면 재사용)
+    labevents : DataFrame
+        subject_id, itemid, charttime, valuenum 컬럼 필요 (chart_day가 있으면 재사용)
+    lab_items : dict
+        {itemid: lab_name}, 출력 순서도 이 순서를 따름
+    day_priority : tuple
+        입원일 대비 day offset 우선순위
+    position_col : str, optional
+        지정하면 각 결과 행의 admissions 내 위치(0부터)를 이 컬럼으로 추가 (샤드 병합용)
+
+    Returns
+    -------
+    DataFrame
+        입원 순서 → lab_items 순서로 정렬된 선택 결과 (day_offset 포함).
+        선택된 검사가 없으면 빈 DataFrame
+    """
+    lab_itemids = list(lab_items.keys())
+    item_pos = pd.Series(np.arange(len(lab_itemids)), index=lab_itemids)
+
+    adm = pd.DataFrame({
+        'adm_pos': np.arange(len(admissions)),
+        'hadm_id': admissions['hadm_id'].values,
+        'subject_id': admissions['subject_id'].values,
+        'admit_day': _day_column(admissions, 'admittime', 'admit_day'),
+    })
+
+    # 대상 itemid / 코호트 환자 / 시간 있는 행만 후보로 사용
+    # (hadm_id는 subject_id에 종속되므로 subject_id 조건만으로 기존 OR 조건과 동일)
+    all_chart_days = _day_column(labevents, 'charttime', 'chart_day')
+    mask = (labevents['itemid'].isin(lab_itemids).values
+            & labevents['subject_id'].isin(adm['subject_id']).values
+            & (all_chart_days != MISSING_DAY))
+    row_idx = np.flatnonzero(mask)
+    if len(row_idx) == 0:
+        return pd.DataFrame()
+
+    lab_subject = labevents['subject_id'].values[row_idx]
+    lab_itemid = labevents['itemid'].values[row_idx]
+    chart_day = all_chart_days[row_idx].astype(np.int64)
+
+    # 각 검사 행을 "이 검사가 Day k 가 되는 입원일" 후보로 펼친 뒤 입원과 조인
+    candidates = pd.concat([
+        pd.DataFrame({
+            'subject_id': lab_subject,
+            'admit_day': chart_day - offset,
+            'itemid': lab_itemid,
+            'row': np.arange(len(row_idx)),
+            'rank': rank,
+        })
+        for rank, offset in enumerate(day_priority)
+    ], ignore_index=True)
+    candidates = candidates.merge(adm, on=['subject_id', 'admit_day'], how='inner')
+    if candidates.empty:
+        return pd.DataFrame()
+
+    candidates['item_pos'] = item_pos.reindex(candidates['itemid'].values).values
+
+    # 입원 → itemid → 우선순위 → 원본 행 순서로 정렬 후 그룹별 첫 행 선택
+    order = np.lexsort((candidates['row'].values, candidates['rank'].values,
+                        candidates['item_pos'].values, candidates['adm_pos'].values))
+    candidates = candidates.iloc[order]
+    best = candidates.drop_duplicates(['adm_pos', 'item_pos'], keep='first')
+
+    picked_rows = row_idx[best['row'].values]
+    picked = labevents.iloc[picked_rows]
+
+    selected = pd.DataFrame({
+        'hadm_id': best['hadm_id'].values,
+        'subject_id': best['subject_id'].values,
+        'admit_date': days_to_datetime(best['admit_day'].values),
+        'itemid': best['itemid'].values,
+        'lab_name': [lab_items[i] for i in best['itemid'].values],
+        'charttime': picked['charttime'].values,
+        'chart_date': days_to_datetime(all_chart_days[picked_rows]),
+        'valuenum': picked['valuenum'].values,
+    })
+    for col, default in OPTIONAL_LAB_COLUMNS.items():
+        selected[col] = picked[col].values if col in picked.columns else default
+    selected['day_offset'] = np.asarray(day_priority)[best['rank'].values]
+    if position_col:
+        selected[position_col] = best['adm_pos'].values
+
+    return selected
+
+
+def build_offset_info(selected):
+    """선택 결과에서 offset 정보 테이블 생성"""
+    if selected.empty:
+        return pd.DataFrame()
+
+    offset_df = selected[['hadm_id', 'itemid', 'lab_name', 'day_offset']].copy()
+    offset_df['source'] = offset_df['day_offset'].map(offset_source)
+    return offset_df.reset_index(drop=True)
+
+
+def _window_candidates(anchors, labevents, lab_items, window_df, anchor_col, time_index):
+    """
+    윈도우별로 (기준 행 × 구간) 조회 후 후보를 하나로 합침
+
+    Returns
+    -------
+    (candidates, anchor_sec)
+        candidates: anchor_pos, row(labevents 행 번호), sec, rank, itemid, item_pos
+    """
+    lab_itemids = list(lab_items.keys())
+    item_pos = pd.Series(np.arange(len(lab_itemids)), index=lab_itemids)
+
+    if time_index is None:
+        item_rows = np.flatnonzero(labevents['itemid'].isin(lab_itemids).values)
+        labs = labevents.iloc[item_rows]
+        time_index = SubjectTimeIndex.from_frame(labs, sec_col='chart_sec')
+        row_map = item_rows
+    else:
+        row_map = np.arange(len(labevents))
+
+    anchor_sec = epoch_seconds(anchors[anchor_col])
+    valid_anchor = np.flatnonzero(anchor_sec != MISSING_SECONDS)
+
+    parts = []
+    for rank, start_h, end_h in zip(window_df['rank'], window_df['start_hours'], window_df['end_hours']):
+        query_pos, positions = time_index.query(
+            anchors['subject_id'].values[valid_anchor],
+            anchor_sec[valid_anchor] + hours_to_seconds(start_h),
+            anchor_sec[valid_anchor] + hours_to_seconds(end_h),
+        )
+        parts.append(pd.DataFrame({
+            'anchor_pos': valid_anchor[query_pos],
+            'row': row_map[time_index.rows[positions]],
+            'sec': time_index.seconds[positions],
+            'rank': rank,
+        }))
+    candidates = pd.concat(parts, ignore_index=True)
+
+    candidates['itemid'] = labevents['itemid'].values[candidates['row'].values]
+    candidates = candidates[candidates['itemid'].isin(lab_itemids)]
+    candidates['item_pos'] = item_pos.reindex(candidates['itemid'].values).values
+    return candidates, anchor_sec
+
+
+def select_window_labs(anchors, labevents, lab_items, windows=HOUR_WINDOWS,
+                       anchor_col='admittime', select='first', key_cols=('hadm_id',),
+                       time_index=None, position_col=None):
+    """
+    기준 시각 대비 시간 단위 윈도우로 (기준 행, itemid)마다 검사값 하나 선택
+
+    Parameters
+    ----------
+    anchors : DataFrame
+        subject_id, anchor_col 컬럼 필요 (입원: admittime, ICU: intime)
+    labevents : DataFrame
+        subject_id, itemid, charttime, valuenum 컬럼 필요 (chart_sec가 있으면 재사용)
+    lab_items : dict
+        {itemid: lab_name}, 출력 순서도 이 순서를 따름
+    windows : list of (start_hours, end_hours)
+        우선순위 순서의 윈도우 (양 끝 포함). 예: [(-6, 24)]
+    anchor_col : str
+        기준 시각 컬럼
+    select : str
+        같은 윈도우 안의 선택 기준 - 'first'(가장 이른 값), 'last'(가장 늦은 값),
+        'closest'(기준 시각에 가장 가까운 값)
+    key_cols : tuple
+        결과에 그대로 복사할 기준 행 식별 컬럼 (ICU 기준이면 ('stay_id', 'hadm_id'))
+    time_index : SubjectTimeIndex, optional
+        labevents 전체로 미리 만든 인덱스 (여러 윈도우 설정을 반복 실행할 때 재사용)
+    position_col : str, optional
+        지정하면 각 결과 행의 anchors 내 위치(0부터)를 이 컬럼으로 추가 (샤드 병합용)
+
+    Returns
+    -------
+    DataFrame
+        기준 행 순서 → lab_items 순서로 정렬된 선택 결과
+        (window, window_rank, hours_from_anchor 포함). 선택된 검사가 없으면 빈 DataFrame
+    """
+    if select not in SELECT_RULES:
+        raise ValueError(f"select는 {SELECT_RULES} 중 하나여야 합니다: {select}")
+
+    window_df = windows_frame(windows)
+    candidates, anchor_sec = _window_candidates(anchors, labevents, lab_items, window_df,
+                                                anchor_col, time_index)
+    if candidates.empty:
+        return pd.DataFrame()
+
+    delta = candidates['sec'].values - anchor_sec[candidates['anchor_pos'].values]
+    if select == 'first':
+        order_key = candidates['sec'].values
+    elif select == 'last':
+        order_key = -candidates['sec'].values
+    else:
+        order_key = np.abs(delta)
+
+    # 기준 행 → itemid → 윈도우 우선순위 → 선택 기준 → 원본 행 순서
+    order = np.lexsort((candidates['row'].values, order_key, candidates['rank'].values,
+                        candidates['item_pos'].values, candidates['anchor_pos'].values))
+    candidates = candidates.iloc[order]
+    best = candidates.drop_duplicates(['anchor_pos', 'item_pos'], keep='first')
+    best_delta = best['sec'].values - anchor_sec[best['anchor_pos'].values]
+
+    picked = labevents.iloc[best['row'].values]
+    anchor_rows = anchors.iloc[best['anchor_pos'].values]
+
+    selected = pd.DataFrame({
+        col: anchor_rows[col].values for col in key_cols if col in anchors.columns
+    })
+    selected['subject_id'] = anchor_rows['subject_id'].values
+    selected[anchor_col] = anchor_rows[anchor_col].values
+    selected['itemid'] = best['itemid'].values
+    selected['lab_name'] = [lab_items[i] for i in best['itemid'].values]
+    selected['charttime'] = picked['charttime'].values
+    selected['valuenum'] = picked['valuenum'].values
+    for col, default in OPTIONAL_LAB_COLUMNS.items():
+        selected[col] = picked[col].values if col in picked.columns else default
+    selected['window_rank'] = best['rank'].values
+    selected['window'] = window_df['window'].values[best['rank'].values]
+    selected['hours_from_anchor'] = best_delta / SECONDS_PER_HOUR
+    if position_col:
+        selected[position_col] = best['anchor_pos'].values
+
+    return selected
+
+
+def aggregate_column(lab_name, window_key, aggregate):
+    """wide 컬럼명: {lab_name}_{window_key}_{집계} (예: Glucose_50931_0_24h_max)"""
+    return f"{lab_name}_{window_key}_{aggregate}"
+
+
+def aggregate_window_labs(anchors, labevents, lab_items, windows=HOUR_WINDOWS,
+                          anchor_col='admittime', aggregates=AGGREGATES, key_cols=('hadm_id',),
+                          time_index=None, position_col=None):
+    """
+    (기준 행, itemid, 윈도우)별 검사값 집계를 한 번의 groupby로 계산
+
+    윈도우는 우선순위 없이 각각 독립적으로 집계합니다 (같은 검사가 여러 윈도우에 포함될 수 있음).
+
+    Parameters
+    ----------
+    anchors, labevents, lab_items, windows, anchor_col, key_cols, time_index, position_col
+        select_window_labs와 동일
+    aggregates : tuple
+        AGGREGATES 중 계산할 항목
+        - first / last: charttime 기준 valuenum이 있는 첫/마지막 값
+          (valuenum 결측 행은 건너뜀, 같은 시각이면 원본 행 순서)
+        - min / max / mean / count: valuenum 기준 (결측 제외)
+        - 값 집계는 valuenum dtype 유지 (float32 스키마면 float32, mean만 float64로 누적 후 변환)
+        - abnormal_count: flag == 'abnormal'인 검사 수
+
+    Returns
+    -------
+    DataFrame
+        기준 행 → lab_items → 윈도우 순서의 long format
+        (window, window_key, window_rank + 집계 컬럼). 해당하는 검사가 없으면 빈 DataFrame
+    """
+    unknown = [agg for agg in aggregates if agg not in AGGREGATES]
+    if unknown:
+        raise ValueError(f"지원하지 않는 집계입니다: {unknown} (가능: {AGGREGATES})")
+
+    window_df = windows_frame(windows)
+    candidates, _ = _window_candidates(anchors, labevents, lab_items, window_df,
+                                       anchor_col, time_index)
+    if candidates.empty:
+        return pd.DataFrame()
+
+    # 기준 행 → itemid → 윈도우 → 시각 → 원본 행 순서로 정렬 후 그룹 순서를 유지한 채 집계
+    order = np.lexsort((candidates['row'].values, candidates['sec'].values, candidates['rank'].values,
+                        candidates['item_pos'].values, candidates['anchor_pos'].values))
+    candidates = candidates.iloc[order]
+    rows = candidates['row'].values
+
+    # float32 valuenum을 float64로 넓히면 CSV에 1.100000023841858 같은 자릿수가 남으므로 dtype 유지
+    value = labevents['valuenum'].values[rows]
+    if not np.issubdtype(value.dtype, np.floating):
+        value = value.astype(np.float64)
+    values = pd.DataFrame({
+        'anchor_pos': candidates['anchor_pos'].values,
+        'itemid': candidates['itemid'].values,
+        'rank': candidates['rank'].values,
+        'value': value,
+    })
+    if 'mean' in aggregates:
+        values['value_mean'] = value.astype(np.float64)
+    if 'flag' in labevents.columns:
+        values['abnormal'] = np.asarray(labevents['flag'].values[rows] == 'abnormal', dtype=np.int64)
+    else:
+        values['abnormal'] = 0
+
+    source = {'abnormal_count': 'abnormal', 'mean': 'value_mean'}
+    spec = {agg: (source.get(agg, 'value'), 'sum' if agg == 'abnormal_count' else agg)
+            for agg in aggregates}
+    grouped = values.groupby(['anchor_pos', 'itemid', 'rank'], sort=False).agg(**spec).reset_index()
+
+    anchor_rows = anchors.iloc[grouped['anchor_pos'].values]
+    result = pd.DataFrame({
+        col: anchor_rows[col].values for col in key_cols if col in anchors.columns
+    })
+    result['subject_id'] = anchor_rows['subject_id'].values
+    result[anchor_col] = anchor_rows[anchor_col].values
+    result['itemid'] = grouped['itemid'].values
+    result['lab_name'] = [lab_items[i] for i in grouped['itemid'].values]
+    result['window_rank'] = grouped['rank'].values
+    result['window'] = window_df['window'].values[grouped['rank'].values]
+    result['window_key'] = window_df['window_key'].values[grouped['rank'].values]
+    for agg in aggregates:
+        result[agg] = grouped[agg].values
+    if 'mean' in aggregates:
+        result['mean'] = result['mean'].astype(value.dtype)
+    if position_col:
+        result[position_col] = grouped['anchor_pos'].values
+
+    return result
+
+
+def pivot_window_aggregates(base_df, aggregated, lab_items, windows=HOUR_WINDOWS, aggregates=AGGREGATES,
+                            key='hadm_id'):
+    """
+    aggregate_window_labs 결과를 base_df 옆에 {lab_name}_{window_key}_{집계} 컬럼으로 붙임
+
+    컬럼은 데이터 유무와 관계없이 lab_items → windows → aggregates 순서로 모두 생성
+
+    Returns
+    -------
+    (wide_df, agg_columns)
+    """
+    window_keys = windows_frame(windows)['window_key'].tolist()
+    columns = [f"{lab_name}_{wkey}" for lab_name in lab_items.values() for wkey in window_keys]
+    if not aggregated.empty:
+        aggregated = aggregated.assign(column=aggregated['lab_name'] + '_' + aggregated['window_key'])
+    return build_wide_format(base_df, aggregated, columns, key=key, column_col='column',
+                             value_cols={agg: f"_{agg}" for agg in aggregates})
+
+
+def _sweep_bounds(anchor_sec, unit, start, end):
+    """윈도우 정의 → 기준 행별 [하한, 상한] epoch 초 (양 끝 포함)"""
+    if unit == 'day':
+        midnight = seconds_to_days(anchor_sec).astype(np.int64) * SECONDS_PER_DAY
+        return midnight + start * SECONDS_PER_DAY, midnight + (end + 1) * SECONDS_PER_DAY - 1
+    if unit == 'hour':
+        return anchor_sec + hours_to_seconds(start), anchor_sec + hours_to_seconds(end)
+    raise ValueError(f"윈도우 단위는 'day' 또는 'hour'여야 합니다: {unit}")
+
+
+def sweep_lab_windows(anchors, labevents, lab_items, windows=SWEEP_WINDOWS,
+                      anchor_col='admittime', time_index=None):
+    """
+    여러 윈도우 정의의 검사 커버리지와 검사별 결측률을 한 번의 조회로 계산
+
+    모든 윈도우를 감싸는 구간으로 인덱스를 한 번만 조회한 뒤,
+    후보 검사마다 윈도우별 구간 포함 여부를 정수 비교로 판정합니다.
+    추출 결과(wide 표의 값 결측)와 같은 기준이 되도록 valuenum이 있는 행만 관측으로 셉니다.
+
+    Parameters
+    ----------
+    anchors : DataFrame
+        subject_id, anchor_col 컬럼 필요
+    labevents : DataFrame
+        subject_id, itemid, charttime, valuenum 컬럼 필요 (chart_sec가 있으면 재사용)
+    lab_items : dict
+        {itemid: lab_name}, 결측률 표의 행 순서도 이 순서를 따름
+    windows : list of (name, unit, start, end)
+        unit='day': 기준일 대비 [start, end]일 (달력 날짜, 양 끝 포함)
+        unit='hour': 기준 시각 대비 [start, end]시간 (양 끝 포함)
+    anchor_col : str
+        기준 시각 컬럼 (입원: admittime, ICU: intime)
+    time_index : SubjectTimeIndex, optional
+        labevents 전체로 미리 만든 인덱스
+
+    Returns
+    -------
+    (coverage_df, missing_df)
+        coverage_df: 윈도우별 검사 있는 기준 행 수/비율, 평균 결측률
+        missing_df: 검사(lab_name) × 윈도우 결측률(%)
+    """
+    lab_itemids = list(lab_items.keys())
+    item_pos = pd.Series(np.arange(len(lab_itemids)), index=lab_itemids)
+    n_anchors, n_items = len(anchors), len(lab_itemids)
+
+    has_value = labevents['valuenum'].notna().values
+    if time_index is None:
+        item_rows = np.flatnonzero(labevents['itemid'].isin(lab_itemids).values & has_value)
+        time_index = SubjectTimeIndex.from_frame(labevents.iloc[item_rows], sec_col='chart_sec')
+        row_map = item_rows
+    else:
+        row_map = np.arange(len(labevents))
+
+    anchor_sec = epoch_seconds(anchors[anchor_col])
+    valid_anchor = np.flatnonzero(anchor_sec != MISSING_SECONDS)
+    bounds = [_sweep_bounds(anchor_sec[valid_anchor], unit, start, end)
+              for _, unit, start, end in windows]
+
+    # 모든 윈도우를 감싸는 구간으로 한 번만 조회
+    query_pos, positions = time_index.query(
+        anchors['subject_id'].values[valid_anchor],
+        np.min([lo for lo, _ in bounds], axis=0),
+        np.max([hi for _, hi in bounds], axis=0),
+    )
+    rows = row_map[time_index.rows[positions]]
+    cand_item = item_pos.reindex(labevents['itemid'].values[rows]).values
+    # 미리 만든 인덱스에는 valuenum 없는 행이 있을 수 있음
+    keep = ~np.isnan(cand_item) & has_value[rows]
+    query_pos, sec = query_pos[keep], time_index.seconds[positions][keep]
+    cand_item = cand_item[keep].astype(np.int64)
+
+    coverage, missing = [], {}
+    for (name, unit, start, end), (lo, hi) in zip(windows, bounds):
+        inside = (sec >= lo[query_pos]) & (sec <= hi[query_pos])
+        pairs = np.unique(query_pos[inside] * n_items + cand_item[inside])
+        item_counts = np.bincount(pairs % n_items, minlength=n_items)
+        n_with_lab = len(np.unique(pairs // n_items))
+        missing_pct = (1 - item_counts / n_anchors) * 100 if n_anchors else np.full(n_items, np.nan)
+
+        missing[name] = missing_pct
+        coverage.append({
+            'window': name,
+            'unit': unit,
+            'start': start,
+            'end': end,
+            'total_anchors': n_anchors,
+            'anchors_with_labs': n_with_lab,
+            'anchors_without_labs': n_anchors - n_with_lab,
+            'coverage_pct': n_with_lab / n_anchors * 100 if n_anchors else np.nan,
+            'mean_missing_pct': float(np.mean(missing_pct)) if n_items else np.nan,
+        })
+
+    coverage_df = pd.DataFrame(coverage)
+    missing_df = pd.DataFrame(missing, index=pd.Index([lab_items[i] for i in lab_itemids], name='lab_name'))
+    return coverage_df, missing_df
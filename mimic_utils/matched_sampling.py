@@ -0,0 +1,197 @@
+"""
+사망 입원에 맞춘 대조군(생존) 매칭 샘플링
+- 범주형 키(gender, admission_type)는 완전 일치: 키 조합마다 그룹을 나눠 그룹 안에서만 매칭
+- 연속형 키(anchor_age, 입원 연도)는 caliper로 나눈 좌표에서 KD-tree 최근접 탐색 (Chebyshev 거리 ≤ 1)
+  → 후보 수십만 건과의 쌍별 거리 계산 없이 그룹별 트리 조회 한 번
+- 사례(case)마다 가까운 순으로 아직 쓰지 않은 후보를 ratio개까지 배정 (비복원, 사례 순서는 무작위)
+- 매칭 전후 균형은 표준화 평균 차이(SMD)로 확인
+
+사용 예:
+    controls, report = match_controls(deaths, survived, ratio=1, random_state=42)
+    balance = balance_table(deaths, controls)
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy.spatial import cKDTree
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+# 완전 일치 키 / 연속형 키별 caliper (이 차이 이내만 매칭)
+MATCH_EXACT = ('gender', 'admission_type')
+MATCH_CALIPERS = {'anchor_age': 5.0, 'admit_year': 3.0}
+
+# 결과에 붙는 매칭 정보 컬럼
+MATCHED_COL = 'matched_hadm_id'
+DISTANCE_COL = 'match_distance'
+
+# cKDTree의 distance_upper_bound는 경계 미포함 → caliper와 같은 차이도 포함되도록 약간 넓힘
+_BOUND = 1.0 + 1e-9
+
+
+def add_admit_year(df, time_col='admittime'):
+    """입원 연도 컬럼(admit_year) 추가 (제자리 수정 후 반환)"""
+    df['admit_year'] = pd.to_datetime(df[time_col]).dt.year
+    return df
+
+
+def _exact_groups(cases, candidates, exact):
+    """사례/후보의 완전 일치 키 → 공통 그룹 번호 (결측도 하나의 값으로 취급)"""
+    if not exact:
+        return np.zeros(len(cases), dtype=np.int64), np.zeros(len(candidates), dtype=np.int64)
+    keys = pd.concat([cases[list(exact)], candidates[list(exact)]], ignore_index=True).astype(object)
+    codes = keys.groupby(list(exact), dropna=False, sort=False).ngroup().values
+    return codes[:len(cases)], codes[len(cases):]
+
+
+def _greedy_assign(tree, points, ratio, n_candidates):
+    """
+    사례 순서대로 가까운 미사용 후보 ratio개 배정
+
+    Returns
+    -------
+    (case_pos, candidate_pos, distance)
+    """
+    used = np.zeros(n_candidates, dtype=bool)
+    case_pos, cand_pos, dists = [], [], []
+
+    # 처음에는 사례마다 이웃 ratio × 4개를 한 번에 조회 (caliper 밖은 거리 inf)
+    k = min(n_candidates, ratio * 4)
+    dist_all, idx_all = tree.query(points, k=k, p=np.inf, distance_upper_bound=_BOUND)
+    dist_all = np.asarray(dist_all).reshape(len(points), k)
+    idx_all = np.asarray(idx_all).reshape(len(points), k)
+
+    for i in range(len(points)):
+        dist, idx = dist_all[i], idx_all[i]
+        while True:
+            free = np.isfinite(dist) & ~used[np.minimum(idx, n_candidates - 1)]
+            picks = np.flatnonzero(free)[:ratio]
+            # 이웃이 모두 사용 중인데 목록 끝까지 caliper 안이면 더 넓게 다시 조회
+            if len(picks) == ratio or not np.isfinite(dist[-1]) or len(dist) >= n_candidates:
+                break
+            dist, idx = tree.query(points[i], k=min(n_candidates, len(dist) * 2), p=np.inf,
+                                   distance_upper_bound=_BOUND)
+            dist, idx = np.atleast_1d(dist), np.atleast_1d(idx)
+
+        used[idx[picks]] = True
+        case_pos.extend([i] * len(picks))
+        cand_pos.extend(idx[picks])
+        dists.extend(dist[picks])
+
+    return np.asarray(case_pos, dtype=np.int64), np.asarray(cand_pos, dtype=np.int64), np.asarray(dists)
+
+
+def match_controls(cases, candidates, ratio=1, exact=MATCH_EXACT, calipers=MATCH_CALIPERS,
+                   random_state=None):
+    """
+    사례마다 조건이 맞는 대조군 ratio개를 비복원으로 매칭
+
+    Parameters
+    ----------
+    cases : DataFrame
+        매칭 기준 입원 (hadm_id + exact / calipers 컬럼)
+    candidates : DataFrame
+        대조군 후보 (같은 컬럼, 사례와 같은 hadm_id는 제외)
+    ratio : int
+        사례당 대조군 수
+    exact : tuple
+        완전 일치 컬럼
+    calipers : dict
+        {연속형 컬럼: 허용 차이} (모든 컬럼이 허용 차이 이내여야 매칭)
+    random_state : int, optional
+        사례 처리 순서 / 후보 동률 순서 재현용
+
+    Returns
+    -------
+    (controls, report)
+        controls: 매칭된 후보 행 + matched_hadm_id + match_distance (caliper 단위 Chebyshev 거리)
+        report: cases / matched_cases / controls / unmatched_cases
+    """
+    if not HAS_SCIPY:
+        raise ImportError("매칭 샘플링에는 scipy가 필요합니다 (uv pip install scipy)")
+
+    # 사례 자신은 후보에서 제외 (층 기준이 겹치는 입원)
+    candidates = candidates[~candidates['hadm_id'].isin(cases['hadm_id']).values]
+
+    rng = np.random.default_rng(random_state)
+    # 후보 순서를 섞어 두면 거리가 같은 후보 중 선택도 무작위
+    candidates = candidates.iloc[rng.permutation(len(candidates))]
+    case_order = rng.permutation(len(cases))
+
+    numeric = list(calipers)
+    scale = np.array([calipers[col] for col in numeric], dtype=np.float64)
+    case_points = cases[numeric].to_numpy(dtype=np.float64) / scale
+    cand_points = candidates[numeric].to_numpy(dtype=np.float64) / scale
+    case_group, cand_group = _exact_groups(cases, candidates, exact)
+
+    # 연속형 키가 결측이면 매칭 대상에서 제외
+    case_ok = ~np.isnan(case_points).any(axis=1)
+    cand_ok = ~np.isnan(cand_points).any(axis=1)
+
+    cand_by_group = pd.Series(np.flatnonzero(cand_ok)).groupby(cand_group[cand_ok]).apply(np.asarray)
+    matched_case, matched_cand, matched_dist = [], [], []
+    for group, case_idx in pd.Series(case_order).groupby(case_group[case_order], sort=False):
+        case_idx = case_idx.values[case_ok[case_idx.values]]
+        if group not in cand_by_group.index or len(case_idx) == 0:
+            continue
+        cand_idx = cand_by_group[group]
+        tree = cKDTree(cand_points[cand_idx])
+        case_pos, cand_pos, dist = _greedy_assign(tree, case_points[case_idx], ratio, len(cand_idx))
+        matched_case.append(case_idx[case_pos])
+        matched_cand.append(cand_idx[cand_pos])
+        matched_dist.append(dist)
+
+    matched_case = np.concatenate(matched_case) if matched_case else np.zeros(0, dtype=np.int64)
+    matched_cand = np.concatenate(matched_cand) if matched_cand else np.zeros(0, dtype=np.int64)
+    matched_dist = np.concatenate(matched_dist) if matched_dist else np.zeros(0)
+
+    # 사례 원래 순서 → 가까운 순
+    order = np.lexsort((matched_dist, matched_case))
+    controls = candidates.iloc[matched_cand[order]].reset_index(drop=True)
+    controls[MATCHED_COL] = cases['hadm_id'].values[matched_case[order]]
+    controls[DISTANCE_COL] = matched_dist[order]
+
+    n_matched = len(np.unique(matched_case))
+    report = {
+        'cases': len(cases),
+        'matched_cases': n_matched,
+        'controls': len(controls),
+        'unmatched_cases': len(cases) - n_matched,
+    }
+    return controls, report
+
+
+def _smd(case_values, control_values):
+    """표준화 평균 차이 (두 집단 분산의 평균으로 나눔)"""
+    case_values = np.asarray(case_values, dtype=np.float64)
+    control_values = np.asarray(control_values, dtype=np.float64)
+    pooled = np.sqrt((np.nanvar(case_values, ddof=1) + np.nanvar(control_values, ddof=1)) / 2)
+    diff = np.nanmean(case_values) - np.nanmean(control_values)
+    return diff / pooled if pooled > 0 else 0.0
+
+
+def balance_table(cases, controls, numeric=tuple(MATCH_CALIPERS), categorical=MATCH_EXACT):
+    """
+    사례 / 대조군 균형 비교
+
+    Returns
+    -------
+    DataFrame
+        variable, case, control (평균 또는 비율), smd
+        (범주형은 수준별 비율, |smd| < 0.1이면 보통 균형으로 봄)
+    """
+    rows = []
+    for col in numeric:
+        rows.append({'variable': col, 'case': cases[col].mean(), 'control': controls[col].mean(),
+                     'smd': _smd(cases[col], controls[col])})
+    for col in categorical:
+        levels = pd.unique(pd.concat([cases[col], controls[col]]).dropna().astype(str))
+        for level in sorted(levels):
+            case_ind = (cases[col].astype(str) == level).astype(float)
+            control_ind = (controls[col].astype(str) == level).astype(float)
+            rows.append({'variable': f'{col}={level}', 'case': case_ind.mean(),
+                         'control': control_ind.mean(), 'smd': _smd(case_ind, control_ind)})
+    return pd.DataFrame(rows)
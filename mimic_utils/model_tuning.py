@@ -0,0 +1,285 @@
+"""
+트리 모델 하이퍼파라미터 탐색 (successive halving / hyperband)
+- 모든 격자점을 최대 트리 수로 평가하지 않고, 적은 트리 수(resource)로 전부 평가한 뒤
+  상위 1/eta만 eta배 트리 수로 다시 평가 → 최대 트리 수까지 남는 후보는 소수
+- hyperband: 시작 트리 수가 다른 successive halving 여러 개(bracket)를 실행 (초기 성능이 늦게 오르는 설정 보호)
+- (설정, 트리 수, fold) 평가를 프로세스 풀에 분배, 워커는 fold_cache의 memory-map 행렬을 경로로 열어 공유
+- 평가 결과는 fold 캐시 디렉터리의 JSON에 저장 → 같은 데이터 / 설정으로 다시 실행하면 학습 없이 재사용
+
+사용 예:
+    folds = build_folds(X, groups=subject_ids, base_path=BASE_DIR)
+    result = hyperband(folds, y, 'classification', 'rf', max_resource=400, workers=8)
+    result['best_params'], result['best_score']
+"""
+
+import os
+import json
+import math
+import hashlib
+import time
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from mimic_utils.fold_cache import open_array
+
+try:
+    import xgboost as xgb
+    HAS_XGBOOST = True
+except ImportError:
+    HAS_XGBOOST = False
+
+# 모델별 기본 탐색 공간 (격자)
+SEARCH_SPACES = {
+    'rf': {
+        'max_depth': [5, 10, 20, None],
+        'min_samples_leaf': [1, 5, 10, 20],
+        'max_features': ['sqrt', 0.3, 0.6],
+    },
+    'xgb': {
+        'max_depth': [3, 4, 6, 8],
+        'learning_rate': [0.03, 0.1, 0.3],
+        'subsample': [0.6, 0.8, 1.0],
+        'colsample_bytree': [0.6, 0.8, 1.0],
+    },
+}
+
+CACHE_FILENAME = 'tuning_results.json'
+
+
+def make_model(model, task, params, n_estimators, random_state=42):
+    """모델 이름 + 작업(classification / regression) → 학습 전 추정기 (워커 안에서는 n_jobs=1)"""
+    if model == 'rf':
+        from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+        cls = RandomForestClassifier if task == 'classification' else RandomForestRegressor
+        return cls(n_estimators=n_estimators, random_state=random_state, n_jobs=1, **params)
+    if model == 'xgb':
+        if not HAS_XGBOOST:
+            raise ImportError("XGBoost 탐색에는 xgboost가 필요합니다 (uv pip install xgboost)")
+        cls = xgb.XGBClassifier if task == 'classification' else xgb.XGBRegressor
+        return cls(n_estimators=n_estimators, random_state=random_state, n_jobs=1, **params)
+    raise ValueError(f"지원하지 않는 모델입니다: {model} (가능: {list(SEARCH_SPACES)})")
+
+
+def score_model(estimator, task, X_valid, y_valid):
+    """검증 점수 (클수록 좋음): 분류는 AUROC, 회귀는 -MAE"""
+    from sklearn.metrics import roc_auc_score, mean_absolute_error
+
+    if task == 'classification':
+        if len(np.unique(y_valid)) < 2:
+            return float('nan')
+        return float(roc_auc_score(y_valid, estimator.predict_proba(X_valid)[:, 1]))
+    return -float(mean_absolute_error(y_valid, estimator.predict(X_valid)))
+
+
+def _evaluate(task_args):
+    """워커: fold 행렬을 memory-map으로 열고 (설정, 트리 수) 한 번 학습 / 평가"""
+    model, task, params, resource, train_path, valid_path, y_train, y_valid, random_state = task_args
+    started = time.perf_counter()
+    estimator = make_model(model, task, params, resource, random_state)
+    estimator.fit(open_array(train_path), y_train)
+    score = score_model(estimator, task, open_array(valid_path), y_valid)
+    return score, time.perf_counter() - started
+
+
+def param_grid(space):
+    """{파라미터: 후보 목록} → 설정 dict 목록 (격자 전체)"""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def _config_key(params):
+    return json.dumps(params, sort_keys=True)
+
+
+def label_digest(y, task):
+    """타겟 값 + 작업의 sha256 앞 16자리 (타겟을 다시 정의하면 캐시 키가 바뀜)"""
+    y = np.asarray(y)
+    digest = hashlib.sha256(f'{task}|{y.dtype.str}|{y.shape}'.encode())
+    digest.update(np.ascontiguousarray(y).tobytes())
+    return digest.hexdigest()[:16]
+
+
+class TuningCache:
+    """
+    (모델, 타겟, 타겟 해시, 설정, 트리 수, fold, 시드) → (점수, 학습 시간) 디스크 캐시
+
+    fold 캐시 디렉터리 안에 저장하므로 특성 행렬 / 분할이 바뀌면 자동으로 새 캐시,
+    타겟 값이나 작업(분류 / 회귀)이 바뀌면 label_digest가 달라져 새 항목
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    @staticmethod
+    def key(model, target, labels, params, resource, fold, random_state):
+        return f'{model}|{target}|{labels}|{_config_key(params)}|{resource}|{fold}|{random_state}'
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, key, score, seconds):
+        self.entries[key] = [score, seconds]
+
+    def save(self):
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+
+
+def _evaluate_rung(configs, resource, folds, y, task, model, target, cache, executor, random_state):
+    """
+    설정 목록을 트리 수 resource로 모든 fold에서 평가 (캐시에 없는 것만 학습)
+
+    Returns
+    -------
+    (평균 점수 배열, 새로 학습한 수, 학습 시간 합)
+    """
+    labels = label_digest(y, task)
+    tasks, keys = [], []
+    for params in configs:
+        for k in range(len(folds)):
+            key = TuningCache.key(model, target, labels, params, resource, k, random_state)
+            if cache.get(key) is not None:
+                continue
+            train_path, valid_path = folds.paths(k)
+            y_train, y_valid = folds.split_target(y, k)
+            tasks.append((model, task, params, resource, str(train_path), str(valid_path),
+                          y_train, y_valid, random_state))
+            keys.append(key)
+
+    if tasks:
+        results = executor.map(_evaluate, tasks) if executor is not None else map(_evaluate, tasks)
+        for key, (score, seconds) in zip(keys, results):
+            cache.put(key, score, seconds)
+        cache.save()
+
+    scores = np.array([[cache.get(TuningCache.key(model, target, labels, params, resource, k, random_state))[0]
+                        for k in range(len(folds))] for params in configs], dtype=np.float64)
+    seconds = sum(cache.get(key)[1] for key in keys)
+    return np.nanmean(scores, axis=1), len(tasks), seconds
+
+
+def successive_halving(folds, y, task, model, configs, min_resource, max_resource, eta=3,
+                       target='target', cache=None, executor=None, random_state=42):
+    """
+    successive halving 한 번 (bracket)
+
+    Parameters
+    ----------
+    configs : list
+        시작 설정 목록
+    min_resource, max_resource : int
+        시작 / 최대 트리 수 (rung마다 eta배, 마지막 rung은 항상 max_resource)
+    eta : int
+        rung마다 남기는 비율 1/eta
+
+    Returns
+    -------
+    list
+        rung별 {resource, n_configs, trained, seconds, scores: [(설정, 평균 점수)]}
+    """
+    # 트리 수는 최대에서 거꾸로 max_resource / eta^k (마지막 rung이 정확히 최대, 반올림 누적 없음)
+    n_rungs = int(math.floor(math.log(max_resource / min_resource, eta) + 1e-9)) + 1
+    rungs = []
+    for rung in range(n_rungs):
+        resource = int(round(max_resource / eta ** (n_rungs - 1 - rung)))
+        scores, trained, seconds = _evaluate_rung(configs, resource, folds, y, task, model, target,
+                                                  cache, executor, random_state)
+        rungs.append({
+            'resource': resource,
+            'n_configs': len(configs),
+            'trained': trained,
+            'seconds': seconds,
+            'scores': [(params, float(score)) for params, score in zip(configs, scores)],
+        })
+        if rung == n_rungs - 1:
+            break
+        # 점수가 NaN이면 가장 뒤로 (한 클래스뿐인 fold만 있는 경우)
+        order = np.argsort(-np.nan_to_num(scores, nan=-np.inf), kind='stable')
+        configs = [configs[i] for i in order[:max(1, len(configs) // eta)]]
+    return rungs
+
+
+def _best(rungs_list):
+    """bracket별 마지막(최대 트리 수) rung 중 최고 점수 설정"""
+    candidates = []
+    for rungs in rungs_list:
+        final = rungs[-1]
+        for params, score in final['scores']:
+            candidates.append((final['resource'], score, params))
+    top_resource = max(c[0] for c in candidates)
+    resource, score, params = max((c for c in candidates if c[0] == top_resource and not math.isnan(c[1])),
+                                  key=lambda c: c[1], default=(top_resource, float('nan'), None))
+    return params, score, resource
+
+
+def _run(brackets, folds, y, task, model, target, workers, random_state, eta, max_resource):
+    """bracket 목록 [(설정 목록, 시작 트리 수)]을 풀 하나로 실행해서 결과 정리"""
+    cache = TuningCache(os.path.join(folds.directory, CACHE_FILENAME))
+    started = time.perf_counter()
+    executor = ProcessPoolExecutor(max_workers=workers) if workers and workers > 1 else None
+    try:
+        rungs_list = [successive_halving(folds, y, task, model, configs, min_resource, max_resource, eta,
+                                         target, cache, executor, random_state)
+                      for configs, min_resource in brackets]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    params, score, resource = _best(rungs_list)
+    return {
+        'model': model,
+        'target': target,
+        'task': task,
+        'best_params': params,
+        'best_score': score,
+        'best_resource': resource,
+        'brackets': rungs_list,
+        'trained': sum(rung['trained'] for rungs in rungs_list for rung in rungs),
+        'train_seconds': sum(rung['seconds'] for rungs in rungs_list for rung in rungs),
+        'wall_seconds': time.perf_counter() - started,
+    }
+
+
+def halving_search(folds, y, task, model, space=None, min_resource=25, max_resource=400, eta=3,
+                   target='target', workers=1, random_state=42):
+    """
+    격자 전체로 successive halving 한 번
+
+    Returns
+    -------
+    dict
+        best_params, best_score(클수록 좋음), best_resource, brackets(rung 기록),
+        trained(새로 학습한 수, 캐시 재사용분 제외), train_seconds, wall_seconds
+    """
+    configs = param_grid(space or SEARCH_SPACES[model])
+    return _run([(configs, min_resource)], folds, y, task, model, target, workers, random_state, eta, max_resource)
+
+
+def hyperband(folds, y, task, model, space=None, min_resource=25, max_resource=400, eta=3,
+              target='target', workers=1, random_state=42):
+    """
+    hyperband: bracket s = s_max..0 마다 설정 n_s개를 격자에서 뽑아 트리 수 R·eta^-s부터 successive halving
+
+    Returns
+    -------
+    dict
+        halving_search와 같음
+    """
+    grid = param_grid(space or SEARCH_SPACES[model])
+    rng = np.random.default_rng(random_state)
+    s_max = int(math.floor(math.log(max_resource / min_resource, eta) + 1e-9))
+
+    brackets = []
+    for s in range(s_max, -1, -1):
+        n_configs = min(len(grid), int(math.ceil((s_max + 1) / (s + 1) * eta ** s)))
+        picks = rng.choice(len(grid), size=n_configs, replace=False)
+        brackets.append(([grid[i] for i in picks], max_resource / eta ** s))
+    return _run(brackets, folds, y, task, model, target, workers, random_state, eta, max_resource)
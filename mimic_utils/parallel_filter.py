@@ -0,0 +1,134 @@
+"""
+멀티프로세스 CSV 필터
+- CSV를 줄바꿈 경계에 맞춘 byte 구간으로 나눠 프로세스 풀에서 동시에 필터링
+- 각 구간은 ID 컬럼만 파싱하고, 매칭된 원본 줄을 그대로 임시 파일에 기록
+- 메인 프로세스는 구간 순서대로 임시 파일을 결과 파일에 이어 붙임
+  → 처리량은 코어 수에 비례, 메모리는 (구간 크기 × 프로세스 수)로 제한
+"""
+
+import io
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+RANGE_SIZE = 64 << 20  # 구간 크기 (64MB)
+
+# 워커 프로세스 전역 상태 (initializer에서 한 번만 설정)
+_worker_state = {}
+
+
+def split_byte_ranges(path, range_size=RANGE_SIZE):
+    """헤더 이후 데이터를 줄바꿈 경계에 맞춘 (start, end) byte 구간 목록으로 분할"""
+    file_size = os.path.getsize(path)
+    ranges = []
+    with open(path, 'rb') as f:
+        f.readline()  # 헤더
+        start = f.tell()
+        while start < file_size:
+            end = min(start + range_size, file_size)
+            if end < file_size:
+                f.seek(end)
+                f.readline()  # 다음 줄바꿈까지 이동
+                end = f.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _init_worker(header, id_filters):
+    """워커 초기화: 헤더와 ID 집합을 프로세스마다 한 번만 전달"""
+    _worker_state['header'] = header
+    _worker_state['id_filters'] = id_filters
+
+
+def _filter_range(task):
+    """한 byte 구간을 필터링해서 매칭된 원본 줄을 임시 파일에 기록"""
+    path, start, end, part_path = task
+    header = _worker_state['header']
+    id_filters = _worker_state['id_filters']
+
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    lines = data.split(b'\n')
+    if lines and lines[-1] in (b'', b'\r'):
+        lines.pop()
+
+    id_cols = list(id_filters.keys())
+    ids = pd.read_csv(io.BytesIO(data), header=None, names=header, usecols=id_cols,
+                      skip_blank_lines=False)
+    if len(ids) != len(lines):
+        # 따옴표 안의 줄바꿈 등으로 줄 수와 행 수가 다르면 안전하게 중단
+        raise ValueError(f"byte 구간 {start}-{end}: 행 수 불일치 ({len(ids)} != {len(lines)})")
+
+    # subject_id 또는 hadm_id 중 하나라도 샘플에 포함되면 매칭
+    mask = np.zeros(len(ids), dtype=bool)
+    for col, values in id_filters.items():
+        mask |= ids[col].isin(values).values
+
+    selected = np.flatnonzero(mask)
+    with open(part_path, 'wb') as out:
+        if len(selected) > 0:
+            out.write(b'\n'.join(lines[i] for i in selected))
+            out.write(b'\n')
+
+    return len(lines), len(selected)
+
+
+def parallel_filter_csv(source_path, target_path, id_filters, n_workers=None,
+                        range_size=RANGE_SIZE, progress=True):
+    """
+    CSV를 병렬로 필터링해서 결과 파일에 순서대로 기록
+
+    Parameters
+    ----------
+    source_path, target_path : str or Path
+        원본 CSV, 결과 CSV 경로
+    id_filters : dict
+        {'subject_id': ids, 'hadm_id': ids} 형식. 하나라도 일치하면 포함 (OR 조건)
+    n_workers : int, optional
+        프로세스 수 (기본값: CPU 코어 수)
+
+    Returns
+    -------
+    (scanned_rows, matched_rows)
+    """
+    with open(source_path, 'rb') as f:
+        header_line = f.readline()
+    header = pd.read_csv(io.BytesIO(header_line), nrows=0).columns.tolist()
+    id_filters = {col: np.asarray(list(values)) for col, values in id_filters.items()}
+
+    ranges = split_byte_ranges(source_path, range_size)
+    tmp_dir = tempfile.mkdtemp(prefix='parallel_filter_',
+                               dir=os.path.dirname(os.path.abspath(target_path)))
+    tasks = [(str(source_path), start, end, os.path.join(tmp_dir, f'part_{i:06d}.csv'))
+             for i, (start, end) in enumerate(ranges)]
+
+    scanned_rows = 0
+    matched_rows = 0
+    try:
+        with open(target_path, 'wb') as out, ProcessPoolExecutor(
+                max_workers=n_workers or os.cpu_count(),
+                initializer=_init_worker, initargs=(header, id_filters)) as executor:
+            out.write(header_line)
+            # executor.map은 제출 순서대로 결과를 돌려주므로 출력 순서가 원본과 같음
+            for i, (scanned, matched) in enumerate(executor.map(_filter_range, tasks)):
+                part_path = tasks[i][3]
+                with open(part_path, 'rb') as part:
+                    shutil.copyfileobj(part, out)
+                os.remove(part_path)
+
+                scanned_rows += scanned
+                matched_rows += matched
+                if progress and (i + 1) % 20 == 0:
+                    print(f"      처리 중... {scanned_rows:,} 행 검사, {matched_rows:,} 행 매칭 "
+                          f"({i + 1}/{len(tasks)} 구간)")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return scanned_rows, matched_rows
@@ -0,0 +1,221 @@
+"""
+subject_id 범위로 나눈 대용량 이벤트 테이블 저장소
+- labevents(1.2억 행) 같은 테이블을 subject_id 구간(bucket)별 파일로 한 번만 분할
+- 코호트 추출 시 샘플 subject_id가 속한 bucket 파일만 읽음
+- bucket 내부는 (subject_id, charttime) 정렬 + 작은 row group → footer의 subject_id 최소/최대로
+  샘플 환자가 없는 row group은 읽지 않음 (bucket당 환자 ~1,200명 중 몇 명만 샘플이므로 대부분 건너뜀)
+"""
+
+import os
+import json
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import numpy as np
+
+from mimic_utils.table_cache import PROJECT_ROOT, STRING_COLUMNS, HAS_PYARROW
+from mimic_utils.schema import apply_schema
+
+if HAS_PYARROW:
+    import pyarrow.parquet as pq
+
+STORE_DIRNAME = 'processed_data/partitioned'
+
+# MIMIC-IV subject_id 범위 (10000000 ~ 19999999)
+SUBJECT_ID_MIN = 10_000_000
+SUBJECT_ID_MAX = 20_000_000
+N_BUCKETS = 256
+
+CHUNK_SIZE = 1_000_000
+# labevents bucket(~47만 행)당 ~115개, row group 하나에 환자 ~10명
+ROW_GROUP_SIZE = 4_096
+
+# 저장 형식이 바뀌면 올림 → 이전 저장소는 has_store가 False (다시 분할)
+STORE_VERSION = 2
+
+# 분할 저장 대상 (subject_id가 있는 대용량 이벤트 테이블)
+LARGE_EVENT_TABLES = [
+    'hosp/labevents',
+    'hosp/microbiologyevents',
+    'hosp/emar',
+    'hosp/pharmacy',
+    'hosp/prescriptions',
+    'hosp/poe',
+    'icu/chartevents',
+    'icu/datetimeevents',
+    'icu/inputevents',
+    'icu/outputevents',
+    'icu/procedureevents',
+]
+
+
+def store_dir(table, base_path=None):
+    """'hosp/labevents' → processed_data/partitioned/hosp/labevents"""
+    base = Path(base_path) if base_path else PROJECT_ROOT
+    return base / STORE_DIRNAME / table
+
+
+def bucket_of(subject_ids, n_buckets=N_BUCKETS):
+    """subject_id → bucket 번호 (연속된 ID 구간 단위)"""
+    width = -(-(SUBJECT_ID_MAX - SUBJECT_ID_MIN) // n_buckets)
+    ids = np.asarray(subject_ids, dtype=np.int64)
+    return np.clip((ids - SUBJECT_ID_MIN) // width, 0, n_buckets - 1)
+
+
+def load_manifest(table, base_path=None):
+    """저장소 manifest 로드 (없으면 None)"""
+    manifest_path = store_dir(table, base_path) / 'manifest.json'
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def has_store(table, base_path=None):
+    """분할 저장소가 있고 원본 CSV와 일치하는지 확인 (원본이 삭제된 경우는 저장소 그대로 사용)"""
+    manifest = load_manifest(table, base_path)
+    if manifest is None:
+        return False
+    base = Path(base_path) if base_path else PROJECT_ROOT
+    source_path = base / 'dataset2' / f'{table}.csv'
+    if not source_path.exists():
+        return True
+    stat = os.stat(source_path)
+    return (manifest.get('version') == STORE_VERSION
+            and manifest['source'] == {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size})
+
+
+def build_store(table, base_path=None, n_buckets=N_BUCKETS, chunk_size=CHUNK_SIZE):
+    """
+    원본 CSV를 subject_id bucket 파일로 분할 저장 (최초 1회)
+
+    1단계: 청크 단위로 읽어 bucket별 임시 CSV에 이어쓰기 (메모리: 청크 크기)
+    2단계: bucket별로 읽어 정렬 후 Parquet(없으면 CSV)로 저장 (메모리: bucket 크기)
+    """
+    base = Path(base_path) if base_path else PROJECT_ROOT
+    source_path = base / 'dataset2' / f'{table}.csv'
+    out_dir = store_dir(table, base_path)
+    tmp_dir = out_dir / '_tmp'
+
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    tmp_dir.mkdir(parents=True)
+
+    header = pd.read_csv(source_path, nrows=0).columns
+    dtype = {col: str for col in header if col in STRING_COLUMNS}
+    sort_cols = ['subject_id'] + [c for c in ('charttime', 'starttime') if c in header][:1]
+
+    # 1단계: bucket별 임시 파일로 분배
+    total_rows = 0
+    for chunk_num, chunk in enumerate(pd.read_csv(source_path, chunksize=chunk_size, dtype=dtype)):
+        buckets = bucket_of(chunk['subject_id'].values, n_buckets)
+        for bucket, group in chunk.groupby(buckets):
+            tmp_path = tmp_dir / f'bucket_{bucket:04d}.csv'
+            group.to_csv(tmp_path, mode='a', header=not tmp_path.exists(), index=False)
+        total_rows += len(chunk)
+        if (chunk_num + 1) % 10 == 0:
+            print(f"      분배 중... {total_rows:,} 행")
+
+    # 2단계: bucket별 정렬 후 최종 파일 저장
+    ext = 'parquet' if HAS_PYARROW else 'csv'
+    buckets_meta = {}
+    for tmp_path in sorted(tmp_dir.glob('bucket_*.csv')):
+        bucket = int(tmp_path.stem.split('_')[1])
+        df = pd.read_csv(tmp_path, dtype=dtype)
+        df = df.sort_values(sort_cols, kind='stable').reset_index(drop=True)
+
+        out_path = out_dir / f'bucket_{bucket:04d}.{ext}'
+        if HAS_PYARROW:
+            df.to_parquet(out_path, index=False, compression='zstd', row_group_size=ROW_GROUP_SIZE)
+        else:
+            df.to_csv(out_path, index=False)
+
+        buckets_meta[str(bucket)] = {
+            'file': out_path.name,
+            'rows': len(df),
+            'min_subject_id': int(df['subject_id'].min()),
+            'max_subject_id': int(df['subject_id'].max()),
+        }
+
+    shutil.rmtree(tmp_dir)
+
+    stat = os.stat(source_path)
+    manifest = {
+        'version': STORE_VERSION,
+        'table': table,
+        'n_buckets': n_buckets,
+        'format': ext,
+        'row_group_size': ROW_GROUP_SIZE,
+        'total_rows': total_rows,
+        'source': {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size},
+        'buckets': buckets_meta,
+    }
+    with open(out_dir / 'manifest.json', 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def _matching_row_groups(metadata, ids):
+    """정렬된 ids 중 하나라도 subject_id 최소~최대 범위에 드는 row group 번호 (통계 없으면 포함)"""
+    column = metadata.schema.names.index('subject_id')
+    groups = []
+    for i in range(metadata.num_row_groups):
+        stats = metadata.row_group(i).column(column).statistics
+        if (stats is None or not stats.has_min_max
+                or np.searchsorted(ids, stats.max, 'right') > np.searchsorted(ids, stats.min, 'left')):
+            groups.append(i)
+    return groups
+
+
+def read_cohort(table, subject_ids, columns=None, base_path=None):
+    """
+    샘플 subject_id가 속한 bucket만 읽어서 해당 환자 행 반환
+
+    Parameters
+    ----------
+    table : str
+        'hosp/labevents' 형식
+    subject_ids : iterable
+        추출할 subject_id 집합
+    columns : list, optional
+        읽을 컬럼 (subject_id는 필터용으로 항상 포함)
+    """
+    manifest = load_manifest(table, base_path)
+    if manifest is None:
+        raise FileNotFoundError(f"{table} 분할 저장소가 없습니다. build_store()를 먼저 실행하세요.")
+
+    out_dir = store_dir(table, base_path)
+    ids = np.unique(np.asarray(list(subject_ids), dtype=np.int64))
+    read_cols = None
+    if columns:
+        read_cols = list(dict.fromkeys(['subject_id'] + list(columns)))
+
+    frames = []
+    for bucket in np.unique(bucket_of(ids, manifest['n_buckets'])):
+        meta = manifest['buckets'].get(str(bucket))
+        if meta is None:
+            continue
+        bucket_ids = ids[(ids >= meta['min_subject_id']) & (ids <= meta['max_subject_id'])]
+        if len(bucket_ids) == 0:
+            continue
+
+        path = out_dir / meta['file']
+        if manifest['format'] == 'parquet':
+            parquet_file = pq.ParquetFile(path)
+            groups = _matching_row_groups(parquet_file.metadata, bucket_ids)
+            if not groups:
+                continue
+            df = parquet_file.read_row_groups(groups, columns=read_cols).to_pandas()
+            df = df[df['subject_id'].isin(bucket_ids)]
+        else:
+            df = pd.read_csv(path, usecols=read_cols,
+                             dtype={col: str for col in STRING_COLUMNS})
+            df = df[df['subject_id'].isin(bucket_ids)]
+        frames.append(df)
+
+    if not frames:
+        return pd.DataFrame(columns=columns or [])
+    result = pd.concat(frames, ignore_index=True)
+    return apply_schema(result[columns] if columns else result, table)
@@ -0,0 +1,201 @@
+"""
+샘플 묶음(family): 여러 시드 / bootstrap 샘플을 한 번의 추출로 공유
+- K개 샘플의 ID 합집합으로 hosp/icu 테이블을 한 번만 추출해서 공유 테이블로 저장
+- 각 샘플은 공유 테이블 위의 가벼운 인덱스 뷰 (입원 위치 배열 + ID별 등장 횟수 배열)
+  → bootstrap 샘플은 중복 추출된 입원의 행이 추출 횟수만큼 반복됨
+  → 50개 시드 민감도 분석도 원본 추출 비용은 한 번
+- 테이블별 키(subject_id / hadm_id) → 합집합 ID 번호는 테이블마다 한 번만 계산해서 재사용
+
+사용 예:
+    family = SampleFamily.from_samples(samples_list, tables, TABLE_SPECS)
+    family.save(out_dir)
+
+    family = SampleFamily.load(out_dir)
+    for k in range(len(family)):
+        admissions = family.admissions(k)
+        weights = family.weights(k)
+        labevents = family.table(k, 'hosp_labevents')
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from mimic_utils.schema import read_csv_typed
+from mimic_utils.stratified_sampling import MORTALITY_STRATA
+from mimic_utils.sampling_weights import admission_weights
+
+FAMILY_DIRNAME = 'processed_data/sample_family'
+
+
+def bootstrap_family(samples, n_resamples, random_state=None):
+    """
+    층화 bootstrap: 기준 샘플의 층마다 같은 크기로 복원 추출
+
+    Parameters
+    ----------
+    samples : dict
+        {층: 샘플 DataFrame} (stream_stratified_sample 결과 등)
+    n_resamples : int
+        bootstrap 샘플 수
+
+    Returns
+    -------
+    list
+        [{층: 복원 추출 DataFrame}] (같은 입원이 여러 번 나올 수 있음)
+    """
+    seeds = np.random.SeedSequence(random_state).spawn(n_resamples)
+    family = []
+    for seed in seeds:
+        rng = np.random.default_rng(seed)
+        family.append({name: rows.iloc[rng.integers(0, len(rows), len(rows))].reset_index(drop=True)
+                       for name, rows in samples.items()})
+    return family
+
+
+def family_ids(family, column):
+    """샘플 묶음 전체의 고유 ID (추출 대상 합집합)"""
+    return pd.unique(np.concatenate([rows[column].values for samples in family
+                                     for rows in samples.values()]))
+
+
+class SampleFamily:
+    """
+    공유 추출 테이블 위의 샘플 K개
+
+    Attributes
+    ----------
+    admissions_table : DataFrame
+        합집합 입원 (hadm_id 고유, anchor_age / dod 포함)
+    tables : dict
+        {이름: 합집합 ID로 추출한 공유 테이블}
+    specs : dict
+        {이름: (스키마 테이블, 키 컬럼)} (예: COHORT_TABLES)
+    members : list
+        샘플별 admissions_table 행 위치 배열 (bootstrap이면 중복 가능)
+    groups : list
+        members와 같은 길이의 층 번호 배열 (MORTALITY_STRATA 위치)
+    meta : dict
+        시드, 방식 등 (저장 시 family.json)
+    """
+
+    def __init__(self, admissions_table, tables, specs, members, groups, meta=None):
+        self.admissions_table = admissions_table.reset_index(drop=True)
+        self.tables = tables
+        self.specs = dict(specs)
+        self.members = [np.asarray(m, dtype=np.int64) for m in members]
+        self.groups = [np.asarray(g, dtype=np.int8) for g in groups]
+        self.meta = dict(meta or {})
+        self._key_codes = {}
+        self._id_counts = {}
+
+    @classmethod
+    def from_samples(cls, family, tables, specs, meta=None):
+        """[{층: 샘플}] + 합집합으로 추출한 테이블 → SampleFamily"""
+        frames = [rows for samples in family for rows in samples.values()]
+        admissions_table = pd.concat(frames, ignore_index=True).drop_duplicates('hadm_id')
+        hadm_index = pd.Index(admissions_table['hadm_id'].values)
+
+        members, groups = [], []
+        for samples in family:
+            members.append(np.concatenate([hadm_index.get_indexer(rows['hadm_id'].values)
+                                           for rows in samples.values()]))
+            groups.append(np.concatenate([np.full(len(rows), MORTALITY_STRATA.index(name))
+                                          for name, rows in samples.items()]))
+        return cls(admissions_table, tables, specs, members, groups, meta)
+
+    def __len__(self):
+        return len(self.members)
+
+    def admissions(self, k):
+        """샘플 k의 입원 (샘플 순서, mortality_group 컬럼 추가)"""
+        rows = self.admissions_table.iloc[self.members[k]].reset_index(drop=True)
+        rows['mortality_group'] = np.asarray(MORTALITY_STRATA)[self.groups[k]]
+        return rows
+
+    def weights(self, k):
+        """샘플 k의 입원별 가중치 (admissions(k) 순서, meta의 population_strata 기준)"""
+        if 'population_strata' not in self.meta:
+            raise ValueError("family.json에 population_strata가 없습니다 (perform_sampling.py --family 재실행 필요)")
+        return admission_weights(np.asarray(MORTALITY_STRATA)[self.groups[k]], self.meta['population_strata'])
+
+    def ids(self, k, column):
+        """샘플 k의 고유 subject_id / hadm_id"""
+        return pd.unique(self.admissions_table[column].values[self.members[k]])
+
+    def _codes(self, name):
+        """테이블 키 → 합집합 ID 번호 (테이블마다 한 번만 계산)"""
+        if name not in self._key_codes:
+            column = self.specs[name][1]
+            universe = pd.Index(pd.unique(self.admissions_table[column].values))
+            self._key_codes[name] = (universe, universe.get_indexer(self.tables[name][column].values))
+        return self._key_codes[name]
+
+    def _multiplicity(self, k, column, universe):
+        """
+        샘플 k에서 합집합 ID 번호별 등장 횟수 (0이면 샘플 밖)
+
+        같은 ID의 입원 중 가장 많이 뽑힌 입원의 추출 횟수 → 시드 샘플은 0/1,
+        bootstrap은 hadm_id 키면 그 입원의 추출 횟수 (subject_id 키면 그 환자 입원 중 최대)
+        """
+        key = (k, column)
+        if key not in self._id_counts:
+            positions, draws = np.unique(self.members[k], return_counts=True)
+            codes = universe.get_indexer(self.admissions_table[column].values[positions])
+            counts = np.zeros(len(universe), dtype=np.int64)
+            np.maximum.at(counts, codes, draws)
+            self._id_counts[key] = counts
+        return self._id_counts[key]
+
+    def table(self, k, name, repeat=True):
+        """
+        샘플 k에 해당하는 공유 테이블 행 (원래 행 순서)
+
+        시드 샘플은 입원이 중복되지 않으므로 행마다 한 번씩 나오는 집합 뷰입니다.
+        bootstrap 샘플은 키 ID가 뽑힌 횟수만큼 행을 반복합니다 (admissions(k)와 같은 가중).
+        repeat=False면 bootstrap도 중복 없이 속한 행만 반환합니다.
+        """
+        universe, codes = self._codes(name)
+        counts = self._multiplicity(k, self.specs[name][1], universe)
+        rows = np.where(codes >= 0, counts[np.maximum(codes, 0)], 0)
+        if not repeat or rows.max(initial=0) <= 1:
+            return self.tables[name][rows > 0]
+        return self.tables[name].iloc[np.repeat(np.arange(len(rows)), rows)]
+
+    def save(self, directory):
+        """공유 테이블(CSV) + 샘플 인덱스(members.npz) + family.json 저장"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        self.admissions_table.to_csv(directory / 'admissions.csv', index=False)
+        for name, df in self.tables.items():
+            df.to_csv(directory / f'{name}.csv', index=False)
+
+        # 샘플별 길이가 달라도 되도록 CSR 형식 (ptr[k]:ptr[k+1])
+        ptr = np.concatenate(([0], np.cumsum([len(m) for m in self.members])))
+        np.savez_compressed(directory / 'members.npz', ptr=ptr,
+                            positions=np.concatenate(self.members) if self.members else np.zeros(0, np.int64),
+                            groups=np.concatenate(self.groups) if self.groups else np.zeros(0, np.int8))
+        with open(directory / 'family.json', 'w') as f:
+            json.dump({**self.meta, 'n_samples': len(self), 'specs': self.specs,
+                       'strata': list(MORTALITY_STRATA)}, f, indent=2, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory):
+        """save로 저장한 샘플 묶음 열기 (원본 데이터는 다시 읽지 않음)"""
+        directory = Path(directory)
+        with open(directory / 'family.json') as f:
+            meta = json.load(f)
+        specs = {name: tuple(spec) for name, spec in meta.pop('specs').items()}
+        meta.pop('strata', None)
+        meta.pop('n_samples', None)
+
+        admissions_table = read_csv_typed(directory / 'admissions.csv', 'core/admissions')
+        tables = {name: read_csv_typed(directory / f'{name}.csv', spec[0]) for name, spec in specs.items()}
+
+        arrays = np.load(directory / 'members.npz')
+        ptr = arrays['ptr']
+        members = [arrays['positions'][ptr[k]:ptr[k + 1]] for k in range(len(ptr) - 1)]
+        groups = [arrays['groups'][ptr[k]:ptr[k + 1]] for k in range(len(ptr) - 1)]
+        return cls(admissions_table, tables, specs, members, groups, meta)
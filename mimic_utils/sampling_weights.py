@@ -0,0 +1,268 @@
+"""
+층화 샘플의 역확률 가중치(IPW)와 가중 집계
+- 층 h에서 전체 N_h건 중 n_h건을 뽑았으면 샘플 입원마다 가중치 w = N_h / n_h
+  → 사망 그룹을 과대 추출한 300/300/600 샘플로도 전체 코호트 기준 추정
+- 가중치는 perform_sampling이 sampled_ids.csv(sampling_weight)와
+  sampling_results.json(population_strata)에 함께 저장
+- 평균 / 비율 / 분위수 / 그룹별 집계 모두 정렬 + 누적합 한 번으로 계산 (그룹마다 반복하지 않음)
+  - 분위수는 가중 누적분포의 역함수 (가중치 합이 q 이상이 되는 첫 값, 모든 가중치가 같으면
+    np.quantile(method='inverted_cdf')와 같음)
+
+사용 예:
+    weights = load_sampling_weights(BASE_PATH)
+    icu = attach_weights(icustays, weights)
+    weighted_mean(icu['los'], icu['sampling_weight'])
+    weighted_groupby(icu, 'first_careunit', ['los'])
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from mimic_utils.table_cache import PROJECT_ROOT
+
+WEIGHT_COL = 'sampling_weight'
+GROUP_COL = 'mortality_group'
+
+# perform_sampling 결과 위치
+RESULTS_DIRNAME = 'analysis_samplingmethod/data'
+
+# weighted_groupby 통계 → 분위수 (그 외: count, population, mean, std)
+QUANTILE_STATS = {'median': 0.5, 'q1': 0.25, 'q3': 0.75, 'p95': 0.95}
+DEFAULT_STATS = ('count', 'population', 'mean', 'std', 'median', 'q1', 'q3', 'p95')
+
+
+def stratum_weights(population_counts, sample_counts):
+    """
+    층별 가중치 N_h / n_h
+
+    Parameters
+    ----------
+    population_counts : dict
+        {층: 전체 코호트 입원 수} (categorize_admissions / 스트리밍 stats['strata'])
+    sample_counts : dict
+        {층: 샘플 입원 수}
+
+    Returns
+    -------
+    dict
+        {층: 가중치} (샘플이 없는 층은 제외)
+    """
+    missing = [name for name, n in sample_counts.items() if n > 0 and name not in population_counts]
+    if missing:
+        raise ValueError(f"전체 층 크기가 없는 층입니다: {missing}")
+    return {name: population_counts[name] / n for name, n in sample_counts.items() if n > 0}
+
+
+def admission_weights(groups, population_counts):
+    """
+    샘플 입원별 가중치 배열
+
+    Parameters
+    ----------
+    groups : array-like
+        샘플 입원별 추출 층 (샘플 크기 n_h는 여기서 셈)
+    population_counts : dict
+        {층: 전체 코호트 입원 수}
+
+    Returns
+    -------
+    ndarray
+        float64 가중치 (groups 순서)
+    """
+    groups = pd.Series(np.asarray(groups))
+    weights = stratum_weights(population_counts, groups.value_counts().to_dict())
+    return groups.map(weights).to_numpy(dtype=np.float64)
+
+
+def load_sampling_weights(base_path=None):
+    """
+    perform_sampling 결과의 입원별 가중치
+
+    Returns
+    -------
+    DataFrame
+        subject_id, hadm_id, mortality_group, sampling_weight (sampled_ids.csv 순서)
+    """
+    data_path = Path(base_path or PROJECT_ROOT) / RESULTS_DIRNAME
+    with open(data_path / 'sampling_results.json') as f:
+        results = json.load(f)
+    if results.get('sampling_design') == 'matched':
+        raise ValueError("--matched 샘플의 생존 그룹은 무작위 추출이 아니라서 가중치로 전체 추정을 할 수 없습니다")
+
+    sampled_ids = pd.read_csv(data_path / 'sampled_ids.csv')
+    if WEIGHT_COL not in sampled_ids.columns:
+        if 'population_strata' not in results:
+            raise ValueError("sampling_results.json에 population_strata가 없습니다 (perform_sampling.py 재실행 필요)")
+        sampled_ids[WEIGHT_COL] = admission_weights(sampled_ids[GROUP_COL], results['population_strata'])
+    return sampled_ids[['subject_id', 'hadm_id', GROUP_COL, WEIGHT_COL]]
+
+
+def attach_weights(df, weights, on='hadm_id', weight_col=WEIGHT_COL):
+    """
+    df 행마다 소속 입원의 가중치 컬럼 추가 (복사본 반환)
+
+    - ICU 입실처럼 입원 하나에 여러 행이면 모두 같은 가중치 (입원 단위 추출)
+    - 같은 입원이 여러 층에서 뽑혔으면 가중치 합 (행을 복제하지 않음)
+    - 샘플에 없는 입원은 NaN (가중 집계에서 제외)
+    """
+    per_key = weights.groupby(on, sort=False)[weight_col].sum()
+    result = df.copy()
+    result[weight_col] = df[on].map(per_key).to_numpy(dtype=np.float64)
+    return result
+
+
+def _valid(values, weights):
+    """값 / 가중치가 모두 있고 가중치 > 0인 위치"""
+    return ~np.isnan(values) & ~np.isnan(weights) & (weights > 0)
+
+
+def _as_float(values):
+    return np.asarray(values, dtype=np.float64)
+
+
+def weighted_mean(values, weights):
+    """가중 평균 (결측 제외, 대상이 없으면 NaN)"""
+    values, weights = _as_float(values), _as_float(weights)
+    ok = _valid(values, weights)
+    total = weights[ok].sum()
+    return float((values[ok] * weights[ok]).sum() / total) if total > 0 else np.nan
+
+
+def weighted_rate(flags, weights):
+    """가중 비율 (0/1 또는 bool → 0~1, 예: 사망률)"""
+    return weighted_mean(_as_float(flags), weights)
+
+
+def weighted_std(values, weights):
+    """가중 표준편차 (모집단 기준: Σw(x - m)² / Σw)"""
+    values, weights = _as_float(values), _as_float(weights)
+    ok = _valid(values, weights)
+    mean = weighted_mean(values[ok], weights[ok])
+    if np.isnan(mean):
+        return np.nan
+    return float(np.sqrt((weights[ok] * (values[ok] - mean) ** 2).sum() / weights[ok].sum()))
+
+
+def effective_sample_size(weights):
+    """Kish 유효 표본 크기 (Σw)² / Σw² (가중치 편차가 클수록 작아짐)"""
+    weights = _as_float(weights)
+    weights = weights[~np.isnan(weights)]
+    square = (weights ** 2).sum()
+    return float(weights.sum() ** 2 / square) if square > 0 else 0.0
+
+
+def _group_quantiles(codes, values, weights, n_groups, qs):
+    """
+    그룹별 가중 분위수 (codes: 0..n_groups-1, 결측 제외된 배열)
+
+    (그룹, 값) 순 정렬 후 그룹 안 누적 가중치 비율을 그룹 번호에 더한 키
+    → 모든 그룹 / 분위수를 searchsorted 한 번으로 조회
+
+    Returns
+    -------
+    ndarray
+        (n_groups, len(qs)), 값이 없는 그룹은 NaN
+    """
+    result = np.full((n_groups, len(qs)), np.nan)
+    if len(values) == 0:
+        return result
+
+    order = np.lexsort((values, codes))
+    codes, values, weights = codes[order], values[order], weights[order]
+    cum = np.cumsum(weights)
+    totals = np.bincount(codes, weights=weights, minlength=n_groups)
+    ends = np.cumsum(np.bincount(codes, minlength=n_groups))
+    starts = ends - np.bincount(codes, minlength=n_groups)
+
+    # 그룹 안 누적 비율 (0, 1] (마지막 행은 반올림 오차 없이 정확히 1)
+    offset = np.where(starts > 0, cum[np.maximum(starts - 1, 0)], 0.0)
+    frac = (cum - np.repeat(offset, ends - starts)) / np.repeat(totals, ends - starts)
+    frac[ends[ends > starts] - 1] = 1.0
+    keys = codes + frac
+
+    present = np.flatnonzero(ends > starts)
+    # q = 0이면 그룹 최솟값 (이전 그룹 끝 키와 겹치지 않도록 아주 작은 양수로)
+    targets = present[:, None] + np.clip(np.asarray(qs, dtype=np.float64), 1e-12, 1.0)[None, :]
+    pos = np.searchsorted(keys, targets.ravel(), side='left').reshape(targets.shape)
+    pos = np.minimum(pos, (ends[present] - 1)[:, None])
+    result[present] = values[pos]
+    return result
+
+
+def weighted_quantile(values, weights, q=0.5):
+    """
+    가중 분위수 (q: 스칼라 또는 배열, 결측 제외)
+
+    Returns
+    -------
+    float 또는 ndarray
+    """
+    values, weights = _as_float(values), _as_float(weights)
+    ok = _valid(values, weights)
+    qs = np.atleast_1d(q)
+    result = _group_quantiles(np.zeros(int(ok.sum()), dtype=np.int64), values[ok], weights[ok], 1, qs)[0]
+    return float(result[0]) if np.ndim(q) == 0 else result
+
+
+def weighted_groupby(df, by, value_cols, weight_col=WEIGHT_COL, stats=DEFAULT_STATS):
+    """
+    그룹별 가중 집계
+
+    Parameters
+    ----------
+    df : DataFrame
+        by, value_cols, weight_col 컬럼 필요
+    by : str 또는 list
+        그룹 컬럼
+    value_cols : list
+        집계할 수치 컬럼
+    stats : tuple
+        count(샘플 행 수), population(가중치 합 = 추정 전체 수), mean, std,
+        QUANTILE_STATS 키(median, q1, q3, p95)
+
+    Returns
+    -------
+    DataFrame
+        그룹 인덱스 × 컬럼 (value_cols가 하나면 통계 이름, 여러 개면 (값 컬럼, 통계) MultiIndex)
+    """
+    unknown = [name for name in stats
+               if name not in ('count', 'population', 'mean', 'std') and name not in QUANTILE_STATS]
+    if unknown:
+        raise ValueError(f"지원하지 않는 통계입니다: {unknown}")
+
+    by = [by] if isinstance(by, str) else list(by)
+    grouped = df.groupby(by, sort=True, observed=True)
+    # 그룹 키가 결측인 행은 -1 (집계 제외)
+    codes = grouped.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+    index = grouped.size().index
+    n_groups = len(index)
+
+    in_group = codes >= 0
+    weights_all = _as_float(df[weight_col])
+    quantile_names = [name for name in stats if name in QUANTILE_STATS]
+    qs = [QUANTILE_STATS[name] for name in quantile_names]
+
+    frames = {}
+    for col in value_cols:
+        values = _as_float(df[col])
+        ok = in_group & _valid(values, weights_all)
+        code, x, w = codes[ok], values[ok], weights_all[ok]
+
+        count = np.bincount(code, minlength=n_groups)
+        total = np.bincount(code, weights=w, minlength=n_groups)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.bincount(code, weights=w * x, minlength=n_groups) / total
+            var = np.bincount(code, weights=w * (x - mean[code]) ** 2, minlength=n_groups) / total
+
+        columns = {'count': count, 'population': total, 'mean': mean, 'std': np.sqrt(var)}
+        quantiles = _group_quantiles(code, x, w, n_groups, qs) if qs else None
+        for pos, name in enumerate(quantile_names):
+            columns[name] = quantiles[:, pos]
+        frames[col] = pd.DataFrame({name: columns[name] for name in stats}, index=index)
+
+    if len(value_cols) == 1:
+        return frames[value_cols[0]]
+    return pd.concat(frames, axis=1)
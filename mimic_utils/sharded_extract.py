@@ -0,0 +1,118 @@
+"""
+subject_id 해시 샤딩 + 프로세스 풀 검사 추출
+- 입원(기준 행)과 검사 이벤트를 같은 subject_id 해시로 나눠 샤드별로 윈도우 엔진 실행
+  (한 환자의 입원과 검사는 항상 같은 샤드 → 샤드 안에서 선택 결과가 전체 실행과 동일)
+- 샤드 결과는 원래 기준 행 위치 순서로 안정 정렬해서 병합 → 직렬 실행과 같은 행 순서/값
+- select_initial_labs, select_window_labs, aggregate_window_labs 모두 사용 가능
+
+사용 예:
+    long_df = run_sharded(select_initial_labs, admissions, labevents_filtered, LAB_ITEMS, workers=8)
+"""
+
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# 워커 수 대비 샤드 수 (환자별 검사량 편차가 있어도 워커가 고르게 바쁘도록)
+SHARDS_PER_WORKER = 4
+
+# 샤드 결과에 임시로 붙이는 기준 행 위치 컬럼
+_POSITION_COL = '_shard_anchor_pos'
+
+# 64bit 곱셈 해시 상수 (황금비)
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def shard_ids(subject_ids, n_shards):
+    """subject_id → 샤드 번호 (실행/플랫폼과 관계없이 항상 같은 값)"""
+    ids = np.asarray(subject_ids, dtype=np.int64).astype(np.uint64)
+    return ((ids * _HASH_MULTIPLIER) >> np.uint64(32)) % np.uint64(n_shards)
+
+
+def _split_positions(shards, n_shards):
+    """샤드 번호 배열 → 샤드별 원래 위치 배열 목록 (샤드 안에서는 원래 순서 유지)"""
+    order = np.argsort(shards, kind='stable')
+    bounds = np.searchsorted(shards[order], np.arange(n_shards + 1, dtype=np.uint64))
+    return [order[bounds[i]:bounds[i + 1]] for i in range(n_shards)]
+
+
+def _run_shard(task):
+    """워커: 한 샤드에 엔진 실행"""
+    engine, anchors, labevents, lab_items, kwargs = task
+    return engine(anchors, labevents, lab_items, position_col=_POSITION_COL, **kwargs)
+
+
+def run_sharded(engine, anchors, labevents, lab_items, workers=1, **kwargs):
+    """
+    윈도우 엔진을 subject_id 샤드별로 프로세스 풀에서 실행하고 직렬 실행과 같은 순서로 병합
+
+    Parameters
+    ----------
+    engine : callable
+        select_initial_labs / select_window_labs / aggregate_window_labs
+    anchors : DataFrame
+        기준 행 (입원 또는 ICU 입실), subject_id 필요
+    labevents : DataFrame
+        검사 이벤트, subject_id / itemid 필요
+    lab_items : dict
+        {itemid: lab_name}
+    workers : int
+        프로세스 수 (1 이하면 그대로 직렬 실행)
+    **kwargs
+        엔진에 그대로 전달 (time_index는 전체 labevents 기준이므로 사용 불가)
+
+    Returns
+    -------
+    DataFrame
+        engine(anchors, labevents, lab_items, **kwargs)와 같은 결과
+    """
+    if workers is None or workers <= 1:
+        return engine(anchors, labevents, lab_items, **kwargs)
+    if kwargs.get('time_index') is not None:
+        raise ValueError("run_sharded에는 time_index를 넘길 수 없습니다 (샤드마다 새로 생성)")
+
+    # 대상 itemid 행만 워커로 전달 (엔진도 같은 조건으로 거르므로 결과는 동일)
+    labevents = labevents[labevents['itemid'].isin(list(lab_items.keys())).values]
+
+    n_shards = workers * SHARDS_PER_WORKER
+    anchor_parts = _split_positions(shard_ids(anchors['subject_id'].values, n_shards), n_shards)
+    lab_parts = _split_positions(shard_ids(labevents['subject_id'].values, n_shards), n_shards)
+
+    tasks, task_positions = [], []
+    for anchor_pos, lab_pos in zip(anchor_parts, lab_parts):
+        if len(anchor_pos) == 0 or len(lab_pos) == 0:
+            continue
+        tasks.append((engine, anchors.iloc[anchor_pos], labevents.iloc[lab_pos], lab_items, kwargs))
+        task_positions.append(anchor_pos)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(_run_shard, tasks))
+
+    parts = []
+    for result, anchor_pos in zip(results, task_positions):
+        if result.empty:
+            continue
+        result[_POSITION_COL] = anchor_pos[result[_POSITION_COL].values]
+        parts.append(result)
+    if not parts:
+        return pd.DataFrame()
+
+    # 기준 행 위치로 안정 정렬 → 같은 기준 행 안의 순서(검사, 윈도우)는 샤드 결과 그대로
+    merged = pd.concat(parts, ignore_index=True)
+    order = np.argsort(merged[_POSITION_COL].values, kind='stable')
+    return merged.iloc[order].drop(columns=_POSITION_COL).reset_index(drop=True)
+
+
+def workers_from_argv(argv=None, default=1):
+    """명령행의 --workers N 값 (없으면 default, 0이면 CPU 코어 수)"""
+    argv = sys.argv[1:] if argv is None else argv
+    if '--workers' not in argv:
+        return default
+    index = argv.index('--workers')
+    if index + 1 >= len(argv):
+        raise ValueError("--workers 뒤에 프로세스 수를 지정하세요 (예: --workers 8)")
+    workers = int(argv[index + 1])
+    return workers if workers > 0 else (os.cpu_count() or 1)
@@ -0,0 +1,178 @@
+"""
+희소(sparse) wide 검사 테이블 저장/로드
+- wide 검사 컬럼은 대부분 NaN → 값이 있는 칸만 CSC(열 압축) 배열로 저장 (.npz)
+- 열 압축이므로 모델 변수 세트처럼 일부 검사 컬럼만 꺼낼 때 해당 열만 복원
+- 검사 컬럼명과 itemid 열 인덱스를 함께 저장, 기준 컬럼(hadm_id, admittime 등)은 그대로 보관
+- pickle 없이 numpy 배열만 사용 → np.load(allow_pickle=False)로 안전하게 로드
+
+CSV와 같은 이름의 .npz가 CSV보다 최신이면 read_wide_table이 .npz를 우선 사용합니다.
+"""
+
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import scipy.sparse as sp
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+# 컬럼명 끝의 itemid (예: Hematocrit_51221_merged → 51221)
+ITEMID_PATTERN = re.compile(r'_(\d+)(?:_merged)?$')
+
+
+def column_itemids(columns):
+    """검사 컬럼명 → itemid 배열 (컬럼명에 itemid가 없으면 -1)"""
+    itemids = []
+    for col in columns:
+        match = ITEMID_PATTERN.search(col)
+        itemids.append(int(match.group(1)) if match else -1)
+    return np.asarray(itemids, dtype=np.int64)
+
+
+def sparse_path(csv_path):
+    """wide CSV 경로 → 같은 이름의 .npz 경로"""
+    return Path(csv_path).with_suffix('.npz')
+
+
+def _encode_base(base_df):
+    """기준 컬럼 → npz 배열 (문자열/범주는 유니코드 + 결측 마스크)"""
+    arrays = {}
+    for i, col in enumerate(base_df.columns):
+        series = base_df[col]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            arrays[f'base_{i}'] = series.values.astype('datetime64[ns]')
+        elif pd.api.types.is_numeric_dtype(series) and not isinstance(series.dtype, pd.CategoricalDtype):
+            # nullable 정수(Int32)는 결측이 있으면 float64로
+            arrays[f'base_{i}'] = (series.to_numpy(dtype=np.float64, na_value=np.nan)
+                                   if series.isna().any() else series.to_numpy())
+        else:
+            arrays[f'base_{i}'] = series.astype(str).where(series.notna(), '').values.astype(str)
+            arrays[f'base_{i}_null'] = series.isna().values
+    return arrays
+
+
+def _decode_base(npz, base_columns, n_rows):
+    """npz 배열 → 기준 컬럼 DataFrame"""
+    base = {}
+    for i, col in enumerate(base_columns):
+        values = npz[f'base_{i}']
+        if f'base_{i}_null' in npz.files:
+            base[col] = pd.Series(values, dtype=object).where(~npz[f'base_{i}_null'], np.nan)
+        else:
+            base[col] = values
+    return pd.DataFrame(base, index=pd.RangeIndex(n_rows))
+
+
+def save_sparse_wide(path, wide_df, lab_columns):
+    """
+    wide 테이블을 희소 형식(.npz)으로 저장
+
+    Parameters
+    ----------
+    path : str or Path
+        저장 경로 (.npz)
+    wide_df : DataFrame
+        기준 컬럼 + 검사 컬럼
+    lab_columns : list
+        희소 저장할 검사 컬럼 (나머지 컬럼은 기준 컬럼으로 그대로 저장)
+
+    Returns
+    -------
+    dict
+        저장 요약 (행/열 수, 값 있는 칸 수, 밀도, 파일 크기 MB)
+    """
+    lab_columns = list(lab_columns)
+    base_columns = [col for col in wide_df.columns if col not in set(lab_columns)]
+    values = wide_df[lab_columns].to_numpy(dtype=np.float32, na_value=np.nan)
+
+    # 열 우선으로 값 있는 칸만 모아서 CSC 배열 구성
+    present = ~np.isnan(values)
+    col_idx, row_idx = np.nonzero(present.T)
+    indptr = np.concatenate(([0], np.cumsum(present.sum(axis=0)))).astype(np.int64)
+
+    np.savez_compressed(
+        path,
+        shape=np.asarray(values.shape, dtype=np.int64),
+        data=values[row_idx, col_idx],
+        indices=row_idx.astype(np.int32),
+        indptr=indptr,
+        columns=np.asarray(lab_columns, dtype=str),
+        itemids=column_itemids(lab_columns),
+        base_columns=np.asarray(base_columns, dtype=str),
+        **_encode_base(wide_df[base_columns]),
+    )
+
+    n_values = int(present.sum())
+    return {
+        'rows': values.shape[0],
+        'lab_columns': values.shape[1],
+        'stored_values': n_values,
+        'density': n_values / values.size if values.size else 0.0,
+        'file_mb': Path(path).stat().st_size / 1024 ** 2,
+    }
+
+
+def load_sparse_wide(path, columns=None, as_sparse=False):
+    """
+    희소 wide 테이블 로드
+
+    Parameters
+    ----------
+    path : str or Path
+        save_sparse_wide로 저장한 .npz
+    columns : list, optional
+        복원할 검사 컬럼 (None이면 전체). 기준 컬럼은 항상 포함
+    as_sparse : bool
+        True면 (base_df, scipy.sparse.csc_matrix, lab_columns) 반환 (scipy 필요).
+        행렬에 저장되지 않은 칸이 결측입니다 (0으로 읽히므로 결측 여부는 행렬 구조로 판단)
+
+    Returns
+    -------
+    DataFrame
+        기준 컬럼 + 검사 컬럼 (결측은 NaN, float32)
+    """
+    with np.load(path, allow_pickle=False) as npz:
+        n_rows, _ = npz['shape']
+        all_columns = npz['columns'].tolist()
+        base_df = _decode_base(npz, npz['base_columns'].tolist(), n_rows)
+        data, indices, indptr = npz['data'], npz['indices'], npz['indptr']
+
+    lab_columns = all_columns if columns is None else [col for col in columns if col in all_columns]
+    col_pos = [all_columns.index(col) for col in lab_columns]
+
+    if as_sparse:
+        if not HAS_SCIPY:
+            raise ImportError("as_sparse=True에는 scipy가 필요합니다 (uv pip install scipy)")
+        matrix = sp.csc_matrix((data, indices, indptr), shape=(n_rows, len(all_columns)))
+        return base_df, matrix[:, col_pos], lab_columns
+
+    # 선택한 열만 복원 (열 압축이므로 열마다 연속 구간)
+    dense = np.full((n_rows, len(lab_columns)), np.nan, dtype=np.float32)
+    for j, pos in enumerate(col_pos):
+        start, end = indptr[pos], indptr[pos + 1]
+        dense[indices[start:end], j] = data[start:end]
+
+    return pd.concat([base_df, pd.DataFrame(dense, columns=lab_columns)], axis=1)
+
+
+def read_wide_table(csv_path, columns=None):
+    """
+    wide 테이블 로드: 같은 이름의 .npz가 CSV보다 최신이면 희소 파일, 아니면 CSV
+
+    Parameters
+    ----------
+    csv_path : str or Path
+        wide CSV 경로 (예: .../labs_initial_merged_wide.csv)
+    columns : list, optional
+        .npz를 읽을 때 복원할 검사 컬럼 (CSV는 항상 전체)
+    """
+    csv_path = Path(csv_path)
+    npz_path = sparse_path(csv_path)
+    if npz_path.exists() and (not csv_path.exists()
+                              or npz_path.stat().st_mtime >= csv_path.stat().st_mtime):
+        return load_sparse_wide(npz_path, columns=columns)
+    return pd.read_csv(csv_path)
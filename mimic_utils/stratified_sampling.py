@@ -0,0 +1,217 @@
+"""
+한 번 읽기(one-pass) 층화 저수지 샘플링
+- 원본 admissions.csv를 청크로 읽으면서 입원마다 사망 그룹(층)을 바로 판정
+- 층마다 정해진 크기의 저수지(reservoir)만 유지 → 전체 admissions / 병합 사본을 메모리에 만들지 않음
+- 저수지는 "층별 난수 키가 가장 작은 k개" 방식 (균등 비복원 추출과 같은 분포)
+  - 키는 층마다 random_state로 고정된 난수열에서 모든 행에 차례로 뽑음 → 청크 크기와 관계없이 같은 샘플
+- 층별 할당량(quota)은 자유롭게 지정 (1,200건 / 120,000건 샘플 모두 같은 코드)
+
+사용 예:
+    samples, stats = stream_stratified_sample(patients, {'in_hospital_death': 300, ...},
+                                              random_state=42, base_path=BASE_PATH)
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from mimic_utils.table_cache import PROJECT_ROOT, STRING_COLUMNS
+from mimic_utils.schema import csv_dtypes, apply_schema
+
+CHUNK_SIZE = 500_000
+
+# 사망 그룹 (perform_sampling.categorize_admissions와 같은 기준, 순서 = 결과 순서)
+MORTALITY_STRATA = ('in_hospital_death', 'post_hospital_death', 'survived')
+
+
+def mortality_strata(hospital_expire_flag, has_dod):
+    """
+    입원별 사망 그룹 판정
+
+    - in_hospital_death: hospital_expire_flag == 1
+    - post_hospital_death: hospital_expire_flag == 0 & dod 있음
+    - survived: dod 없음
+
+    Returns
+    -------
+    dict
+        {그룹: bool 배열} (기준이 겹치면 한 입원이 두 그룹에 모두 속할 수 있음)
+    """
+    flag = np.asarray(hospital_expire_flag)
+    has_dod = np.asarray(has_dod, dtype=bool)
+    return {
+        'in_hospital_death': flag == 1,
+        'post_hospital_death': (flag == 0) & has_dod,
+        'survived': ~has_dod,
+    }
+
+
+class StratifiedReservoir:
+    """
+    층별 고정 크기 저수지 (난수 키가 가장 작은 quota개 유지)
+
+    Attributes
+    ----------
+    quotas : dict
+        {층: 샘플 크기}
+    seen : dict
+        {층: 지금까지 본 해당 층 행 수}
+    """
+
+    def __init__(self, quotas, random_state=None):
+        self.quotas = dict(quotas)
+        self.seen = {name: 0 for name in self.quotas}
+        # 층마다 독립 난수열 (한 층의 할당량을 바꿔도 다른 층 샘플은 그대로)
+        seeds = np.random.SeedSequence(random_state).spawn(len(self.quotas))
+        self._rngs = {name: np.random.default_rng(seed) for name, seed in zip(self.quotas, seeds)}
+        self._keys = {name: np.zeros(0) for name in self.quotas}
+        self._rows = {name: None for name in self.quotas}
+
+    def update(self, chunk, masks):
+        """
+        청크 하나 반영
+
+        Parameters
+        ----------
+        chunk : DataFrame
+            후보 행 (청크 전체, 행 순서 = 원본 순서)
+        masks : dict
+            {층: chunk 행별 bool 배열} (False인 행도 키는 소비 → 청크 경계와 무관하게 재현)
+        """
+        for name, quota in self.quotas.items():
+            keys = self._rngs[name].random(len(chunk))
+            mask = np.array(masks[name], dtype=bool)
+            self.seen[name] += int(mask.sum())
+            if quota <= 0:
+                continue
+
+            # 저수지가 차 있으면 현재 최대 키보다 작은 후보만 의미 있음
+            current = self._keys[name]
+            if len(current) >= quota:
+                mask &= keys < current.max()
+            if not mask.any():
+                continue
+
+            rows = chunk[mask]
+            merged_keys = np.concatenate([current, keys[mask]])
+            merged_rows = rows if self._rows[name] is None else pd.concat([self._rows[name], rows])
+            if len(merged_keys) > quota:
+                keep = np.argpartition(merged_keys, quota - 1)[:quota]
+                merged_keys = merged_keys[keep]
+                merged_rows = merged_rows.iloc[keep]
+            self._keys[name] = merged_keys
+            self._rows[name] = merged_rows
+
+    def samples(self, columns=None):
+        """{층: 샘플 DataFrame} (키 순서 = 무작위 순서, 인덱스 초기화)"""
+        result = {}
+        for name in self.quotas:
+            rows = self._rows[name]
+            if rows is None:
+                result[name] = pd.DataFrame(columns=columns)
+                continue
+            order = np.argsort(self._keys[name], kind='stable')
+            result[name] = rows.iloc[order].reset_index(drop=True)
+        return result
+
+
+def admissions_path(base_path=None):
+    """원본 admissions CSV 경로 (dataset2/core/admissions.csv)"""
+    base = Path(base_path) if base_path else PROJECT_ROOT
+    return base / 'dataset2' / 'core' / 'admissions.csv'
+
+
+def _iter_strata_chunks(patients, quotas, csv_path, chunk_size, min_age, stats):
+    """admissions 청크마다 (청크, {층: 대상 행 bool 배열}) 반환 (stats에 행 수 누적)"""
+    unknown = [name for name in quotas if name not in MORTALITY_STRATA]
+    if unknown:
+        raise ValueError(f"지원하지 않는 층입니다: {unknown} (가능: {MORTALITY_STRATA})")
+
+    header = pd.read_csv(csv_path, nrows=0).columns
+    # category는 청크마다 범주가 달라지므로 문자열로 읽고, 샘플에만 마지막에 스키마 적용
+    dtype = {col: str for col in header if col in STRING_COLUMNS}
+    dtype.update({col: t for col, t in csv_dtypes('core/admissions', header).items() if t != 'category'})
+
+    subject_index = pd.Index(patients['subject_id'].values)
+    anchor_age = patients['anchor_age'].to_numpy(dtype=np.float64)
+    has_dod_all = patients['dod'].notna().values
+
+    for chunk in pd.read_csv(csv_path, dtype=dtype, chunksize=chunk_size):
+        stats['rows_read'] += len(chunk)
+        stats['chunks'] += 1
+
+        # patients와 병합하지 않고 subject_id 위치로 anchor_age / dod만 조회
+        pos = subject_index.get_indexer(chunk['subject_id'].values)
+        found = pos >= 0
+        age = np.where(found, anchor_age[np.where(found, pos, 0)], np.nan)
+        has_dod = found & has_dod_all[np.where(found, pos, 0)]
+
+        eligible = age > min_age
+        stats['excluded'] += int((~eligible).sum())
+        stats['eligible'] += int(eligible.sum())
+
+        masks = mortality_strata(chunk['hospital_expire_flag'].values, has_dod)
+        yield chunk, {name: masks[name] & eligible for name in quotas}
+
+
+def _finish_samples(reservoir, patients, columns):
+    """저수지 → {층: admissions 컬럼 + anchor_age + dod} (스키마 적용)"""
+    subject_index = pd.Index(patients['subject_id'].values)
+    samples = {}
+    for name, rows in reservoir.samples(columns=columns).items():
+        pos = subject_index.get_indexer(rows['subject_id'].values)
+        rows = rows.assign(anchor_age=patients['anchor_age'].values[pos], dod=patients['dod'].values[pos])
+        samples[name] = apply_schema(rows, 'core/admissions')
+    return samples
+
+
+def stream_sample_family(patients, quotas, random_states, base_path=None, csv_path=None,
+                         chunk_size=CHUNK_SIZE, min_age=0):
+    """
+    시드 여러 개의 층화 샘플을 admissions 한 번 스트리밍으로 동시에 추출
+
+    시드마다 저수지를 따로 두므로 결과는 시드별로 stream_stratified_sample을 실행한 것과 같음
+
+    Returns
+    -------
+    (family, stats)
+        family: [시드 순서의 {층: 샘플 DataFrame}], stats: stream_stratified_sample과 같음
+    """
+    csv_path = Path(csv_path) if csv_path else admissions_path(base_path)
+    reservoirs = [StratifiedReservoir(quotas, seed) for seed in random_states]
+    stats = {'rows_read': 0, 'excluded': 0, 'eligible': 0, 'chunks': 0}
+    for chunk, masks in _iter_strata_chunks(patients, quotas, csv_path, chunk_size, min_age, stats):
+        for reservoir in reservoirs:
+            reservoir.update(chunk, masks)
+
+    stats['strata'] = dict(reservoirs[0].seen) if reservoirs else {}
+    columns = pd.read_csv(csv_path, nrows=0).columns
+    return [_finish_samples(reservoir, patients, columns) for reservoir in reservoirs], stats
+
+
+def stream_stratified_sample(patients, quotas, random_state=None, base_path=None, csv_path=None,
+                             chunk_size=CHUNK_SIZE, min_age=0):
+    """
+    원본 admissions를 한 번 스트리밍하며 사망 그룹별 층화 샘플 추출
+
+    Parameters
+    ----------
+    patients : DataFrame
+        subject_id, anchor_age, dod (환자 단위라 admissions보다 작음, 메모리에 유지)
+    quotas : dict
+        {MORTALITY_STRATA 중 층: 샘플 크기}
+    random_state : int, optional
+        재현용 시드
+    min_age : int
+        anchor_age > min_age인 입원만 대상 (기본: 0세 제외)
+
+    Returns
+    -------
+    (samples, stats)
+        samples: {층: admissions 컬럼 + anchor_age + dod} (quotas 순서)
+        stats: rows_read / excluded / eligible / chunks / strata({층: 전체 행 수})
+    """
+    family, stats = stream_sample_family(patients, quotas, [random_state], base_path=base_path,
+                                         csv_path=csv_path, chunk_size=chunk_size, min_age=min_age)
+    return family[0], stats
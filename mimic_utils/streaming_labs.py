@@ -0,0 +1,146 @@
+"""
+원본 labevents 스트리밍 초기 검사 추출
+- processed_data/hosp/labevents_sampled.csv 중간 파일 없이 dataset2/hosp/labevents.csv를 청크로 한 번만 읽음
+- 청크마다 코호트 subject_id + 대상 itemid로 바로 거른 뒤 select_initial_labs로 청크 안의 최선값 선택
+- (입원, itemid)별 최선값 표만 유지 (최대 입원 수 × 검사 수 행) → 원본 크기와 관계없이 메모리 일정
+- 우선순위가 같으면 먼저 읽은 청크(원본 행 순서상 앞)의 값 유지 → 샘플 파일로 추출한 결과와 동일
+
+사용 예:
+    selected, stats = stream_initial_labs(admissions, LAB_ITEMS, base_path=BASE_PATH)
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from mimic_utils.table_cache import PROJECT_ROOT, STRING_COLUMNS
+from mimic_utils.schema import csv_dtypes
+from mimic_utils.event_time import add_time_keys
+from mimic_utils.lab_window import select_initial_labs, DAY_PRIORITY
+
+CHUNK_SIZE = 1_000_000
+
+# 선택에 필요한 labevents 컬럼 (나머지 컬럼은 파싱하지 않음)
+LAB_COLUMNS = ['subject_id', 'itemid', 'charttime', 'value', 'valuenum', 'valueuom',
+               'flag', 'ref_range_lower', 'ref_range_upper']
+
+# 최선값 표에 임시로 붙이는 입원 위치 컬럼
+_POSITION_COL = '_stream_adm_pos'
+
+
+def labevents_path(base_path=None):
+    """원본 labevents CSV 경로 (dataset2/hosp/labevents.csv)"""
+    base = Path(base_path) if base_path else PROJECT_ROOT
+    return base / 'dataset2' / 'hosp' / 'labevents.csv'
+
+
+def iter_lab_chunks(lab_items, subject_ids, csv_path, chunk_size=CHUNK_SIZE, transform=None, stats=None):
+    """
+    원본 labevents를 청크로 읽으면서 코호트 환자 / 대상 itemid 행만 반환
+
+    Parameters
+    ----------
+    lab_items : dict
+        {itemid: lab_name}, 이 itemid만 남김
+    subject_ids : iterable
+        코호트 subject_id
+    csv_path : str or Path
+        labevents CSV
+    transform : callable, optional
+        필터 전에 청크에 적용할 함수 (예: itemid 통합 규칙), 청크 DataFrame을 받아 반환
+    stats : dict, optional
+        지정하면 읽은 행 수(rows_read) / 남긴 행 수(rows_kept) / 청크 수(chunks)를 누적
+
+    Yields
+    ------
+    DataFrame
+        필터된 청크 (charttime 파싱, chart_sec / chart_day 추가)
+    """
+    header = pd.read_csv(csv_path, nrows=0).columns
+    usecols = [col for col in LAB_COLUMNS if col in header]
+    # category는 청크마다 범주가 달라지므로 문자열로 읽음 (선택 결과는 값만 복사)
+    dtype = {col: str for col in usecols if col in STRING_COLUMNS}
+    dtype.update({col: t for col, t in csv_dtypes('hosp/labevents', usecols).items() if t != 'category'})
+
+    subject_index = pd.Index(pd.unique(np.asarray(subject_ids)))
+    itemid_index = pd.Index(list(lab_items.keys()))
+
+    for chunk in pd.read_csv(csv_path, usecols=usecols, dtype=dtype, chunksize=chunk_size):
+        if stats is not None:
+            stats['rows_read'] = stats.get('rows_read', 0) + len(chunk)
+            stats['chunks'] = stats.get('chunks', 0) + 1
+        if transform is not None:
+            chunk = transform(chunk)
+
+        mask = chunk['itemid'].isin(itemid_index).values & chunk['subject_id'].isin(subject_index).values
+        if not mask.any():
+            continue
+        part = chunk[mask].reset_index(drop=True)
+        if stats is not None:
+            stats['rows_kept'] = stats.get('rows_kept', 0) + len(part)
+        yield add_time_keys(part, 'charttime', 'chart')
+
+
+def _merge_best(best, selected, item_pos, rank_index):
+    """기존 최선값 표와 새 청크 선택 결과 병합: 우선순위가 더 높을 때만 교체 (같으면 기존 유지)"""
+    merged = pd.concat([best, selected], ignore_index=True)
+    order = np.lexsort((
+        np.repeat([0, 1], [len(best), len(selected)]),
+        rank_index.get_indexer(merged['day_offset'].values),
+        item_pos.reindex(merged['itemid'].values).values,
+        merged[_POSITION_COL].values,
+    ))
+    merged = merged.iloc[order]
+    return merged.drop_duplicates([_POSITION_COL, 'itemid'], keep='first').reset_index(drop=True)
+
+
+def stream_initial_labs(admissions, lab_items, base_path=None, csv_path=None, day_priority=DAY_PRIORITY,
+                        chunk_size=CHUNK_SIZE, transform=None):
+    """
+    원본 labevents를 한 번 스트리밍해서 select_initial_labs와 같은 초기 검사 선택
+
+    Parameters
+    ----------
+    admissions : DataFrame
+        hadm_id, subject_id, admittime 컬럼 필요 (admit_day가 있으면 재사용)
+    lab_items : dict
+        {itemid: lab_name}
+    base_path : str or Path, optional
+        프로젝트 루트 (csv_path가 없으면 dataset2/hosp/labevents.csv 사용)
+    csv_path : str or Path, optional
+        labevents CSV 경로 직접 지정
+    transform : callable, optional
+        필터 전에 청크에 적용할 함수 (iter_lab_chunks 참고)
+
+    Returns
+    -------
+    (selected, stats)
+        selected: select_initial_labs(admissions, 전체 labevents, lab_items)와 같은 결과
+        stats: rows_read / rows_kept / chunks / itemids(데이터가 있는 itemid 집합)
+    """
+    csv_path = Path(csv_path) if csv_path else labevents_path(base_path)
+    if not csv_path.exists():
+        raise FileNotFoundError(f"labevents 원본 없음: {csv_path}")
+
+    # 입원일 번호는 청크마다 다시 계산하지 않도록 한 번만
+    if 'admit_day' not in admissions.columns:
+        admissions = add_time_keys(admissions.copy(), 'admittime', 'admit')
+
+    item_pos = pd.Series(np.arange(len(lab_items)), index=list(lab_items.keys()))
+    rank_index = pd.Index(day_priority)
+
+    stats = {'rows_read': 0, 'rows_kept': 0, 'chunks': 0, 'itemids': set()}
+    best = None
+    for part in iter_lab_chunks(lab_items, admissions['subject_id'].values, csv_path,
+                                chunk_size=chunk_size, transform=transform, stats=stats):
+        stats['itemids'].update(part['itemid'].unique().tolist())
+        selected = select_initial_labs(admissions, part, lab_items, day_priority,
+                                       position_col=_POSITION_COL)
+        if selected.empty:
+            continue
+        best = selected if best is None else _merge_best(best, selected, item_pos, rank_index)
+
+    if best is None:
+        return pd.DataFrame(), stats
+    return best.drop(columns=_POSITION_COL), stats
@@ -0,0 +1,234 @@
+"""
+dataset2 원본 CSV의 Parquet 캐시 로더
+- 처음 접근할 때 CSV를 타입이 지정된 압축 Parquet(row group 단위)로 변환
+- 이후에는 Parquet에서 필요한 컬럼만, 조건에 맞는 row group만 읽음
+- 원본 CSV의 수정시간(mtime) 또는 크기가 바뀌면 캐시를 다시 생성
+- pyarrow가 없거나 변환에 실패하면(ArrowInvalid) pd.read_csv로 동일한 결과를 반환
+- 반환 전 schema.py의 dtype 스키마 적용 (int32 ID, category, float32, datetime)
+"""
+
+import os
+import json
+from pathlib import Path
+
+import pandas as pd
+
+from mimic_utils.schema import apply_schema, csv_dtypes, ID_COLUMNS
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# 프로젝트 루트 (dataset2/, processed_data/ 가 있는 위치)
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+CACHE_DIRNAME = 'processed_data/parquet_cache'
+
+ROW_GROUP_SIZE = 1_000_000      # row group 당 행 수 (predicate pushdown 단위)
+CSV_BLOCK_SIZE = 64 << 20       # CSV 스트리밍 블록 크기 (64MB)
+COMPRESSION = 'zstd'
+CACHE_VERSION = 3               # 변환 규칙이 바뀌면 올려서 기존 캐시를 다시 생성
+
+# 앞부분만 보고 숫자로 추론되면 안 되는 컬럼 (코드/자유 텍스트)
+STRING_COLUMNS = {
+    'icd_code', 'drg_code', 'hcpcs_cd', 'ndc', 'gsn', 'formulary_drug_cd',
+    'prod_strength', 'dose_val_rx', 'form_val_disp',
+    'value', 'comments', 'poe_id', 'order_provider_id',
+}
+
+
+def table_paths(table, base_path=None):
+    """'hosp/labevents' → (원본 CSV 경로, Parquet 경로, 메타 경로)"""
+    base = Path(base_path) if base_path else PROJECT_ROOT
+    csv_path = base / 'dataset2' / f'{table}.csv'
+    cache_path = base / CACHE_DIRNAME / f'{table}.parquet'
+    meta_path = base / CACHE_DIRNAME / f'{table}.meta.json'
+    return csv_path, cache_path, meta_path
+
+
+def _source_signature(csv_path):
+    """캐시 무효화 기준: 원본 CSV의 mtime, 크기"""
+    stat = os.stat(csv_path)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def is_cache_valid(table, base_path=None):
+    """캐시가 존재하고 원본 CSV와 일치하는지 확인"""
+    csv_path, cache_path, meta_path = table_paths(table, base_path)
+    if not (cache_path.exists() and meta_path.exists()):
+        return False
+    with open(meta_path) as f:
+        meta = json.load(f)
+    return (meta.get('source') == _source_signature(csv_path)
+            and meta.get('version') == CACHE_VERSION)
+
+
+def _infer_column_types(csv_path):
+    """
+    첫 블록으로 컬럼 타입 추론
+
+    - 코드/텍스트 컬럼, 첫 블록에서 모두 결측인 컬럼은 문자열 고정
+    - ID가 아닌 정수 컬럼은 float64로 넓힘 (첫 블록은 정수뿐이어도 뒤에 소수가 나올 수 있음,
+      예: doses_per_24_hrs) → 파일 전체가 정수면 로드할 때 int64로 되돌림
+
+    Returns
+    -------
+    (column_types, widened)
+        widened: float64로 넓힌 정수 컬럼 목록
+    """
+    reader = pacsv.open_csv(csv_path, read_options=pacsv.ReadOptions(block_size=CSV_BLOCK_SIZE))
+    column_types, widened = {}, []
+    for field in reader.schema:
+        if field.name in STRING_COLUMNS or pa.types.is_null(field.type):
+            column_types[field.name] = pa.string()
+        elif pa.types.is_integer(field.type) and field.name not in ID_COLUMNS:
+            column_types[field.name] = pa.float64()
+            widened.append(field.name)
+        else:
+            column_types[field.name] = field.type
+    reader.close()
+    return column_types, widened
+
+
+def _integral_columns(batch, columns):
+    """batch에서 결측 없이 정수 값만 있는 컬럼"""
+    result = set()
+    for col in columns:
+        values = batch.column(col)
+        if values.null_count == 0 and pc.all(pc.equal(pc.floor(values), values)).as_py() is not False:
+            result.add(col)
+    return result
+
+
+def build_cache(table, base_path=None):
+    """원본 CSV → Parquet 변환 (스트리밍, 메모리는 블록 크기 수준)"""
+    csv_path, cache_path, meta_path = table_paths(table, base_path)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix('.parquet.tmp')
+
+    column_types, widened = _infer_column_types(csv_path)
+    # 파일 전체에서 정수 값만 있는 넓힌 컬럼 (pd.read_csv라면 int64로 읽었을 컬럼)
+    integer_columns = set(widened)
+    reader = pacsv.open_csv(
+        csv_path,
+        read_options=pacsv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+        # 빈 문자열 필드는 pd.read_csv와 같이 결측으로 처리
+        convert_options=pacsv.ConvertOptions(column_types=column_types, strings_can_be_null=True),
+    )
+
+    n_rows = 0
+    completed = False
+    writer = pq.ParquetWriter(tmp_path, reader.schema, compression=COMPRESSION)
+    try:
+        for batch in reader:
+            writer.write_table(pa.Table.from_batches([batch]), row_group_size=ROW_GROUP_SIZE)
+            integer_columns &= _integral_columns(batch, integer_columns)
+            n_rows += batch.num_rows
+        completed = True
+    finally:
+        writer.close()
+        reader.close()
+        # 변환 실패(ArrowInvalid 등) 시 임시 파일 정리
+        if not completed:
+            tmp_path.unlink(missing_ok=True)
+
+    # 변환이 끝난 뒤에만 교체 (중단 시 깨진 캐시가 남지 않도록)
+    os.replace(tmp_path, cache_path)
+    with open(meta_path, 'w') as f:
+        json.dump({'source': _source_signature(csv_path), 'version': CACHE_VERSION,
+                   'rows': n_rows, 'integer_columns': sorted(integer_columns)}, f, indent=2)
+
+    return cache_path
+
+
+def _apply_filters(df, filters):
+    """pyarrow 형식 필터 [(col, op, value), ...]를 pandas에서 적용 (fallback용)"""
+    mask = pd.Series(True, index=df.index)
+    for col, op, value in filters:
+        if op == 'in':
+            mask &= df[col].isin(value)
+        elif op == 'not in':
+            mask &= ~df[col].isin(value)
+        elif op in ('=', '=='):
+            mask &= df[col] == value
+        elif op == '!=':
+            mask &= df[col] != value
+        elif op == '<':
+            mask &= df[col] < value
+        elif op == '<=':
+            mask &= df[col] <= value
+        elif op == '>':
+            mask &= df[col] > value
+        elif op == '>=':
+            mask &= df[col] >= value
+        else:
+            raise ValueError(f"지원하지 않는 필터 연산자: {op}")
+    return df[mask].reset_index(drop=True)
+
+
+def _read_csv_table(table, csv_path, columns, filters, typed):
+    """캐시 없이 pd.read_csv로 읽기 (pyarrow가 없거나 변환에 실패한 경우)"""
+    usecols = None
+    if columns:
+        usecols = list(dict.fromkeys(list(columns) + [col for col, _, _ in filters or []]))
+    header = pd.read_csv(csv_path, nrows=0).columns
+    dtype = None
+    if typed:
+        dtype = {col: str for col in header if col in STRING_COLUMNS}
+        dtype.update(csv_dtypes(table, header))
+    df = pd.read_csv(csv_path, usecols=usecols, dtype=dtype)
+    if filters:
+        df = _apply_filters(df, filters)
+    df = df[columns] if columns else df
+    return apply_schema(df, table) if typed else df
+
+
+def load_table(table, columns=None, filters=None, base_path=None, use_cache=True, typed=True):
+    """
+    dataset2 테이블 로드 (Parquet 캐시 사용)
+
+    Parameters
+    ----------
+    table : str
+        'core/admissions', 'hosp/labevents' 처럼 dataset2 기준 경로 (확장자 제외)
+    columns : list, optional
+        읽을 컬럼 (column projection)
+    filters : list, optional
+        [('subject_id', 'in', ids), ('itemid', '==', 50912)] 형식의 AND 조건.
+        Parquet row group 통계로 해당 없는 블록은 읽지 않음
+    base_path : str or Path, optional
+        dataset2/ 가 있는 프로젝트 루트 (기본값: 저장소 루트)
+    use_cache : bool
+        False면 캐시 없이 CSV를 직접 읽음
+    typed : bool
+        True면 schema.py의 압축 dtype 적용 (False면 pandas 기본 dtype)
+    """
+    csv_path, cache_path, meta_path = table_paths(table, base_path)
+
+    if not (HAS_PYARROW and use_cache):
+        return _read_csv_table(table, csv_path, columns, filters, typed)
+
+    if not is_cache_valid(table, base_path):
+        print(f"   ⏳ Parquet 캐시 생성 중: {table} (최초 1회)")
+        try:
+            build_cache(table, base_path)
+        except pa.ArrowInvalid as e:
+            print(f"   ⚠️ Parquet 변환 실패, CSV로 직접 읽습니다: {e}")
+            return _read_csv_table(table, csv_path, columns, filters, typed)
+
+    filters = [(col, '==' if op == '=' else op, list(value) if op in ('in', 'not in') else value)
+               for col, op, value in filters] if filters else None
+    arrow_table = pq.read_table(cache_path, columns=columns, filters=filters)
+    df = arrow_table.to_pandas(date_as_object=False)
+
+    # 변환 때 float64로 넓혔지만 파일 전체가 정수인 컬럼은 int64로 (pd.read_csv와 같은 dtype)
+    with open(meta_path) as f:
+        integer_columns = json.load(f).get('integer_columns', [])
+    for col in integer_columns:
+        if col in df.columns:
+            df[col] = df[col].astype('int64')
+    return apply_schema(df, table) if typed else df
@@ -0,0 +1,170 @@
+"""
+subject_id별 시간 정렬 인덱스
+- 이벤트를 (subject_id, epoch 초) 순으로 한 번 정렬하고 둘을 합친 int64 키를 보관
+- [시작, 끝] 시간 구간 조회는 전체 프레임 마스크 대신 키 배열에 대한 이진 탐색(searchsorted) 2번
+- 여러 기준 시각(입원, ICU 입실 등)의 구간을 한 번에 벡터로 조회
+- save/load로 디스크에 저장하고 memory-map으로 복사 없이 다시 열 수 있음
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from mimic_utils.event_time import MISSING_SECONDS, epoch_seconds
+
+
+class SubjectTimeIndex:
+    """
+    (subject_id, 시각) 정렬 인덱스
+
+    Parameters
+    ----------
+    subject_ids : array-like
+        이벤트별 subject_id
+    seconds : array-like
+        이벤트별 int64 epoch 초 (event_time.epoch_seconds / add_time_keys의 *_sec)
+        결측(MISSING_SECONDS) 이벤트는 인덱스에서 제외
+    """
+
+    def __init__(self, subject_ids, seconds):
+        subject_ids = np.asarray(subject_ids, dtype=np.int64)
+        seconds = np.asarray(seconds, dtype=np.int64)
+
+        valid = np.flatnonzero(seconds != MISSING_SECONDS)
+        self.subjects = np.unique(subject_ids[valid])
+        codes = np.searchsorted(self.subjects, subject_ids[valid])
+
+        secs = seconds[valid]
+        self.sec_min = int(secs.min()) if len(secs) else 0
+        self.span = (int(secs.max()) - self.sec_min + 1) if len(secs) else 1
+
+        keys = codes * self.span + (secs - self.sec_min)
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.rows = valid[order]          # 정렬 위치 → 원본 행 번호
+        self.seconds = secs[order]
+
+    @classmethod
+    def from_frame(cls, df, time_col='charttime', sec_col=None):
+        """DataFrame에서 인덱스 생성 (sec_col이 있으면 재사용, 없으면 time_col 파싱)"""
+        if sec_col is not None and sec_col in df.columns:
+            seconds = df[sec_col].values
+        else:
+            seconds = epoch_seconds(df[time_col])
+        return cls(df['subject_id'].values, seconds)
+
+    def __len__(self):
+        return len(self.keys)
+
+    # 저장 파일: 배열은 .npy, 키 계산용 상수는 JSON
+    _ARRAYS = ('subjects', 'keys', 'rows', 'seconds')
+
+    def save(self, directory):
+        """인덱스 배열을 directory에 .npy로 저장"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in self._ARRAYS:
+            np.save(directory / f'{name}.npy', getattr(self, name))
+        with open(directory / 'time_index.json', 'w') as f:
+            json.dump({'sec_min': self.sec_min, 'span': self.span}, f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """save로 저장한 인덱스 열기 (기본은 memory-map, 정렬/복사 없음)"""
+        directory = Path(directory)
+        index = cls.__new__(cls)
+        for name in cls._ARRAYS:
+            setattr(index, name, np.load(directory / f'{name}.npy', mmap_mode=mmap_mode))
+        with open(directory / 'time_index.json') as f:
+            constants = json.load(f)
+        index.sec_min, index.span = constants['sec_min'], constants['span']
+        return index
+
+    def subject_bounds(self, subject_ids):
+        """subject별 정렬 인덱스 구간 [lo, hi) (없는 subject는 빈 구간)"""
+        subject_ids = np.asarray(subject_ids, dtype=np.int64)
+        if len(self.subjects) == 0:
+            empty = np.zeros(len(subject_ids), dtype=np.int64)
+            return empty, empty
+        codes = np.minimum(np.searchsorted(self.subjects, subject_ids), len(self.subjects) - 1)
+        found = self.subjects[codes] == subject_ids
+        lo = np.searchsorted(self.keys, codes * self.span, side='left')
+        hi = np.searchsorted(self.keys, (codes + 1) * self.span, side='left')
+        return lo, np.where(found, hi, lo)
+
+    def _bound(self, codes, seconds):
+        """구간 경계 초를 같은 subject 블록 안으로 잘라서 키로 변환"""
+        offset = np.clip(seconds - self.sec_min, 0, self.span - 1)
+        return codes * self.span + offset
+
+    def _ranges(self, subject_ids, start_sec, end_sec):
+        """구간별 정렬 인덱스 시작 위치와 이벤트 수 (이진 탐색 2번)"""
+        subject_ids = np.asarray(subject_ids, dtype=np.int64)
+        start_sec = np.asarray(start_sec, dtype=np.int64)
+        end_sec = np.asarray(end_sec, dtype=np.int64)
+        if len(self.subjects) == 0:
+            return np.zeros(len(subject_ids), dtype=np.int64), np.zeros(len(subject_ids), dtype=np.int64)
+
+        codes = np.minimum(np.searchsorted(self.subjects, subject_ids), len(self.subjects) - 1)
+        found = ((self.subjects[codes] == subject_ids)
+                 & (start_sec <= end_sec)
+                 & (end_sec >= self.sec_min)
+                 & (start_sec < self.sec_min + self.span))
+
+        lo = np.searchsorted(self.keys, self._bound(codes, start_sec), side='left')
+        hi = np.searchsorted(self.keys, self._bound(codes, end_sec), side='right')
+        return lo, np.where(found, hi - lo, 0)
+
+    def query(self, subject_ids, start_sec, end_sec):
+        """
+        각 (subject_id, [start_sec, end_sec]) 구간에 속하는 이벤트 위치 조회 (양 끝 포함)
+
+        Returns
+        -------
+        (query_pos, positions)
+            query_pos: 조회 번호 (입력 순서), positions: 정렬 인덱스 위치.
+            같은 조회 안에서는 시각 순. 원본 행 번호는 self.rows[positions]
+        """
+        lo, counts = self._ranges(subject_ids, start_sec, end_sec)
+
+        # 구간별 [lo, lo + count)를 하나의 위치 배열로 펼치기
+        query_pos = np.repeat(np.arange(len(counts)), counts)
+        starts = np.repeat(lo - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+        positions = starts + np.arange(counts.sum())
+        return query_pos, positions
+
+    def count(self, subject_ids, start_sec, end_sec):
+        """구간별 이벤트 수만 계산 (위치를 펼치지 않음)"""
+        return self._ranges(subject_ids, start_sec, end_sec)[1]
+
+
+def hours_to_seconds(hours):
+    """시간(float 가능) → 초 (int64)"""
+    return np.int64(round(hours * 3600))
+
+
+def window_label(start_hours, end_hours):
+    """(-6, 24) → '[-6h, +24h]'"""
+    def fmt(h):
+        return f"{h:+g}h" if h != 0 else "0h"
+    return f"[{fmt(start_hours)}, {fmt(end_hours)}]"
+
+
+def window_key(start_hours, end_hours):
+    """(-6, 24) → 'm6_24h' (컬럼명 접미사용, 음수는 m)"""
+    def fmt(h):
+        return f"m{-h:g}" if h < 0 else f"{h:g}"
+    return f"{fmt(start_hours)}_{fmt(end_hours)}h".replace('.', 'p')
+
+
+def windows_frame(windows):
+    """윈도우 목록 [(start_h, end_h), ...] → 우선순위/라벨 DataFrame"""
+    return pd.DataFrame({
+        'rank': np.arange(len(windows)),
+        'start_hours': [w[0] for w in windows],
+        'end_hours': [w[1] for w in windows],
+        'window': [window_label(*w) for w in windows],
+        'window_key': [window_key(*w) for w in windows],
+    })
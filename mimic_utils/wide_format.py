@@ -0,0 +1,84 @@
+"""
+long format 검사 결과 → 입원(기준 행) × 검사 wide format 변환
+- hadm_id별 반복 + wide_df.loc 셀 단위 채우기 대신, 키/컬럼 위치를 한 번에 계산해서 배열에 채움
+- 모든 검사 컬럼을 float32 블록 하나로 만든 뒤 기준 컬럼과 한 번만 합침 (컬럼별 insert 없음)
+- 50만 입원 × 87 검사도 몇 초 안에 생성
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def pivot_to_matrix(long_df, keys, columns, key='hadm_id', column_col='lab_name',
+                    value_col='valuenum', dtype=np.float32):
+    """
+    long_df를 (keys × columns) 배열로 변환
+
+    pivot_table(aggfunc='first')와 같이 (key, column)마다 결측이 아닌 첫 번째 값을 사용하고,
+    keys에 같은 값이 여러 번 있으면 모두 같은 값으로 채웁니다.
+
+    Parameters
+    ----------
+    long_df : DataFrame
+        key, column_col, value_col 컬럼 필요
+    keys : array-like
+        결과 행 순서의 키 (예: admissions['hadm_id'])
+    columns : list
+        결과 컬럼 순서 (long_df에 없는 컬럼은 NaN)
+    """
+    keys = np.asarray(keys)
+    if long_df.empty or len(keys) == 0:
+        return np.full((len(keys), len(columns)), np.nan, dtype=dtype)
+
+    values = long_df[[key, column_col, value_col]]
+    values = values[values[value_col].notna()].drop_duplicates([key, column_col], keep='first')
+
+    # 키 → 결과 행(들), 컬럼명 → 결과 열 위치
+    key_index = pd.Index(values[key].unique())
+    row_code = key_index.get_indexer(keys)
+    col_pos = pd.Index(columns).get_indexer(values[column_col].values)
+    key_code = key_index.get_indexer(values[key].values)
+
+    # (고유 키 × 컬럼) 배열을 먼저 채우고, 결과 행은 키 위치로 한 번에 가져옴 (없는 키는 마지막 NaN 행)
+    unique_matrix = np.full((len(key_index) + 1, len(columns)), np.nan, dtype=dtype)
+    keep = col_pos >= 0
+    unique_matrix[key_code[keep], col_pos[keep]] = values[value_col].values[keep]
+    return unique_matrix[np.where(row_code >= 0, row_code, len(key_index))]
+
+
+def build_wide_format(base_df, long_df, columns, key='hadm_id', column_col='lab_name',
+                      value_cols=None, dtype=np.float32):
+    """
+    기준 테이블에 검사 컬럼 블록을 붙인 wide format 생성
+
+    Parameters
+    ----------
+    base_df : DataFrame
+        결과의 기준 행과 앞쪽 컬럼 (예: admissions[['hadm_id', 'subject_id', 'admittime']])
+    long_df : DataFrame
+        key, column_col, value_cols 컬럼 필요
+    columns : list
+        검사 컬럼 순서 (예: list(LAB_ITEMS.values())), 데이터가 없어도 모두 생성
+    value_cols : dict, optional
+        {long_df 값 컬럼: 컬럼명 접미사}, 기본값 {'valuenum': ''}.
+        여러 개면 검사마다 지정 순서대로 이어 붙임
+        (예: {'valuenum': '', 'day_offset': '_day_offset'} → A, A_day_offset, B, B_day_offset, ...)
+
+    Returns
+    -------
+    (wide_df, lab_columns)
+        wide_df: base_df 컬럼 + 검사 컬럼 (base_df의 index 유지), lab_columns: 추가된 컬럼명 목록
+    """
+    if value_cols is None:
+        value_cols = {'valuenum': ''}
+
+    keys = base_df[key].values
+    blocks = [pivot_to_matrix(long_df, keys, columns, key, column_col, value_col, dtype)
+              for value_col in value_cols]
+
+    # 검사별로 값 컬럼을 번갈아 배치: (행, 검사, 값 종류) → (행, 검사 × 값 종류)
+    matrix = np.stack(blocks, axis=2).reshape(len(keys), len(columns) * len(blocks))
+    lab_columns = [f"{col}{suffix}" for col in columns for suffix in value_cols.values()]
+
+    labs = pd.DataFrame(matrix, index=base_df.index, columns=lab_columns)
+    return pd.concat([base_df, labs], axis=1), lab_columns